@@ -36,6 +36,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app_backups.middleware.ReconexionTrasRestauracionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -124,9 +125,23 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # 4. CONFIGURACIÓN DE CORREO ELECTRÓNICO (Para "Olvidé mi contraseña")
 # =========================================================================
 
-# Para desarrollo: Imprime los correos en la consola.
-# 🛑 DEBE ESTAR ACTIVA Y APUNTAR A SMTP
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Los correos no se envían durante la petición: se encolan en la bandeja de
+# salida (gestion.CorreoSaliente) y el worker `python manage.py enviar_correos`
+# los entrega con CORREO_BACKEND_ENTREGA, que es el que usa la configuración
+# SMTP de abajo. Para desarrollo sin SMTP puede usarse
+# 'django.core.mail.backends.console.EmailBackend' o el backend de archivos.
+EMAIL_BACKEND = 'gestion.correo.BackendCola'
+CORREO_BACKEND_ENTREGA = 'django.core.mail.backends.smtp.EmailBackend'
+
+# Entrega: correos por conexión, tope por minuto (Gmail limita el envío por
+# cuenta), reintentos con espera exponencial y tiempo tras el cual un lote
+# interrumpido vuelve a la cola.
+CORREO_LOTE = 50
+CORREO_POR_MINUTO = 60
+CORREO_REINTENTOS = 6
+CORREO_ESPERA_BASE_SEGUNDOS = 30
+CORREO_ESPERA_MAXIMA_SEGUNDOS = 3600
+CORREO_BLOQUEO_SEGUNDOS = 600
 
 
 EMAIL_HOST = 'smtp.gmail.com'
@@ -143,4 +158,87 @@ EMAIL_HOST_PASSWORD = 'cylaposyqdnnrecp'
 # EMAIL_HOST = 'smtp.gmail.com', EMAIL_PORT = 587, EMAIL_USE_TLS = True, etc.
 
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# =========================================================================
+# 5. CACHÉ (Contadores del dashboard administrativo)
+# La caché local en memoria no se comparte entre procesos; con varios workers
+# de gunicorn usar OASIS_CACHE=archivo u OASIS_CACHE=db (esta última requiere
+# `python manage.py createcachetable`). Lo mismo para el worker
+# `procesar_importaciones`, que se niega a arrancar con la caché en memoria, y
+# para las claves de idempotencia de los formularios. `check --deploy` avisa si
+# la caché es local al proceso.
+# Cualquier desviación de los contadores se corrige con
+# `python manage.py reconciliar_contadores`.
+# =========================================================================
+
+CACHES_DISPONIBLES = {
+    'memoria': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'oasis-cache',
+    },
+    'archivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'oasis_cache',
+    },
+}
+
+CACHES = {
+    'default': CACHES_DISPONIBLES[os.environ.get('OASIS_CACHE', 'memoria')],
+}
+
+# "Proyectos disponibles" del aprendiz (aprendices.emparejamiento): las listas
+# cacheadas se descartan con cada cambio y, por si acaso, expiran tras este tiempo.
+EMPAREJAMIENTO_TTL_SEGUNDOS = 3600
+
+# Panel del aprendiz (aprendices/panel.py): se descarta con cada postulación,
+# asignación o cambio de sus proyectos y, por si acaso, expira tras este tiempo.
+PANEL_APRENDIZ_TTL_SEGUNDOS = 600
+
+# POST con clave de idempotencia (usuario.utils.idempotente): durante este tiempo
+# un reenvío con la misma clave repite la redirección sin volver a ejecutarse.
+IDEMPOTENCIA_TTL_SEGUNDOS = 3600
+
+# Reportes en segundo plano: un reporte con los mismos parámetros generado hace
+# menos de este tiempo se reutiliza en lugar de volver a generarse.
+REPORTES_TTL_SEGUNDOS = 600
+# Un reporte EN_PROCESO desde hace más de este tiempo es de un worker que se
+# detuvo: no se reutiliza y vuelve a la cola.
+REPORTES_BLOQUEO_SEGUNDOS = 900
+
+# Importaciones masivas (gestion/importacion.py): una importación EN_PROCESO desde
+# hace más de este tiempo es de un worker que se detuvo; se marca como fallida y
+# se borra su CSV.
+IMPORTACION_BLOQUEO_SEGUNDOS = 3600
+
+# Archivos privados (reportes generados, CSV de importación): viven fuera de
+# MEDIA_ROOT, así que nunca se sirven desde /media/; solo se entregan a través de
+# vistas con control de permisos (ver gestion/almacenamiento.py).
+ARCHIVOS_PRIVADOS_DIR = BASE_DIR / 'privado'
+
+# =========================================================================
+# 6. RESPALDOS (app_backups)
+# Los respaldos usan la API de backup en línea de SQLite: se copian
+# BACKUP_PAGINAS_POR_PASO páginas por paso y entre pasos se cede la base
+# durante BACKUP_PAUSA_SEGUNDOS para no bloquear a quienes escriben.
+# La instantánea se guarda en fragmentos de BACKUP_PAGINAS_POR_FRAGMENTO
+# páginas comprimidos con gzip y compartidos entre respaldos.
+# =========================================================================
+
+BACKUPS_DIR = BASE_DIR / 'backups'
+BACKUP_PAGINAS_POR_PASO = 1024
+BACKUP_PAUSA_SEGUNDOS = 0.005
+BACKUP_PAGINAS_POR_FRAGMENTO = 16
+BACKUP_NIVEL_COMPRESION = 6
+
+# Retención (`python manage.py podar_backups`): se conserva el respaldo más
+# reciente de cada una de las últimas N horas, N días y N semanas.
+BACKUP_RETENCION = {'horarios': 24, 'diarios': 7, 'semanales': 4}
+
+# Respaldo lógico (`respaldo_logico` / `restaurar_logico`): modelos que se omiten
+# además de las sesiones y los registros de respaldos ('app.modelo').
+BACKUP_LOGICO_EXCLUIDOS = ()
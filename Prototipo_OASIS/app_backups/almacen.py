@@ -0,0 +1,173 @@
+# app_backups/almacen.py
+"""
+Almacén de respaldos direccionado por contenido.
+
+Una instantánea de la base se parte en fragmentos de tamaño fijo (un múltiplo del
+tamaño de página de SQLite) y cada fragmento se guarda comprimido con gzip en
+`<BACKUPS_DIR>/fragmentos/ab/<sha256>.gz`, solo si no existía ya. Cada respaldo es
+un manifiesto JSON con la lista ordenada de hashes, así que dos respaldos casi
+iguales comparten casi todo su almacenamiento: un respaldo diario de una base que
+cambió poco solo escribe las páginas modificadas.
+
+    {"version": 1, "tamano": ..., "tamano_fragmento": ..., "sha256": ..., "fragmentos": [...]}
+
+`reconstruir()` rehace el archivo fragmento por fragmento, sin cargarlo entero en
+memoria, y comprueba el hash completo del resultado.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from django.conf import settings
+
+VERSION_MANIFIESTO = 1
+EXTENSION_MANIFIESTO = ".manifiesto.json"
+
+
+class ManifiestoInvalido(Exception):
+    """El manifiesto o alguno de sus fragmentos falta o no coincide con su hash."""
+
+
+def directorio_respaldos() -> str:
+    return str(settings.BACKUPS_DIR)
+
+
+def directorio_fragmentos() -> str:
+    return os.path.join(directorio_respaldos(), "fragmentos")
+
+
+def ruta_fragmento(huella) -> str:
+    return os.path.join(directorio_fragmentos(), huella[:2], f"{huella}.gz")
+
+
+def es_manifiesto(ruta) -> bool:
+    return str(ruta).endswith(EXTENSION_MANIFIESTO)
+
+
+def escribir_atomico(ruta, datos: bytes):
+    """Escribe en un temporal del mismo directorio y lo publica con os.replace."""
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(datos)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def guardar(ruta_origen, ruta_manifiesto, tamano_pagina, progreso=None) -> dict:
+    """
+    Fragmenta `ruta_origen`, guarda los fragmentos que aún no estén en el almacén
+    y escribe el manifiesto. Devuelve estadísticas: fragmentos, fragmentos_nuevos,
+    bytes_nuevos (comprimidos) y tamano (del archivo original). `progreso`, si se
+    da, recibe la fracción procesada (0 a 1) tras cada fragmento.
+    """
+    paginas = settings.BACKUP_PAGINAS_POR_FRAGMENTO
+    tamano_fragmento = tamano_pagina * paginas
+    nivel = settings.BACKUP_NIVEL_COMPRESION
+
+    huellas, nuevos, bytes_nuevos, tamano = [], 0, 0, 0
+    tamano_total = os.path.getsize(ruta_origen) or 1
+    total = hashlib.sha256()
+    with open(ruta_origen, "rb") as origen:
+        while True:
+            fragmento = origen.read(tamano_fragmento)
+            if not fragmento:
+                break
+            tamano += len(fragmento)
+            total.update(fragmento)
+            huella = hashlib.sha256(fragmento).hexdigest()
+            huellas.append(huella)
+
+            destino = ruta_fragmento(huella)
+            if not os.path.exists(destino):
+                comprimido = gzip.compress(fragmento, compresslevel=nivel, mtime=0)
+                escribir_atomico(destino, comprimido)
+                nuevos += 1
+                bytes_nuevos += len(comprimido)
+            if progreso:
+                progreso(tamano / tamano_total)
+
+    manifiesto = {
+        'version': VERSION_MANIFIESTO,
+        'tamano': tamano,
+        'tamano_fragmento': tamano_fragmento,
+        'sha256': total.hexdigest(),
+        'fragmentos': huellas,
+    }
+    escribir_atomico(ruta_manifiesto, json.dumps(manifiesto).encode("utf-8"))
+    return {'fragmentos': len(huellas), 'fragmentos_nuevos': nuevos, 'bytes_nuevos': bytes_nuevos, 'tamano': tamano}
+
+
+def leer_manifiesto(ruta_manifiesto) -> dict:
+    try:
+        with open(ruta_manifiesto, "rb") as archivo:
+            manifiesto = json.loads(archivo.read())
+    except (OSError, ValueError) as e:
+        raise ManifiestoInvalido(f"No se pudo leer el manifiesto {ruta_manifiesto}: {e}") from e
+    if manifiesto.get('version') != VERSION_MANIFIESTO:
+        raise ManifiestoInvalido(f"Versión de manifiesto no soportada: {manifiesto.get('version')}")
+    return manifiesto
+
+
+def reconstruir(ruta_manifiesto, archivo_destino, progreso=None):
+    """
+    Escribe en `archivo_destino` (abierto en binario) el contenido descrito por el
+    manifiesto, un fragmento a la vez. Lanza ManifiestoInvalido si falta un
+    fragmento o el resultado no coincide con el hash registrado.
+    """
+    manifiesto = leer_manifiesto(ruta_manifiesto)
+    cantidad = len(manifiesto['fragmentos']) or 1
+    total = hashlib.sha256()
+    for numero, huella in enumerate(manifiesto['fragmentos'], start=1):
+        try:
+            with open(ruta_fragmento(huella), "rb") as archivo:
+                fragmento = gzip.decompress(archivo.read())
+        except (OSError, EOFError) as e:
+            raise ManifiestoInvalido(f"Fragmento {huella} ausente o dañado: {e}") from e
+        if hashlib.sha256(fragmento).hexdigest() != huella:
+            raise ManifiestoInvalido(f"El fragmento {huella} no coincide con su hash.")
+        total.update(fragmento)
+        archivo_destino.write(fragmento)
+        if progreso:
+            progreso(numero / cantidad)
+    if total.hexdigest() != manifiesto['sha256']:
+        raise ManifiestoInvalido("El archivo reconstruido no coincide con el hash del manifiesto.")
+
+
+def manifiestos() -> list:
+    """Rutas de los manifiestos guardados en BACKUPS_DIR."""
+    directorio = directorio_respaldos()
+    if not os.path.isdir(directorio):
+        return []
+    with os.scandir(directorio) as entradas:
+        return [entrada.path for entrada in entradas if entrada.is_file() and es_manifiesto(entrada.name)]
+
+
+def recolectar() -> int:
+    """
+    Borra del almacén los fragmentos que no aparecen en ningún manifiesto de
+    BACKUPS_DIR. Devuelve cuántos borró. Se leen los archivos y no la tabla
+    `Backup`: tras una restauración la tabla es la de la instantánea y puede no
+    nombrar respaldos que siguen en disco. Un manifiesto ilegible detiene la
+    recolección para no borrar sus fragmentos.
+    """
+    en_uso = set()
+    for ruta in manifiestos():
+        en_uso.update(leer_manifiesto(ruta)['fragmentos'])
+
+    borrados = 0
+    raiz = directorio_fragmentos()
+    if not os.path.isdir(raiz):
+        return 0
+    for carpeta, _, archivos in os.walk(raiz):
+        for nombre in archivos:
+            if nombre.endswith(".gz") and nombre[:-3] not in en_uso:
+                os.remove(os.path.join(carpeta, nombre))
+                borrados += 1
+    return borrados
@@ -0,0 +1,219 @@
+# app_backups/diferencias.py
+"""
+Verificación y comparación de respaldos.
+
+Dos instantáneas SQLite (dos respaldos, o un respaldo y la base actual) se abren
+en modo solo lectura y se comparan tabla por tabla sin cargar ninguna en memoria:
+
+1. Una lectura completa de cada tabla por lado resume las filas en rangos de
+   llave primaria (RANGO ids por rango): cuántas filas tiene y una suma de los
+   hashes de cada fila (llave y contenido). Es un árbol de Merkle de un nivel:
+   si el resumen de un rango coincide en los dos lados, el rango es igual.
+2. Solo los rangos que difieren se vuelven a leer, por llave primaria (usa el
+   índice de la pk, no recorre la tabla), para listar las filas agregadas,
+   eliminadas y modificadas.
+
+Las tablas sin llave entera (p. ej. sesiones) se agrupan por hash de la llave;
+sus rangos distintos se detallan en una segunda pasada por esa tabla.
+"""
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from urllib.parse import quote
+
+from . import almacen
+from .utils import copiar_en_linea, sin_progreso, tramo, verificar_integridad
+
+RANGO = 1024
+GRUPOS_SIN_LLAVE_ENTERA = 4096
+# Más rangos distintos que esto en una tabla: se informan los totales sin detalle.
+LIMITE_RANGOS_DETALLADOS = 64
+EJEMPLOS = 10
+_MODULO = 1 << 64
+
+
+@dataclass
+class DiferenciaTabla:
+    tabla: str
+    filas_a: int = 0
+    filas_b: int = 0
+    agregadas: int = 0
+    eliminadas: int = 0
+    modificadas: int = 0
+    solo_en: str = ""                     # "a" o "b" si la tabla existe en un solo lado
+    detalle_completo: bool = True         # False si se superó LIMITE_RANGOS_DETALLADOS
+    ejemplos: dict = field(default_factory=dict)
+
+    @property
+    def igual(self):
+        return not (self.solo_en or self.agregadas or self.eliminadas or self.modificadas or self.filas_a != self.filas_b)
+
+
+def abrir_solo_lectura(ruta):
+    return sqlite3.connect(f"file:{quote(os.path.abspath(ruta))}?mode=ro", uri=True)
+
+
+def _hash_fila(fila) -> int:
+    # hash() de Python basta: los dos lados se resumen en el mismo proceso y el
+    # resultado no se guarda. Es varias veces más rápido que un hash criptográfico.
+    return hash(fila) % _MODULO
+
+
+def tablas(conexion) -> list:
+    """Tablas de datos: sin las internas de SQLite ni las tablas virtuales (FTS) y sus tablas sombra."""
+    filas = conexion.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'").fetchall()
+    virtuales = [nombre for nombre, sql in filas if (sql or "").upper().startswith("CREATE VIRTUAL")]
+    return sorted(
+        nombre for nombre, _ in filas
+        if not nombre.startswith("sqlite_") and nombre not in virtuales
+        and not any(nombre.startswith(f"{virtual}_") for virtual in virtuales)
+    )
+
+
+def _llave(conexion, tabla):
+    """(expresión SQL de la llave, es_entera) de la tabla."""
+    columnas = conexion.execute(f'PRAGMA table_info("{tabla}")').fetchall()
+    pk = sorted((columna[5], columna[1], columna[2]) for columna in columnas if columna[5])
+    if not pk:
+        return "rowid", True
+    if len(pk) == 1:
+        _, nombre, tipo = pk[0]
+        return f'"{nombre}"', "INT" in (tipo or "").upper()
+    return ", ".join(f'"{nombre}"' for _, nombre, _ in pk), False
+
+
+def _grupo(llave, entera):
+    if entera:
+        return llave // RANGO
+    return _hash_fila(llave) % GRUPOS_SIN_LLAVE_ENTERA
+
+
+def _filas(conexion, tabla, expresion, filtro="", parametros=()):
+    """(llave, hash de la fila) de cada fila; la llave compuesta es una tupla."""
+    columnas_llave = expresion.count(",") + 1
+    cursor = conexion.execute(f'SELECT {expresion}, * FROM "{tabla}" {filtro}', parametros)
+    for fila in cursor:
+        llave = fila[0] if columnas_llave == 1 else fila[:columnas_llave]
+        yield llave, _hash_fila(fila)
+
+
+def resumir(conexion, tabla, expresion, entera) -> tuple:
+    """Una pasada por la tabla: (filas, {grupo: (filas, suma de hashes)})."""
+    grupos, total = {}, 0
+    for llave, huella in _filas(conexion, tabla, expresion):
+        grupo = _grupo(llave, entera)
+        cantidad, suma = grupos.get(grupo, (0, 0))
+        grupos[grupo] = (cantidad + 1, (suma + huella) % _MODULO)
+        total += 1
+    return total, grupos
+
+
+def _detalle(conexion, tabla, expresion, entera, grupos) -> dict:
+    """{llave: hash} de las filas de los grupos indicados."""
+    if entera:
+        filas = {}
+        for grupo in grupos:
+            filas.update(_filas(
+                conexion, tabla, expresion, f"WHERE {expresion} >= ? AND {expresion} < ?",
+                (grupo * RANGO, (grupo + 1) * RANGO),
+            ))
+        return filas
+    return {llave: huella for llave, huella in _filas(conexion, tabla, expresion) if _grupo(llave, entera) in grupos}
+
+
+def comparar_tabla(a, b, tabla) -> DiferenciaTabla:
+    expresion, entera = _llave(a, tabla)
+    filas_a, grupos_a = resumir(a, tabla, expresion, entera)
+    filas_b, grupos_b = resumir(b, tabla, expresion, entera)
+    resultado = DiferenciaTabla(tabla, filas_a, filas_b)
+
+    distintos = sorted(grupo for grupo in grupos_a.keys() | grupos_b.keys() if grupos_a.get(grupo) != grupos_b.get(grupo))
+    if not distintos:
+        return resultado
+    if len(distintos) > LIMITE_RANGOS_DETALLADOS:
+        resultado.detalle_completo = False
+        resultado.agregadas = max(0, filas_b - filas_a)
+        resultado.eliminadas = max(0, filas_a - filas_b)
+        return resultado
+
+    detalle_a = _detalle(a, tabla, expresion, entera, distintos)
+    detalle_b = _detalle(b, tabla, expresion, entera, distintos)
+    agregadas = sorted(detalle_b.keys() - detalle_a.keys())
+    eliminadas = sorted(detalle_a.keys() - detalle_b.keys())
+    modificadas = sorted(llave for llave in detalle_a.keys() & detalle_b.keys() if detalle_a[llave] != detalle_b[llave])
+    resultado.agregadas, resultado.eliminadas, resultado.modificadas = len(agregadas), len(eliminadas), len(modificadas)
+    resultado.ejemplos = {
+        nombre: [str(llave) for llave in llaves[:EJEMPLOS]]
+        for nombre, llaves in (('agregadas', agregadas), ('eliminadas', eliminadas), ('modificadas', modificadas))
+        if llaves
+    }
+    return resultado
+
+
+def comparar(ruta_a, ruta_b, progreso=sin_progreso) -> list:
+    """Diferencias tabla por tabla de `ruta_b` respecto de `ruta_a` (archivos SQLite)."""
+    a, b = abrir_solo_lectura(ruta_a), abrir_solo_lectura(ruta_b)
+    try:
+        # Una transacción de lectura por lado: cada instantánea es consistente.
+        a.execute("BEGIN")
+        b.execute("BEGIN")
+        tablas_a, tablas_b = set(tablas(a)), set(tablas(b))
+        todas = sorted(tablas_a | tablas_b)
+        resultado = []
+        for numero, tabla in enumerate(todas, start=1):
+            if tabla not in tablas_b:
+                resultado.append(DiferenciaTabla(tabla, filas_a=_contar(a, tabla), solo_en="a"))
+            elif tabla not in tablas_a:
+                resultado.append(DiferenciaTabla(tabla, filas_b=_contar(b, tabla), solo_en="b"))
+            else:
+                resultado.append(comparar_tabla(a, b, tabla))
+            progreso(numero / len(todas))
+        return resultado
+    finally:
+        a.close()
+        b.close()
+
+
+def _contar(conexion, tabla) -> int:
+    return conexion.execute(f'SELECT COUNT(*) FROM "{tabla}"').fetchone()[0]
+
+
+@contextmanager
+def instantanea(backup=None, progreso=sin_progreso):
+    """
+    Ruta de un archivo SQLite con el contenido de `backup` (reconstruido desde el
+    almacén si es un manifiesto) o, si es None, con una copia en línea de la base
+    actual. Los temporales se borran al salir.
+    """
+    if backup is not None and not almacen.es_manifiesto(backup.ruta):
+        progreso(1)
+        yield backup.ruta
+        return
+
+    descriptor, temporal = tempfile.mkstemp(suffix=".sqlite3")
+    try:
+        if backup is None:
+            os.close(descriptor)
+            copiar_en_linea(temporal, progreso)
+        else:
+            with os.fdopen(descriptor, "wb") as destino:
+                almacen.reconstruir(backup.ruta, destino, progreso)
+        yield temporal
+    finally:
+        os.remove(temporal)
+
+
+def comparar_respaldos(desde, hasta=None, progreso=sin_progreso) -> dict:
+    """
+    Verifica `desde` (un Backup) y lo compara con `hasta` (otro Backup, o la base
+    actual si es None). Devuelve un diccionario serializable en JSON:
+    {problemas, tablas_iguales, tablas: [diferencias de las tablas que cambiaron]}.
+    """
+    with instantanea(desde, tramo(progreso, 0, 0.3)) as ruta_a, \
+            instantanea(hasta, tramo(progreso, 0.3, 0.6)) as ruta_b:
+        problemas = verificar_integridad(ruta_a)
+        diferencias = comparar(ruta_a, ruta_b, tramo(progreso, 0.6, 1))
+    cambios = [asdict(diferencia) for diferencia in diferencias if not diferencia.igual]
+    return {'problemas': problemas, 'tablas_iguales': len(diferencias) - len(cambios), 'tablas': cambios}
@@ -0,0 +1,230 @@
+# app_backups/logico.py
+"""
+Respaldo lógico en streaming, portable entre motores (SQLite, PostgreSQL, MySQL).
+
+A diferencia de `dumpdata`/`loaddata`, que arman todo el JSON en memoria, cada
+modelo se escribe en su propio archivo NDJSON (una fila por línea, como lista de
+valores en el orden de `campos`), leyendo la tabla por lotes con `.iterator()`.
+Un `manifiesto.json` guarda el orden de carga, las columnas y el número de filas:
+
+    logico_20250101_120000/
+        manifiesto.json
+        usuario.usuario.ndjson.gz
+        usuario.usuario_groups.ndjson.gz
+        ...
+
+La restauración reemplaza el contenido de las tablas respaldadas: borra sus filas
+y las vuelve a crear con `bulk_create` por lotes, en orden de dependencias y en
+una sola transacción con la verificación de llaves foráneas diferida hasta el
+final. Las tablas efímeras (sesiones) y las de los propios respaldos se omiten.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from . import almacen
+
+VERSION = 1
+LOTE = 2000
+MANIFIESTO = "manifiesto.json"
+
+# Modelos que no se respaldan: datos efímeros y el registro de los respaldos mismos.
+EXCLUIDOS = {'sessions.session', 'app_backups.backup', 'app_backups.tareabackup'}
+
+
+class RespaldoLogicoInvalido(Exception):
+    """El directorio no es un respaldo lógico válido para los modelos actuales."""
+
+
+def etiqueta(modelo) -> str:
+    return modelo._meta.label_lower
+
+
+def modelos_respaldables() -> list:
+    """Modelos con tabla propia (incluidas las tablas intermedias de M2M), en orden de dependencias."""
+    excluidos = EXCLUIDOS | set(settings.BACKUP_LOGICO_EXCLUIDOS)
+    modelos = [
+        modelo for modelo in apps.get_models(include_auto_created=True)
+        if modelo._meta.managed and not modelo._meta.proxy and etiqueta(modelo) not in excluidos
+    ]
+    return ordenar_por_dependencias(modelos)
+
+
+def ordenar_por_dependencias(modelos) -> list:
+    """
+    Orden topológico por llaves foráneas: cada modelo va después de los que
+    referencia. Las referencias a sí mismo y los ciclos no bloquean el orden
+    (la verificación de llaves foráneas se hace al final de la restauración).
+    """
+    pendientes = {etiqueta(modelo): modelo for modelo in modelos}
+    dependencias = {
+        clave: {
+            etiqueta(campo.related_model) for campo in modelo._meta.concrete_fields
+            if campo.is_relation and campo.related_model is not modelo and etiqueta(campo.related_model) in pendientes
+        }
+        for clave, modelo in pendientes.items()
+    }
+
+    ordenados, colocados = [], set()
+    while pendientes:
+        listos = sorted(clave for clave in pendientes if dependencias[clave] <= colocados)
+        if not listos:
+            # Ciclo: se coloca el de menos dependencias pendientes y se sigue.
+            listos = [min(pendientes, key=lambda clave: (len(dependencias[clave] - colocados), clave))]
+        for clave in listos:
+            ordenados.append(pendientes.pop(clave))
+            colocados.add(clave)
+    return ordenados
+
+
+class _Codificador(DjangoJSONEncoder):
+    """Como DjangoJSONEncoder, pero sin truncar las fechas a milisegundos."""
+
+    def default(self, o):
+        if isinstance(o, (datetime, time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _abrir(ruta, modo):
+    """Abre en texto UTF-8 un archivo del respaldo, comprimido o no según su extensión."""
+    if ruta.endswith(".gz"):
+        return gzip.open(ruta, modo + "t", encoding="utf-8")
+    return open(ruta, modo, encoding="utf-8")
+
+
+def exportar(directorio=None, comprimir=True, lote=LOTE) -> str:
+    """
+    Escribe un respaldo lógico en `directorio` (por defecto uno nuevo dentro de
+    <BACKUPS_DIR>/logicos/) y devuelve su ruta. La lectura se hace dentro de una
+    transacción para que todas las tablas correspondan al mismo instante.
+    """
+    if directorio is None:
+        fecha = datetime.now().strftime("%Y%m%d_%H%M%S")
+        directorio = os.path.join(almacen.directorio_respaldos(), "logicos", f"logico_{fecha}")
+    os.makedirs(directorio, exist_ok=True)
+
+    extension = ".ndjson.gz" if comprimir else ".ndjson"
+    codificador = _Codificador(ensure_ascii=False, separators=(",", ":"))
+    entradas = []
+    with transaction.atomic():
+        for modelo in modelos_respaldables():
+            campos = [campo.attname for campo in modelo._meta.concrete_fields]
+            archivo = etiqueta(modelo) + extension
+            filas = 0
+            with _abrir(os.path.join(directorio, archivo), "w") as salida:
+                consulta = modelo._base_manager.order_by('pk').values_list(*campos)
+                for fila in consulta.iterator(chunk_size=lote):
+                    salida.write(codificador.encode(fila))
+                    salida.write("\n")
+                    filas += 1
+            entradas.append({'modelo': etiqueta(modelo), 'archivo': archivo, 'campos': campos, 'filas': filas})
+
+    manifiesto = {
+        'version': VERSION,
+        'creado_en': datetime.now().isoformat(timespec='seconds'),
+        'motor': connection.vendor,
+        'modelos': entradas,
+    }
+    with open(os.path.join(directorio, MANIFIESTO), "w", encoding="utf-8") as salida:
+        json.dump(manifiesto, salida, ensure_ascii=False, indent=2)
+    return directorio
+
+
+def leer_manifiesto(directorio) -> dict:
+    try:
+        with open(os.path.join(directorio, MANIFIESTO), encoding="utf-8") as entrada:
+            manifiesto = json.load(entrada)
+    except (OSError, ValueError) as e:
+        raise RespaldoLogicoInvalido(f"No se pudo leer {MANIFIESTO} en {directorio}: {e}") from e
+    if manifiesto.get('version') != VERSION:
+        raise RespaldoLogicoInvalido(f"Versión de respaldo lógico no soportada: {manifiesto.get('version')}")
+    return manifiesto
+
+
+def _preparar(entrada):
+    """(modelo, campos del modelo en el orden del archivo) validando que existan."""
+    try:
+        modelo = apps.get_model(entrada['modelo'])
+    except LookupError as e:
+        raise RespaldoLogicoInvalido(f"El modelo {entrada['modelo']} ya no existe.") from e
+    por_attname = {campo.attname: campo for campo in modelo._meta.concrete_fields}
+    faltantes = [nombre for nombre in entrada['campos'] if nombre not in por_attname]
+    if faltantes:
+        raise RespaldoLogicoInvalido(f"{entrada['modelo']}: columnas que ya no existen: {', '.join(faltantes)}")
+    return modelo, [por_attname[nombre] for nombre in entrada['campos']]
+
+
+def _filas(directorio, entrada, campos):
+    with _abrir(os.path.join(directorio, entrada['archivo']), "r") as archivo:
+        for linea in archivo:
+            valores = json.loads(linea)
+            yield {campo.attname: campo.to_python(valor) for campo, valor in zip(campos, valores)}
+
+
+def importar(directorio, lote=LOTE) -> dict:
+    """
+    Restaura un respaldo lógico sobre la base configurada (que ya debe tener las
+    migraciones aplicadas). Devuelve las filas cargadas por modelo.
+    """
+    manifiesto = leer_manifiesto(directorio)
+    preparados = [(entrada, *_preparar(entrada)) for entrada in manifiesto['modelos']]
+    modelos = [modelo for _, modelo, _ in preparados]
+    cargadas = {}
+
+    with transaction.atomic():
+        with connection.constraint_checks_disabled():
+            for modelo in reversed(modelos):
+                modelo._base_manager.all()._raw_delete(connection.alias)
+
+            for entrada, modelo, campos in preparados:
+                total, objetos = 0, []
+                for valores in _filas(directorio, entrada, campos):
+                    objetos.append(modelo(**valores))
+                    if len(objetos) >= lote:
+                        modelo._base_manager.bulk_create(objetos)
+                        total += len(objetos)
+                        objetos = []
+                if objetos:
+                    modelo._base_manager.bulk_create(objetos)
+                    total += len(objetos)
+                cargadas[entrada['modelo']] = total
+
+        connection.check_constraints(table_names=[modelo._meta.db_table for modelo in modelos])
+
+        # Las secuencias de las pk (PostgreSQL, Oracle) deben seguir a los ids cargados.
+        secuencias = connection.ops.sequence_reset_sql(no_style(), modelos)
+        if secuencias:
+            with connection.cursor() as cursor:
+                for sql in secuencias:
+                    cursor.execute(sql)
+
+    invalidar_derivados()
+    return cargadas
+
+
+def invalidar_derivados():
+    """
+    Rehace lo que se deriva de la base: índice de búsqueda, emparejamiento,
+    paneles, recomendación y contadores. Se llama tras cargar datos sin señales
+    (importación lógica) o tras cambiar la base entera (restauración binaria).
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from aprendices import emparejamiento, panel
+    from empresas import recomendacion
+    from gestion import contadores
+    from usuario import busqueda
+
+    ContentType.objects.clear_cache()
+    busqueda.reconstruir()
+    contadores.invalidar()
+    emparejamiento.invalidar()
+    panel.invalidar()
+    recomendacion.invalidar()
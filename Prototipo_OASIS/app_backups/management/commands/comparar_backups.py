@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_backups.almacen import ManifiestoInvalido
+from app_backups.diferencias import comparar_respaldos
+from app_backups.models import Backup
+
+
+class Command(BaseCommand):
+    help = (
+        "Verifica un respaldo y lo compara, tabla por tabla, con otro respaldo o con la base actual: "
+        "filas por tabla y filas agregadas, eliminadas o modificadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('desde', type=int, help="Id del respaldo de referencia.")
+        parser.add_argument('hasta', type=int, nargs='?', help="Id del respaldo a comparar (por defecto, la base actual).")
+
+    def handle(self, *args, **options):
+        desde = self._respaldo(options['desde'])
+        hasta = self._respaldo(options['hasta']) if options['hasta'] is not None else None
+        try:
+            resultado = comparar_respaldos(desde, hasta)
+        except ManifiestoInvalido as e:
+            raise CommandError(f"El respaldo está dañado: {e}") from e
+
+        for problema in resultado['problemas']:
+            self.stdout.write(self.style.ERROR(f"Integridad: {problema}"))
+        for tabla in resultado['tablas']:
+            if tabla['solo_en']:
+                donde = desde.nombre if tabla['solo_en'] == 'a' else (hasta.nombre if hasta else "la base actual")
+                self.stdout.write(f"{tabla['tabla']}: solo existe en {donde}")
+                continue
+            linea = (
+                f"{tabla['tabla']}: {tabla['filas_a']} → {tabla['filas_b']} filas, +{tabla['agregadas']} "
+                f"-{tabla['eliminadas']} ~{tabla['modificadas']}"
+            )
+            if not tabla['detalle_completo']:
+                linea += " (demasiados cambios para detallar)"
+            self.stdout.write(linea)
+            for tipo, llaves in tabla['ejemplos'].items():
+                self.stdout.write(f"    {tipo}: {', '.join(llaves)}")
+
+        estilo = self.style.SUCCESS if not resultado['problemas'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"{len(resultado['tablas'])} tabla(s) con cambios, {resultado['tablas_iguales']} sin cambios."
+        ))
+
+    def _respaldo(self, backup_id):
+        try:
+            return Backup.objects.get(pk=backup_id)
+        except Backup.DoesNotExist:
+            raise CommandError(f"No existe el respaldo #{backup_id}.")
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_backups import retencion
+from app_backups.tareas import OperacionEnCurso
+
+
+class Command(BaseCommand):
+    help = (
+        "Aplica la política de retención de respaldos (horarios, diarios y semanales), "
+        "borra los archivos huérfanos y los fragmentos que ya no se usan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horarios', type=int, help="Respaldos horarios a conservar (BACKUP_RETENCION).")
+        parser.add_argument('--diarios', type=int, help="Respaldos diarios a conservar (BACKUP_RETENCION).")
+        parser.add_argument('--semanales', type=int, help="Respaldos semanales a conservar (BACKUP_RETENCION).")
+        parser.add_argument('--simular', action='store_true', help="Solo informa lo que se borraría.")
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help="Segundos entre corridas. Si es 0 (por defecto) se ejecuta una sola vez."
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+        while True:
+            try:
+                resultado = retencion.aplicar(
+                    options['horarios'], options['diarios'], options['semanales'], simular=options['simular']
+                )
+            except OperacionEnCurso as e:
+                self.stdout.write(self.style.WARNING(f"{e} Se reintentará en la próxima corrida."))
+            else:
+                prefijo = "[simulación] " if options['simular'] else ""
+                self.stdout.write(self.style.SUCCESS(
+                    f"{prefijo}{resultado['conservados']} respaldos conservados, {resultado['podados']} podados, "
+                    f"{resultado['sin_archivo']} filas sin archivo, {resultado['registrados']} archivos sin fila registrados, "
+                    f"{resultado['huerfanos']} archivos huérfanos, {resultado['fragmentos']} fragmentos sin uso."
+                ))
+
+            if not intervalo:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_backups.models import TareaBackup
+from app_backups.tareas import ids_pendientes, procesar_tarea
+
+
+class Command(BaseCommand):
+    help = "Worker que ejecuta los respaldos y restauraciones solicitados desde la lista de respaldos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=int, default=5, help="Segundos de espera cuando no hay tareas pendientes.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa las tareas pendientes y termina.")
+
+    def handle(self, *args, **options):
+        # Las tareas se ejecutan de a una: el bloqueo de respaldos las serializa de todos modos.
+        while True:
+            estado = None
+            for tarea_id in ids_pendientes(limite=1):
+                estado = procesar_tarea(tarea_id)
+                self.stdout.write(f"Tarea de respaldo #{tarea_id}: {estado}")
+
+            # Sin tareas, o con la tarea esperando el bloqueo que tiene otro worker.
+            if estado in (None, TareaBackup.PENDIENTE):
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from app_backups import logico
+
+
+class Command(BaseCommand):
+    help = "Genera un respaldo lógico (NDJSON por modelo, portable entre motores) leyendo las tablas por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', help="Directorio de salida (por defecto BACKUPS_DIR/logicos/logico_<fecha>).")
+        parser.add_argument('--sin-comprimir', action='store_true', help="Escribe .ndjson en lugar de .ndjson.gz.")
+        parser.add_argument('--lote', type=int, default=logico.LOTE, help=f"Filas por lectura (por defecto {logico.LOTE}).")
+
+    def handle(self, *args, **options):
+        directorio = logico.exportar(options['directorio'], comprimir=not options['sin_comprimir'], lote=options['lote'])
+        manifiesto = logico.leer_manifiesto(directorio)
+        filas = sum(entrada['filas'] for entrada in manifiesto['modelos'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Respaldo lógico en {directorio}: {len(manifiesto['modelos'])} modelos, {filas} filas."
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app_backups import logico
+
+
+class Command(BaseCommand):
+    help = (
+        "Restaura un respaldo lógico generado con `respaldo_logico`. Reemplaza el contenido de las "
+        "tablas respaldadas; la base debe tener las migraciones aplicadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directorio', help="Directorio del respaldo lógico (el que contiene manifiesto.json).")
+        parser.add_argument('--lote', type=int, default=logico.LOTE, help=f"Filas por bulk_create (por defecto {logico.LOTE}).")
+        parser.add_argument('--no-input', action='store_true', help="No pide confirmación.")
+
+    def handle(self, *args, **options):
+        try:
+            manifiesto = logico.leer_manifiesto(options['directorio'])
+        except logico.RespaldoLogicoInvalido as e:
+            raise CommandError(str(e))
+
+        if not options['no_input']:
+            respuesta = input(
+                f"Se reemplazarán los datos de {len(manifiesto['modelos'])} tablas con el respaldo del "
+                f"{manifiesto['creado_en']}. Escribe 'si' para continuar: "
+            )
+            if respuesta.strip().lower() not in ('si', 'sí'):
+                raise CommandError("Restauración cancelada.")
+
+        try:
+            cargadas = logico.importar(options['directorio'], lote=options['lote'])
+        except logico.RespaldoLogicoInvalido as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Restauradas {sum(cargadas.values())} filas en {len(cargadas)} tablas."
+        ))
@@ -0,0 +1,42 @@
+# app_backups/middleware.py
+"""
+Reconexión de los workers después de restaurar un respaldo.
+
+La restauración cambia el archivo de la base con os.replace: las conexiones ya
+abiertas en otros procesos siguen leyendo (y escribiendo) el archivo anterior.
+`restaurar_backup` actualiza entonces una marca junto a la base
+(`<base>.generacion`); este middleware la revisa al inicio de cada petición (un
+os.stat) y, si cambió, cierra las conexiones del hilo para que la siguiente
+consulta abra la base nueva.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+from .utils import ruta_generacion
+
+_visto = threading.local()
+
+
+def _generacion(ruta):
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return None
+    return estado.st_ino, estado.st_mtime_ns
+
+
+class ReconexionTrasRestauracionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        actual = _generacion(ruta_generacion(settings.DATABASES['default']['NAME']))
+        previa = getattr(_visto, 'generacion', None)
+        if actual != previa:
+            # Las conexiones de Django son por hilo: cada hilo cierra las suyas.
+            connections.close_all()
+            _visto.generacion = actual
+        return self.get_response(request)
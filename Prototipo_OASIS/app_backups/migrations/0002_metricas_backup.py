@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_backups', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backup',
+            name='duracion',
+            field=models.FloatField(blank=True, help_text='Duración de la copia en segundos', null=True),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='paginas',
+            field=models.PositiveIntegerField(blank=True, help_text='Páginas de SQLite copiadas', null=True),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='velocidad',
+            field=models.FloatField(blank=True, help_text='Velocidad de copia en MB/s', null=True),
+        ),
+    ]
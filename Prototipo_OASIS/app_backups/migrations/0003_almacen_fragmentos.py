@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_backups', '0002_metricas_backup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backup',
+            name='almacenado',
+            field=models.FloatField(blank=True, help_text='MB comprimidos escritos por este respaldo', null=True),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='fragmentos',
+            field=models.PositiveIntegerField(blank=True, help_text='Fragmentos del manifiesto', null=True),
+        ),
+        migrations.AddField(
+            model_name='backup',
+            name='fragmentos_nuevos',
+            field=models.PositiveIntegerField(blank=True, help_text='Fragmentos que no estaban en el almacén', null=True),
+        ),
+        migrations.AlterField(
+            model_name='backup',
+            name='ruta',
+            field=models.FilePathField(match='.*\\.(sqlite3|manifiesto\\.json)$', path='backups/', recursive=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_backups', '0004_tareas_backup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='backup',
+            index=models.Index(fields=['fecha_creacion', 'id'], name='backup_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_backups', '0005_indice_fecha_backup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareabackup',
+            name='contra',
+            field=models.ForeignKey(blank=True, help_text='Respaldo con el que se compara (vacío: la base actual)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='app_backups.backup'),
+        ),
+        migrations.AddField(
+            model_name='tareabackup',
+            name='resultado',
+            field=models.JSONField(blank=True, default=dict, help_text='Diferencias encontradas por una comparación'),
+        ),
+        migrations.AlterField(
+            model_name='tareabackup',
+            name='backup',
+            field=models.ForeignKey(blank=True, help_text='Respaldo a restaurar o comparar, o el respaldo creado por la tarea', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas', to='app_backups.backup'),
+        ),
+        migrations.AlterField(
+            model_name='tareabackup',
+            name='tipo',
+            field=models.CharField(choices=[('CREAR', 'Crear respaldo'), ('RESTAURAR', 'Restaurar respaldo'), ('COMPARAR', 'Comparar respaldo')], max_length=20),
+        ),
+    ]
@@ -1,12 +1,77 @@
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
 class Backup(models.Model):
     nombre = models.CharField(max_length=200)
-    ruta = models.FilePathField(path="backups/", match=".*\.sqlite3$", recursive=True)
+    ruta = models.FilePathField(path="backups/", match=r".*\.(sqlite3|manifiesto\.json)$", recursive=True)
     fecha_creacion = models.DateTimeField(default=timezone.now)
     tamano = models.FloatField(help_text="Tamaño en MB")
+    paginas = models.PositiveIntegerField(null=True, blank=True, help_text="Páginas de SQLite copiadas")
+    duracion = models.FloatField(null=True, blank=True, help_text="Duración de la copia en segundos")
+    velocidad = models.FloatField(null=True, blank=True, help_text="Velocidad de copia en MB/s")
+    fragmentos = models.PositiveIntegerField(null=True, blank=True, help_text="Fragmentos del manifiesto")
+    fragmentos_nuevos = models.PositiveIntegerField(null=True, blank=True, help_text="Fragmentos que no estaban en el almacén")
+    almacenado = models.FloatField(null=True, blank=True, help_text="MB comprimidos escritos por este respaldo")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_creacion', 'id'], name='backup_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} - {self.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S')}"
 
+
+
+class TareaBackup(models.Model):
+    """Creación, restauración o comparación de respaldos, ejecutada por el worker `procesar_backups`."""
+    CREAR = "CREAR"
+    RESTAURAR = "RESTAURAR"
+    COMPARAR = "COMPARAR"
+
+    TIPOS = [
+        (CREAR, "Crear respaldo"),
+        (RESTAURAR, "Restaurar respaldo"),
+        (COMPARAR, "Comparar respaldo"),
+    ]
+
+    PENDIENTE = "PENDIENTE"
+    EN_PROCESO = "EN_PROCESO"
+    COMPLETADO = "COMPLETADO"
+    FALLIDO = "FALLIDO"
+
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_PROCESO, "En proceso"),
+        (COMPLETADO, "Completado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    backup = models.ForeignKey(
+        Backup, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas',
+        help_text="Respaldo a restaurar o comparar, o el respaldo creado por la tarea"
+    )
+    contra = models.ForeignKey(
+        Backup, on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Respaldo con el que se compara (vacío: la base actual)"
+    )
+    resultado = models.JSONField(default=dict, blank=True, help_text="Diferencias encontradas por una comparación")
+    progreso = models.PositiveSmallIntegerField(default=0, help_text="Porcentaje completado")
+    error = models.TextField(blank=True)
+
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='tareas_backup'
+    )
+
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    finalizado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})" #type: ignore
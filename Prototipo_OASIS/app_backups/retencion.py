@@ -0,0 +1,124 @@
+# app_backups/retencion.py
+"""
+Política de retención de respaldos (abuelo-padre-hijo).
+
+Se conserva el respaldo más reciente de cada una de las últimas N horas, N días y
+N semanas (ISO) que tengan respaldos; el resto se borra. Cada corrida lee la
+tabla una vez, decide en memoria (O(número de respaldos)) y borra las filas en
+una sola transacción. Antes vuelve a registrar los respaldos válidos que están en
+disco sin fila (tras una restauración) y borra los manifiestos sin fila que no se
+pueden leer (huérfanos); después borra los archivos podados y los fragmentos que
+ningún manifiesto usa.
+
+Los valores por defecto vienen de BACKUP_RETENCION; el comando `podar_backups`
+la ejecuta una vez o cada cierto intervalo.
+"""
+import os
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import almacen
+from .models import Backup
+from .tareas import bloqueo
+from .utils import archivos_de_respaldo, fila_de_archivo
+
+# Un archivo sin fila más reciente que esto puede ser un respaldo que se está
+# registrando en este momento: no se toca todavía.
+GRACIA_HUERFANOS_SEGUNDOS = 3600
+
+_PERIODOS = {
+    'horarios': lambda fecha: (fecha.date(), fecha.hour),
+    'diarios': lambda fecha: fecha.date(),
+    'semanales': lambda fecha: fecha.isocalendar()[:2],
+}
+
+
+def retencion(**cambios) -> dict:
+    """Cantidades por periodo: las de settings.BACKUP_RETENCION con `cambios` aplicados."""
+    valores = dict(settings.BACKUP_RETENCION)
+    valores.update({periodo: n for periodo, n in cambios.items() if n is not None})
+    return valores
+
+
+def a_conservar(respaldos, horarios, diarios, semanales) -> set:
+    """
+    Ids a conservar entre `respaldos`, pares (id, fecha) ordenados del más reciente
+    al más antiguo. El más reciente se conserva siempre.
+    """
+    cantidades = {'horarios': horarios, 'diarios': diarios, 'semanales': semanales}
+    conservar = {respaldos[0][0]} if respaldos else set()
+    for periodo, cantidad in cantidades.items():
+        clave = _PERIODOS[periodo]
+        vistos = set()
+        for pk, fecha in respaldos:
+            if len(vistos) >= cantidad:
+                break
+            periodo_respaldo = clave(timezone.localtime(fecha))
+            if periodo_respaldo not in vistos:
+                vistos.add(periodo_respaldo)
+                conservar.add(pk)
+    return conservar
+
+
+def _borrar_archivo(ruta):
+    try:
+        os.remove(ruta)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def aplicar(horarios=None, diarios=None, semanales=None, simular=False) -> dict:
+    """
+    Ejecuta una corrida de retención con el bloqueo de respaldos tomado (lanza
+    tareas.OperacionEnCurso si hay un respaldo o restauración en curso).
+    Con `simular` solo informa lo que borraría. Devuelve las cantidades afectadas.
+    """
+    cantidades = retencion(horarios=horarios, diarios=diarios, semanales=semanales)
+
+    with bloqueo(0):
+        # Tras una restauración la tabla es la de la instantánea: los respaldos
+        # válidos que siguen en disco sin fila se vuelven a registrar, y solo se
+        # borran como huérfanos los manifiestos ilegibles o incompletos.
+        registradas = {os.path.abspath(ruta) for ruta in Backup.objects.values_list('ruta', flat=True)}
+        limite = time.time() - GRACIA_HUERFANOS_SEGUNDOS
+        registrados, huerfanos = [], []
+        for entrada in archivos_de_respaldo():
+            if os.path.abspath(entrada.path) in registradas or entrada.stat().st_mtime >= limite:
+                continue
+            try:
+                registrados.append(fila_de_archivo(entrada.path))
+            except almacen.ManifiestoInvalido:
+                huerfanos.append(entrada.path)
+
+        with transaction.atomic():
+            if not simular:
+                Backup.objects.bulk_create(registrados)
+            filas = list(
+                Backup.objects.order_by('-fecha_creacion', '-id').values_list('pk', 'fecha_creacion', 'ruta')
+            )
+            conservar = a_conservar([(pk, fecha) for pk, fecha, _ in filas], **cantidades)
+            podados = [(pk, ruta) for pk, _, ruta in filas if pk not in conservar]
+            sin_archivo = [pk for pk, _, ruta in filas if pk in conservar and not os.path.exists(ruta)]
+            if not simular:
+                Backup.objects.filter(pk__in=[pk for pk, _ in podados] + sin_archivo).delete()
+
+        fragmentos = 0
+        if not simular:
+            for _, ruta in podados:
+                _borrar_archivo(ruta)
+            for ruta in huerfanos:
+                _borrar_archivo(ruta)
+            fragmentos = almacen.recolectar()
+
+    return {
+        'conservados': len(filas) - len(podados) - len(sin_archivo),
+        'podados': len(podados),
+        'sin_archivo': len(sin_archivo),
+        'registrados': len(registrados),
+        'huerfanos': len(huerfanos),
+        'fragmentos': fragmentos,
+    }
@@ -0,0 +1,227 @@
+# app_backups/tareas.py
+"""
+Cola de tareas de respaldo, restauración y comparación fuera del ciclo de la petición.
+
+Las vistas solo registran una `TareaBackup`; el comando `procesar_backups` la
+ejecuta. Un archivo de bloqueo (`<BACKUPS_DIR>/.bloqueo`, creado con O_EXCL)
+garantiza que nunca corran a la vez un respaldo y una restauración, aunque haya
+varios workers.
+
+El avance se publica en `<BACKUPS_DIR>/tareas/<id>.json` y no en la base:
+durante un respaldo, cada escritura en la base obligaría a la API de backup de
+SQLite a reiniciar la copia, y una restauración reemplaza la base donde vive la
+propia tarea. Al terminar, el estado final se guarda también en la base.
+"""
+import json
+import logging
+import os
+from contextlib import contextmanager
+
+from django.db import connections
+from django.utils import timezone
+
+from . import almacen
+from .diferencias import comparar_respaldos
+from .models import Backup, TareaBackup
+from .utils import crear_backup, restaurar_backup
+
+logger = logging.getLogger(__name__)
+
+ACTIVOS = (TareaBackup.PENDIENTE, TareaBackup.EN_PROCESO)
+
+
+class OperacionEnCurso(Exception):
+    """Ya hay un respaldo o una restauración ejecutándose."""
+
+
+# --- Bloqueo ---
+
+def ruta_bloqueo() -> str:
+    return os.path.join(almacen.directorio_respaldos(), ".bloqueo")
+
+
+def _proceso_vivo(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _leer_bloqueo():
+    """(pid, id de tarea) del bloqueo actual, o None si no hay o es ilegible."""
+    try:
+        with open(ruta_bloqueo()) as archivo:
+            pid, tarea_id = archivo.read().split()
+        return int(pid), int(tarea_id)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def bloqueo(tarea_id):
+    """
+    Toma el bloqueo exclusivo de operaciones sobre la base. Si lo dejó un proceso
+    que ya no existe, se libera y su tarea se marca como fallida.
+    """
+    os.makedirs(almacen.directorio_respaldos(), exist_ok=True)
+    for _ in range(2):
+        try:
+            descriptor = os.open(ruta_bloqueo(), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            previo = _leer_bloqueo()
+            if previo is None or _proceso_vivo(previo[0]):
+                raise OperacionEnCurso("Hay otra operación de respaldo o restauración en curso.")
+            logger.warning("Se libera el bloqueo de la tarea #%s (proceso %s terminado)", previo[1], previo[0])
+            _finalizar(previo[1], TareaBackup.FALLIDO, error="El worker se detuvo antes de terminar la tarea.")
+            os.remove(ruta_bloqueo())
+    else:
+        raise OperacionEnCurso("No se pudo tomar el bloqueo de respaldos.")
+
+    try:
+        with os.fdopen(descriptor, "w") as archivo:
+            archivo.write(f"{os.getpid()} {tarea_id}")
+        yield
+    finally:
+        os.remove(ruta_bloqueo())
+
+
+# --- Avance ---
+
+def ruta_avance(tarea_id) -> str:
+    return os.path.join(almacen.directorio_respaldos(), "tareas", f"{tarea_id}.json")
+
+
+def _publicar(tarea, estado, progreso, error=""):
+    datos = {'id': tarea.pk, 'tipo': tarea.tipo, 'estado': estado, 'progreso': progreso, 'error': error}
+    almacen.escribir_atomico(ruta_avance(tarea.pk), json.dumps(datos).encode("utf-8"))
+
+
+def estado(tarea_id):
+    """Estado de una tarea ({id, tipo, estado, progreso, error}) o None si no existe."""
+    try:
+        with open(ruta_avance(tarea_id), "rb") as archivo:
+            return json.loads(archivo.read())
+    except (OSError, ValueError):
+        pass
+    tarea = TareaBackup.objects.filter(pk=tarea_id).first()
+    if tarea is None:
+        return None
+    return {'id': tarea.pk, 'tipo': tarea.tipo, 'estado': tarea.estado, 'progreso': tarea.progreso, 'error': tarea.error}
+
+
+def _finalizar(tarea_id, estado_final, error="", backup=None, tipo=None, resultado=None):
+    """Guarda el estado final en la base (recreando la fila si una restauración la borró)."""
+    valores = {'estado': estado_final, 'error': error, 'finalizado_en': timezone.now()}
+    if estado_final == TareaBackup.COMPLETADO:
+        valores['progreso'] = 100
+    if resultado is not None:
+        valores['resultado'] = resultado
+    if backup is not None and Backup.objects.filter(pk=backup).exists():
+        valores['backup_id'] = backup
+    if tipo is None:
+        TareaBackup.objects.filter(pk=tarea_id).update(**valores)
+    else:
+        TareaBackup.objects.update_or_create(pk=tarea_id, defaults={'tipo': tipo, **valores})
+
+
+def _sincronizar_restaurada(tarea_actual):
+    """
+    La base restaurada trae las tareas tal como estaban al tomar el respaldo (al
+    menos la que lo creó, EN_PROCESO). Con el bloqueo tomado ninguna puede estar
+    corriendo: se les aplica el estado final publicado, y las que quedaron a
+    medias se marcan como fallidas.
+    """
+    activas = TareaBackup.objects.filter(estado__in=ACTIVOS).exclude(pk=tarea_actual)
+    for tarea_id, estado_guardado in activas.values_list('pk', 'estado'):
+        publicado = estado(tarea_id)
+        if publicado and publicado['estado'] in (TareaBackup.COMPLETADO, TareaBackup.FALLIDO):
+            _finalizar(tarea_id, publicado['estado'], error=publicado['error'])
+        elif estado_guardado == TareaBackup.EN_PROCESO:
+            _finalizar(tarea_id, TareaBackup.FALLIDO, error="Interrumpida por una restauración.")
+
+
+# --- Cola ---
+
+def encolar(tipo, backup=None, usuario=None, contra=None) -> TareaBackup:
+    """
+    Registra una tarea, o devuelve la que ya esté pendiente para lo mismo. Una
+    comparación va de `backup` a `contra` (la base actual si es None).
+    """
+    filtro = {'tipo': tipo, 'estado__in': ACTIVOS}
+    if tipo in (TareaBackup.RESTAURAR, TareaBackup.COMPARAR):
+        filtro['backup'] = backup
+    if tipo == TareaBackup.COMPARAR:
+        filtro['contra'] = contra
+    existente = TareaBackup.objects.filter(**filtro).first()
+    if existente:
+        return existente
+    return TareaBackup.objects.create(tipo=tipo, backup=backup, contra=contra, solicitado_por=usuario)
+
+
+def ids_pendientes(limite=None) -> list:
+    ids = TareaBackup.objects.filter(estado=TareaBackup.PENDIENTE).order_by('creado_en').values_list('pk', flat=True)
+    return list(ids[:limite] if limite else ids)
+
+
+def procesar_tarea(tarea_id) -> str:
+    """
+    Ejecuta una tarea pendiente con el bloqueo tomado. Si hay otra operación en
+    curso la tarea queda PENDIENTE para la siguiente vuelta del worker.
+    """
+    try:
+        with bloqueo(tarea_id):
+            reclamada = TareaBackup.objects.filter(pk=tarea_id, estado=TareaBackup.PENDIENTE).update(
+                estado=TareaBackup.EN_PROCESO, iniciado_en=timezone.now()
+            )
+            if not reclamada:
+                return TareaBackup.objects.filter(pk=tarea_id).values_list('estado', flat=True).first() or ""
+            return _ejecutar(TareaBackup.objects.get(pk=tarea_id))
+    except OperacionEnCurso:
+        return TareaBackup.PENDIENTE
+
+
+def _ejecutar(tarea) -> str:
+    ultimo = [-1]
+
+    def avance(fraccion):
+        porcentaje = min(99, int(fraccion * 100))
+        if porcentaje != ultimo[0]:
+            ultimo[0] = porcentaje
+            _publicar(tarea, TareaBackup.EN_PROCESO, porcentaje)
+
+    avance(0)
+    resultado = None
+    try:
+        if tarea.tipo == TareaBackup.CREAR:
+            nombre = crear_backup(progreso=avance)
+            backup = Backup.objects.get(nombre=nombre).pk
+        elif tarea.tipo == TareaBackup.COMPARAR:
+            backup = tarea.backup_id
+            if backup is None:
+                raise RuntimeError("El respaldo a comparar ya no existe.")
+            resultado = {
+                'desde': tarea.backup.nombre,
+                'hasta': tarea.contra.nombre if tarea.contra else "Base actual",
+                **comparar_respaldos(tarea.backup, tarea.contra, progreso=avance),
+            }
+        else:
+            backup = tarea.backup_id
+            if backup is None or not restaurar_backup(backup, progreso=avance):
+                raise RuntimeError("No se pudo restaurar el respaldo.")
+    except Exception as e:
+        logger.exception("Error en la tarea de respaldo #%s", tarea.pk)
+        _publicar(tarea, TareaBackup.FALLIDO, max(ultimo[0], 0), str(e))
+        _finalizar(tarea.pk, TareaBackup.FALLIDO, error=str(e), tipo=tarea.tipo)
+        return TareaBackup.FALLIDO
+
+    if tarea.tipo == TareaBackup.RESTAURAR:
+        # La base cambió debajo de las conexiones abiertas de este proceso.
+        connections.close_all()
+        _sincronizar_restaurada(tarea.pk)
+    _publicar(tarea, TareaBackup.COMPLETADO, 100)
+    _finalizar(tarea.pk, TareaBackup.COMPLETADO, backup=backup, tipo=tarea.tipo, resultado=resultado)
+    return TareaBackup.COMPLETADO
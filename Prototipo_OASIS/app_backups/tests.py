@@ -1,3 +1,552 @@
-from django.test import TestCase
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from empresas.models import SolicitudProyecto
+from gestion import datos_prueba
+from usuario import busqueda
+from usuario.models import Usuario, PerfilAprendiz
+from . import almacen, logico, tareas
+from . import diferencias as diferencias_mod
+from .middleware import ReconexionTrasRestauracionMiddleware
+from .models import Backup, TareaBackup
+from .retencion import a_conservar, aplicar
+from .utils import (
+    crear_backup, eliminar_backup, reemplazar_base, restaurar_backup, ruta_generacion, verificar_integridad,
+)
+
+
+class CrearBackupTests(TransactionTestCase):
+    '''Respaldos en línea con la API de backup de SQLite.'''
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="oasis_backups_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(
+            BACKUPS_DIR=self.directorio, BACKUP_PAUSA_SEGUNDOS=0,
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        for i in range(50):
+            Usuario.objects.create_user(username=f"respaldo{i}", password="x", rol=Usuario.APRENDIZ)
+
+    def reconstruir(self, backup):
+        ruta = os.path.join(self.directorio, f"reconstruido_{backup.pk}.sqlite3")
+        with open(ruta, "wb") as destino:
+            almacen.reconstruir(backup.ruta, destino)
+        return ruta
+
+    def usernames(self, ruta):
+        conexion = sqlite3.connect(ruta)
+        try:
+            return {fila[0] for fila in conexion.execute("SELECT username FROM usuario_usuario")}
+        finally:
+            conexion.close()
+
+    def restaurar(self, backup):
+        """Restaura con `restaurar_backup`; el cambio de archivo se copia sobre la base de pruebas en memoria."""
+        def copiar_sobre_la_base(ruta_nueva, ruta_base):
+            origen = sqlite3.connect(ruta_nueva)
+            try:
+                origen.backup(connection.connection)
+            finally:
+                origen.close()
+            return 0
+
+        directorio_base = tempfile.mkdtemp(prefix="oasis_base_")
+        self.addCleanup(shutil.rmtree, directorio_base, ignore_errors=True)
+        ruta_base = os.path.join(directorio_base, "db.sqlite3")
+        open(ruta_base, "wb").close()
+        with mock.patch.dict(settings.DATABASES['default'], NAME=ruta_base), \
+                mock.patch("app_backups.utils.reemplazar_base", copiar_sobre_la_base):
+            return restaurar_backup(backup.pk)
+
+    def fragmentos_distintos(self, backup):
+        return len(set(almacen.leer_manifiesto(backup.ruta)['fragmentos']))
+
+    def fragmentos_guardados(self):
+        return sum(len(archivos) for _, _, archivos in os.walk(almacen.directorio_fragmentos()))
+
+    def test_registra_paginas_duracion_y_velocidad(self):
+        '''Prueba que el respaldo es íntegro, contiene los datos y guarda sus métricas'''
+        crear_backup()
+
+        backup = Backup.objects.get()
+        ruta = self.reconstruir(backup)
+        self.assertEqual(verificar_integridad(ruta), [])
+        self.assertIn("respaldo49", self.usernames(ruta))
+        self.assertGreater(backup.paginas, 0)
+        self.assertGreater(backup.duracion, 0)
+        self.assertIsNotNone(backup.velocidad)
+
+    @override_settings(BACKUP_PAGINAS_POR_PASO=1)
+    def test_escrituras_entre_pasos(self):
+        '''Prueba que una escritura hecha mientras se copia queda en un respaldo consistente'''
+        escrituras = []
+
+        def escribir_entre_pasos(segundos):
+            if not escrituras:
+                escrituras.append(Usuario.objects.create_user(username="durante", password="x", rol=Usuario.APRENDIZ))
+
+        with mock.patch("app_backups.utils.time.sleep", side_effect=escribir_entre_pasos):
+            crear_backup()
+
+        backup = Backup.objects.get()
+        ruta = self.reconstruir(backup)
+        self.assertEqual(len(escrituras), 1)
+        self.assertEqual(verificar_integridad(ruta), [])
+        self.assertIn("durante", self.usernames(ruta))
+
+    def test_respaldos_consecutivos_comparten_fragmentos(self):
+        '''Prueba que un segundo respaldo casi igual solo guarda los fragmentos que cambiaron'''
+        Usuario.objects.bulk_create([
+            Usuario(username=f"relleno{i}", email=f"relleno{i}@oasis.test", password="x", rol=Usuario.APRENDIZ)
+            for i in range(3000)
+        ])
+        crear_backup()
+        Usuario.objects.filter(username="respaldo0").update(first_name="Cambiado")
+        crear_backup()
+
+        primero, segundo = Backup.objects.order_by('id')
+        self.assertEqual(primero.fragmentos_nuevos, self.fragmentos_distintos(primero))
+        self.assertLessEqual(segundo.fragmentos_nuevos * 4, segundo.fragmentos)
+        self.assertEqual(self.fragmentos_guardados(), primero.fragmentos_nuevos + segundo.fragmentos_nuevos)
+        self.assertEqual(self.usernames(self.reconstruir(segundo)), self.usernames(self.reconstruir(primero)))
+
+    def test_eliminar_borra_solo_fragmentos_huerfanos(self):
+        '''Prueba que al eliminar un respaldo se conservan los fragmentos que usa otro'''
+        crear_backup()
+        Usuario.objects.create_user(username="nuevo", password="x", rol=Usuario.APRENDIZ)
+        crear_backup()
+        primero, segundo = Backup.objects.order_by('id')
+
+        eliminar_backup(primero.pk)
+
+        self.assertEqual(self.fragmentos_guardados(), self.fragmentos_distintos(segundo))
+        self.assertIn("nuevo", self.usernames(self.reconstruir(segundo)))
+
+    def test_eliminar_tras_restaurar_conserva_los_demas(self):
+        '''Prueba que tras restaurar el catálogo sigue los archivos en disco y eliminar uno no borra fragmentos de los demás'''
+        for nombre in ("primero", "segundo", "tercero"):
+            Usuario.objects.create_user(username=nombre, password="x", rol=Usuario.APRENDIZ)
+            crear_backup()
+        primero, segundo, tercero = Backup.objects.order_by('id')
+
+        self.assertTrue(self.restaurar(segundo))
+        self.assertEqual(list(Backup.objects.order_by('id')), [primero, segundo, tercero])
+        self.assertEqual(Backup.objects.get(pk=tercero.pk).paginas, tercero.paginas)
+        self.assertFalse(Usuario.objects.filter(username="tercero").exists())
+        eliminar_backup(primero.pk)
+
+        self.assertTrue(self.restaurar(tercero))
+        self.assertTrue(Usuario.objects.filter(username="tercero").exists())
+        self.assertEqual(list(Backup.objects.order_by('id')), [segundo, tercero])
+        self.assertEqual(verificar_integridad(self.reconstruir(segundo)), [])
+
+    def test_fragmento_danado(self):
+        '''Prueba que la reconstrucción falla si un fragmento no coincide con su hash'''
+        crear_backup()
+        backup = Backup.objects.get()
+        huella = almacen.leer_manifiesto(backup.ruta)['fragmentos'][0]
+        with open(almacen.ruta_fragmento(huella), "wb") as archivo:
+            archivo.write(gzip.compress(b"otro contenido"))
+
+        with self.assertRaises(almacen.ManifiestoInvalido):
+            self.reconstruir(backup)
+
+
+class TareasBackupTests(TransactionTestCase):
+    '''Tareas de respaldo en segundo plano, con avance y bloqueo.'''
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="oasis_backups_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(
+            BACKUPS_DIR=self.directorio, BACKUP_PAUSA_SEGUNDOS=0,
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.admin = Usuario.objects.create_superuser(username="admin_backups", email="a@oasis.test", password="x")
+        self.client.force_login(self.admin)
+
+    def test_crear_en_segundo_plano(self):
+        '''Prueba que la vista encola el respaldo y el worker lo crea informando su avance'''
+        respuesta = self.client.post(reverse('crear_backup'))
+        self.assertEqual(respuesta.status_code, 302)
+        tarea = TareaBackup.objects.get()
+        self.assertEqual(tarea.estado, TareaBackup.PENDIENTE)
+        self.assertEqual(Backup.objects.count(), 0)
+
+        call_command('procesar_backups', '--una-vez', stdout=StringIO())
+
+        tarea.refresh_from_db()
+        self.assertEqual(tarea.estado, TareaBackup.COMPLETADO)
+        self.assertEqual(tarea.backup, Backup.objects.get())
+        estado = self.client.get(reverse('estado_tarea_backup', args=[tarea.pk])).json()
+        self.assertEqual((estado['estado'], estado['progreso']), (TareaBackup.COMPLETADO, 100))
+        self.assertFalse(os.path.exists(tareas.ruta_bloqueo()))
+
+    def test_bloqueo_impide_operaciones_simultaneas(self):
+        '''Prueba que una tarea espera mientras otra operación tiene el bloqueo'''
+        primera = tareas.encolar(TareaBackup.CREAR)
+        backup = Backup.objects.create(nombre="b.manifiesto.json", ruta="b.manifiesto.json", tamano=0)
+        segunda = tareas.encolar(TareaBackup.RESTAURAR, backup=backup)
+
+        with tareas.bloqueo(primera.pk):
+            self.assertEqual(tareas.procesar_tarea(segunda.pk), TareaBackup.PENDIENTE)
+        segunda.refresh_from_db()
+        self.assertEqual(segunda.estado, TareaBackup.PENDIENTE)
+
+    def test_bloqueo_de_proceso_terminado(self):
+        '''Prueba que el bloqueo de un worker muerto se libera y su tarea queda como fallida'''
+        colgada = TareaBackup.objects.create(tipo=TareaBackup.CREAR, estado=TareaBackup.EN_PROCESO)
+        nueva = TareaBackup.objects.create(tipo=TareaBackup.CREAR)
+        with open(tareas.ruta_bloqueo(), "w") as archivo:
+            archivo.write(f"999999999 {colgada.pk}")
+
+        with self.assertLogs('app_backups.tareas', 'WARNING'):
+            self.assertEqual(tareas.procesar_tarea(nueva.pk), TareaBackup.COMPLETADO)
+        colgada.refresh_from_db()
+        self.assertEqual(colgada.estado, TareaBackup.FALLIDO)
+
+    def test_restaurar_requiere_post(self):
+        '''Prueba que restaurar por GET no hace nada y por POST solo encola la tarea'''
+        backup = Backup.objects.create(nombre="b.manifiesto.json", ruta="b.manifiesto.json", tamano=0)
+        url = reverse('restaurar_backup', args=[backup.pk])
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertEqual(self.client.post(url).status_code, 302)
+        self.assertEqual(self.client.post(url).status_code, 302)
+        tarea = TareaBackup.objects.get()
+        self.assertEqual((tarea.tipo, tarea.backup, tarea.estado), (TareaBackup.RESTAURAR, backup, TareaBackup.PENDIENTE))
+
+    def test_comparar_con_base_actual(self):
+        '''Prueba que la comparación de un respaldo con la base actual se muestra en la lista de respaldos'''
+        backup = Backup.objects.get(nombre=crear_backup())
+        nuevo = Usuario.objects.create_user(username="despues_del_respaldo", email="d@oasis.test", password="x")
+
+        self.client.post(reverse('comparar_backup', args=[backup.pk]), {'contra': 'actual'})
+        call_command('procesar_backups', '--una-vez', stdout=StringIO())
+
+        tarea = TareaBackup.objects.get(tipo=TareaBackup.COMPARAR)
+        self.assertEqual(tarea.estado, TareaBackup.COMPLETADO)
+        usuarios = next(tabla for tabla in tarea.resultado['tablas'] if tabla['tabla'] == 'usuario_usuario')
+        self.assertEqual((usuarios['agregadas'], usuarios['eliminadas']), (1, 0))
+        self.assertEqual(usuarios['ejemplos']['agregadas'], [str(nuevo.pk)])
+        self.assertEqual(tarea.resultado['problemas'], [])
+        self.assertContains(self.client.get(reverse('lista_backups')), 'usuario_usuario')
+
+
+class DiferenciasTests(SimpleTestCase):
+    '''Comparación de instantáneas SQLite por rangos de llave.'''
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="oasis_diferencias_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def crear(self, nombre, filas, extra=""):
+        ruta = os.path.join(self.directorio, nombre)
+        conexion = sqlite3.connect(ruta)
+        conexion.executescript(
+            "CREATE TABLE dato (id INTEGER PRIMARY KEY, valor TEXT);"
+            "CREATE TABLE sesion (clave TEXT PRIMARY KEY, datos TEXT);"
+            "CREATE VIRTUAL TABLE indice USING fts5(texto);" + extra
+        )
+        conexion.executemany("INSERT INTO dato VALUES (?, ?)", filas)
+        conexion.execute("INSERT INTO sesion VALUES ('abc', ?)", [nombre])
+        conexion.commit()
+        conexion.close()
+        return ruta
+
+    def test_filas_agregadas_eliminadas_y_modificadas(self):
+        '''Prueba que se detectan las filas que cambiaron y las tablas que existen en un solo lado'''
+        filas = [(pk, f"v{pk}") for pk in range(1, 5001)]
+        a = self.crear("a.sqlite3", filas)
+        cambiadas = [(pk, "otro" if pk == 2001 else valor) for pk, valor in filas if pk != 10]
+        b = self.crear("b.sqlite3", cambiadas + [(9000, "nuevo")], extra="CREATE TABLE extra (x);")
+
+        diferencias = {d.tabla: d for d in diferencias_mod.comparar(a, b)}
+
+        self.assertNotIn('indice', diferencias)
+        self.assertFalse(any(tabla.startswith('indice_') for tabla in diferencias))
+        dato = diferencias['dato']
+        self.assertEqual((dato.filas_a, dato.filas_b), (5000, 5000))
+        self.assertEqual((dato.agregadas, dato.eliminadas, dato.modificadas), (1, 1, 1))
+        self.assertEqual(dato.ejemplos, {'agregadas': ['9000'], 'eliminadas': ['10'], 'modificadas': ['2001']})
+        self.assertEqual(diferencias['sesion'].modificadas, 1)
+        self.assertEqual(diferencias['extra'].solo_en, 'b')
+
+    def test_solo_relee_los_rangos_distintos(self):
+        '''Prueba que cada tabla se recorre una vez y solo se vuelven a leer los rangos que difieren'''
+        filas = [(pk, "x") for pk in range(1, 20001)]
+        a = self.crear("a.sqlite3", filas)
+        b = self.crear("b.sqlite3", filas[:-1] + [(20000, "y")])
+        consultas = []
+        abrir = diferencias_mod.abrir_solo_lectura
+
+        def abrir_con_registro(ruta):
+            conexion = abrir(ruta)
+            conexion.set_trace_callback(consultas.append)
+            return conexion
+
+        with mock.patch.object(diferencias_mod, 'abrir_solo_lectura', abrir_con_registro):
+            diferencias = {d.tabla: d for d in diferencias_mod.comparar(a, b)}
+
+        self.assertEqual(diferencias['dato'].modificadas, 1)
+        lecturas = [sql for sql in consultas if 'FROM "dato"' in sql]
+        self.assertEqual(len([sql for sql in lecturas if 'WHERE' not in sql]), 2)
+        self.assertEqual(len([sql for sql in lecturas if 'WHERE' in sql]), 2)
+
+
+class ReemplazoBaseTests(SimpleTestCase):
+    '''Cambio atómico del archivo de la base al restaurar.'''
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="oasis_restaurar_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.base = self.crear("db.sqlite3", "actual")
+        self.nueva = self.crear("nueva.sqlite3", "respaldo")
+
+    def crear(self, nombre, valor):
+        ruta = os.path.join(self.directorio, nombre)
+        conexion = sqlite3.connect(ruta)
+        conexion.execute("CREATE TABLE dato (valor TEXT)")
+        conexion.execute("INSERT INTO dato VALUES (?)", [valor])
+        conexion.commit()
+        conexion.close()
+        return ruta
+
+    def valores(self, ruta):
+        conexion = sqlite3.connect(ruta)
+        try:
+            return [fila[0] for fila in conexion.execute("SELECT valor FROM dato")]
+        finally:
+            conexion.close()
+
+    def test_reemplazo_y_marca_de_generacion(self):
+        '''Prueba que la base se reemplaza de forma atómica y cambia la marca de generación'''
+        bloqueo = reemplazar_base(self.nueva, self.base)
+
+        self.assertEqual(self.valores(self.base), ["respaldo"])
+        self.assertFalse(os.path.exists(self.nueva))
+        self.assertTrue(os.path.exists(ruta_generacion(self.base)))
+        self.assertLess(bloqueo, 1)
+
+    def test_espera_escrituras_en_curso(self):
+        '''Prueba que el cambio espera a que termine una transacción de escritura de otra conexión'''
+        escritor = sqlite3.connect(self.base, isolation_level=None, check_same_thread=False)
+        escritor.execute("BEGIN IMMEDIATE")
+        escritor.execute("INSERT INTO dato VALUES ('en curso')")
+        termino = threading.Timer(0.3, lambda: escritor.execute("COMMIT"))
+        termino.start()
+        inicio = time.perf_counter()
+
+        reemplazar_base(self.nueva, self.base)
+
+        termino.join()
+        escritor.close()
+        self.assertGreaterEqual(time.perf_counter() - inicio, 0.25)
+        self.assertEqual(self.valores(self.base), ["respaldo"])
+        self.assertFalse(os.path.exists(self.base + "-journal"))
+        self.assertEqual(verificar_integridad(self.base), [])
+
+    def test_middleware_reconecta_tras_cambio_de_generacion(self):
+        '''Prueba que el middleware cierra las conexiones del hilo solo cuando cambia la generación'''
+        middleware = ReconexionTrasRestauracionMiddleware(lambda request: "respuesta")
+        marca = mock.patch("app_backups.middleware.ruta_generacion", return_value=ruta_generacion(self.base))
+        with marca, mock.patch("app_backups.middleware.connections") as conexiones:
+            middleware(None)
+            conexiones.close_all.reset_mock()
+            middleware(None)
+            self.assertFalse(conexiones.close_all.called)
+
+            reemplazar_base(self.nueva, self.base)
+            conexiones.close_all.reset_mock()
+            middleware(None)
+            middleware(None)
+            self.assertEqual(conexiones.close_all.call_count, 1)
+
+
+class RetencionTests(TestCase):
+    '''Poda de respaldos abuelo-padre-hijo.'''
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="oasis_retencion_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(BACKUPS_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def respaldo(self, antiguedad):
+        nombre = f"backup_{Backup.objects.count():04d}.sqlite3"
+        ruta = os.path.join(self.directorio, nombre)
+        open(ruta, "wb").close()
+        return Backup.objects.create(nombre=nombre, ruta=ruta, tamano=0, fecha_creacion=timezone.now() - antiguedad)
+
+    def archivo_antiguo(self, nombre, contenido):
+        ruta = os.path.join(self.directorio, nombre)
+        with open(ruta, "wb") as archivo:
+            archivo.write(contenido)
+        os.utime(ruta, (time.time() - 2 * 3600,) * 2)
+        return ruta
+
+    def test_a_conservar(self):
+        '''Prueba que se conserva el más reciente de cada hora, día y semana dentro de los límites'''
+        ahora = timezone.now()
+        respaldos = [(i, ahora - timedelta(hours=i)) for i in range(24 * 60)]
+
+        conservar = a_conservar(respaldos, horarios=24, diarios=7, semanales=4)
+
+        self.assertTrue(set(range(24)) <= conservar)
+        dias = {timezone.localtime(respaldos[i][1]).date() for i in conservar}
+        semanas = {timezone.localtime(respaldos[i][1]).isocalendar()[:2] for i in conservar}
+        self.assertGreaterEqual(len(dias), 7)
+        self.assertEqual(len(semanas), 4)
+        self.assertLessEqual(len(conservar), 24 + 7 + 4)
+        self.assertEqual(a_conservar(respaldos, 0, 0, 0), {0})
+
+    def test_aplicar(self):
+        '''Prueba que la poda borra filas y archivos, las filas sin archivo y los archivos huérfanos'''
+        respaldos = [self.respaldo(timedelta(days=i)) for i in range(30)]
+        os.remove(respaldos[1].ruta)
+        huerfano = self.archivo_antiguo("backup_huerfano.manifiesto.json", b"{")
+        reciente = os.path.join(self.directorio, "backup_registrandose.sqlite3")
+        open(reciente, "wb").close()
+
+        resultado = aplicar(horarios=0, diarios=7, semanales=0)
+
+        self.assertEqual(resultado, {
+            'conservados': 6, 'podados': 23, 'sin_archivo': 1, 'registrados': 0, 'huerfanos': 1, 'fragmentos': 0,
+        })
+        self.assertFalse(os.path.exists(huerfano))
+        conservados = [respaldos[i].pk for i in (0, 2, 3, 4, 5, 6)]
+        self.assertEqual(sorted(Backup.objects.values_list('pk', flat=True)), conservados)
+        self.assertEqual(
+            sorted(os.listdir(self.directorio)),
+            sorted([os.path.basename(respaldos[i].ruta) for i in (0, 2, 3, 4, 5, 6)] + ["backup_registrandose.sqlite3"]),
+        )
+
+    def test_registra_respaldos_sin_fila(self):
+        '''Prueba que un manifiesto válido sin fila se vuelve a registrar y solo se borra el ilegible'''
+        manifiesto = {'version': almacen.VERSION_MANIFIESTO, 'tamano': 2 * 1024 * 1024, 'tamano_fragmento': 4096,
+                      'sha256': "", 'fragmentos': []}
+        valido = self.archivo_antiguo("backup_20000101_080000_000000.manifiesto.json", json.dumps(manifiesto).encode())
+        roto = self.archivo_antiguo("backup_20000102_080000_000000.manifiesto.json", b"{")
+
+        resultado = aplicar(horarios=0, diarios=7, semanales=0)
+
+        self.assertEqual((resultado['registrados'], resultado['huerfanos'], resultado['conservados']), (1, 1, 1))
+        backup = Backup.objects.get()
+        self.assertEqual((backup.ruta, backup.tamano), (valido, 2))
+        self.assertEqual(timezone.localtime(backup.fecha_creacion).replace(tzinfo=None).isoformat(), "2000-01-01T08:00:00")
+        self.assertTrue(os.path.exists(valido))
+        self.assertFalse(os.path.exists(roto))
+
+    def test_consultas_constantes(self):
+        '''Prueba que una corrida hace las mismas consultas con 10 que con 40 respaldos'''
+        def consultas(cantidad):
+            Backup.objects.all().delete()
+            for i in range(cantidad):
+                self.respaldo(timedelta(days=i))
+            with CaptureQueriesContext(connection) as capturadas:
+                aplicar(horarios=0, diarios=3, semanales=0)
+            return len(capturadas)
+
+        self.assertEqual(consultas(10), consultas(40))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RespaldoLogicoTests(TestCase):
+    '''Respaldo lógico NDJSON en streaming.'''
+
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp(prefix="oasis_logico_")
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def estado(self):
+        return (
+            list(Usuario.objects.order_by('pk').values_list('pk', 'username', 'first_name', 'date_joined', 'password')),
+            list(PerfilAprendiz.objects.order_by('pk').values_list('pk', 'documento', 'programa_id')),
+            list(SolicitudProyecto.aprendices.through.objects.order_by('pk').values_list('pk', 'solicitudproyecto_id', 'perfilaprendiz_id')),
+        )
+
+    def test_ida_y_vuelta(self):
+        '''Prueba que restaurar un respaldo lógico devuelve las tablas al estado respaldado'''
+        datos_prueba.sembrar(usuarios=60, proyectos_por_empresa=2, postulaciones_por_aprendiz=1)
+        aprendiz = PerfilAprendiz.objects.select_related('usuario').first()
+        Usuario.objects.filter(pk=aprendiz.pk).update(first_name="Ñandú Müller 😀")
+        SolicitudProyecto.objects.first().aprendices.add(aprendiz)
+        Session.objects.create(session_key="sesionvigente", session_data="x", expire_date=timezone.now() + timedelta(days=1))
+        antes = self.estado()
+
+        logico.exportar(self.directorio)
+        Usuario.objects.filter(pk=aprendiz.pk).delete()
+        Usuario.objects.filter(username="usuario000002").update(first_name="Cambiado")
+        Usuario.objects.create_user(username="posterior", password="x", rol=Usuario.APRENDIZ)
+
+        logico.importar(self.directorio, lote=7)
+
+        self.assertEqual(self.estado(), antes)
+        self.assertTrue(Session.objects.filter(session_key="sesionvigente").exists())
+        self.assertEqual(busqueda.buscar("Ñandú"), [aprendiz.pk])
+
+    def test_orden_de_dependencias(self):
+        '''Prueba que cada modelo se carga después de los modelos que referencia'''
+        orden = [logico.etiqueta(modelo) for modelo in logico.modelos_respaldables()]
+
+        self.assertLess(orden.index('usuario.usuario'), orden.index('usuario.perfilaprendiz'))
+        self.assertLess(orden.index('usuario.perfilaprendiz'), orden.index('empresas.postulacion'))
+        self.assertLess(orden.index('empresas.solicitudproyecto'), orden.index('empresas.solicitudproyecto_aprendices'))
+        self.assertNotIn('sessions.session', orden)
+        self.assertNotIn('app_backups.backup', orden)
+
+    def test_memoria_acotada(self):
+        '''Prueba que la memoria del respaldo no crece con el número de filas'''
+        def pico(usuarios):
+            Usuario.objects.bulk_create([
+                Usuario(username=f"memoria{usuarios}_{i}", email=f"m{usuarios}_{i}@oasis.test", password="x")
+                for i in range(usuarios)
+            ])
+            tracemalloc.start()
+            try:
+                logico.exportar(os.path.join(self.directorio, str(usuarios)), lote=200)
+                return tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        self.assertLess(pico(8000), pico(1000) * 1.5)
+
+    def test_columnas_desconocidas(self):
+        '''Prueba que un respaldo con columnas que el modelo ya no tiene se rechaza sin tocar la base'''
+        Usuario.objects.create_user(username="intacto", password="x")
+        logico.exportar(self.directorio, comprimir=False)
+        ruta = os.path.join(self.directorio, logico.MANIFIESTO)
+        with open(ruta, encoding="utf-8") as archivo:
+            manifiesto = json.load(archivo)
+        manifiesto['modelos'][0]['campos'].append("columna_eliminada")
+        with open(ruta, "w", encoding="utf-8") as archivo:
+            json.dump(manifiesto, archivo)
+
+        with self.assertRaises(logico.RespaldoLogicoInvalido):
+            logico.importar(self.directorio)
+        self.assertTrue(Usuario.objects.filter(username="intacto").exists())
@@ -6,4 +6,6 @@ urlpatterns = [
     path('crear/', views.crear_backup_view, name='crear_backup'),
     path('eliminar/<int:backup_id>/', views.eliminar_backup_view, name='eliminar_backup'),
     path('restaurar/<int:backup_id>/', views.restaurar_backup_view, name='restaurar_backup'),
+    path('comparar/<int:backup_id>/', views.comparar_backup_view, name='comparar_backup'),
+    path('tareas/<int:tarea_id>/estado/', views.estado_tarea_view, name='estado_tarea_backup'),
 ]
@@ -1,31 +1,205 @@
+import logging
 import os
 import shutil
+import sqlite3
+import tempfile
+import time
 from datetime import datetime
 from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from . import almacen
+from .logico import invalidar_derivados
 from .models import Backup
 
-def crear_backup():
-    backup_dir = os.path.join(settings.BASE_DIR, "backups")
-    os.makedirs(backup_dir, exist_ok=True)
+logger = logging.getLogger(__name__)
+
+
+class BackupInvalido(Exception):
+    """El respaldo no se pudo generar o no superó la verificación de integridad."""
+
+
+def verificar_integridad(ruta):
+    """Devuelve la lista de problemas de `PRAGMA integrity_check` (vacía si está sano)."""
+    conexion = sqlite3.connect(ruta)
+    try:
+        filas = [fila[0] for fila in conexion.execute("PRAGMA integrity_check")]
+    finally:
+        conexion.close()
+    return [] if filas == ["ok"] else filas
+
 
-    db_path = settings.DATABASES['default']['NAME']
+def sin_progreso(fraccion):
+    """Callback de progreso por defecto: no hace nada."""
 
-    fecha = datetime.now().strftime("%Y%m%d_%H%M%S")
-    nombre_archivo = f"backup_{fecha}.sqlite3"
+
+def tramo(progreso, desde, hasta):
+    """Reescala un callback de progreso 0..1 al tramo [desde, hasta] del total."""
+    return lambda fraccion: progreso(desde + (hasta - desde) * fraccion)
+
+
+def copiar_en_linea(ruta_destino, progreso=sin_progreso):
+    """
+    Copia la base en uso con la API de backup de SQLite (`Connection.backup`).
+    Cada paso toma un bloqueo de lectura solo mientras copia sus páginas; entre
+    pasos se duerme para que las escrituras de otras conexiones avancen. Si la
+    base cambia a mitad de copia, SQLite reinicia el paso afectado, así que el
+    resultado es siempre una foto consistente. Devuelve el total de páginas.
+    """
+    paginas_por_paso = settings.BACKUP_PAGINAS_POR_PASO
+    pausa = settings.BACKUP_PAUSA_SEGUNDOS
+    totales = []
+
+    def paso(estado, restantes, total):
+        totales.append(total)
+        progreso((total - restantes) / total if total else 1)
+        if restantes:
+            time.sleep(pausa)
+
+    # Conexión propia: no comparte la transacción de la petición en curso.
+    origen = connection.get_new_connection(connection.get_connection_params())
+    destino = sqlite3.connect(ruta_destino)
+    try:
+        origen.backup(destino, pages=paginas_por_paso, progress=paso)
+    finally:
+        destino.close()
+        origen.close()
+    return totales[-1] if totales else 0
+
+
+def _tamano_pagina(ruta):
+    conexion = sqlite3.connect(ruta)
+    try:
+        return conexion.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conexion.close()
+
+
+def crear_backup(progreso=sin_progreso):
+    """
+    Genera un respaldo consistente de la base SQLite sin detener el sistema y lo
+    guarda en el almacén deduplicado (ver almacen.py): solo se escriben los
+    fragmentos que no estaban ya guardados por otro respaldo. Lanza
+    BackupInvalido si el motor no es SQLite o la copia no pasa `PRAGMA integrity_check`.
+    `progreso` recibe la fracción completada (0 a 1) a medida que avanza.
+    """
+    if connection.vendor != 'sqlite':
+        raise BackupInvalido("Los respaldos solo están disponibles para bases SQLite.")
+
+    backup_dir = almacen.directorio_respaldos()
+    os.makedirs(backup_dir, exist_ok=True)
+
+    fecha = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    nombre_archivo = f"backup_{fecha}{almacen.EXTENSION_MANIFIESTO}"
     ruta_backup = os.path.join(backup_dir, nombre_archivo)
 
-    shutil.copy2(db_path, ruta_backup)
-    tamano_mb = os.path.getsize(ruta_backup) / (1024 * 1024)
+    # La instantánea se toma en un archivo temporal, se verifica y se fragmenta.
+    descriptor, ruta_parcial = tempfile.mkstemp(dir=backup_dir, suffix=".parcial")
+    os.close(descriptor)
+    try:
+        inicio = time.perf_counter()
+        paginas = copiar_en_linea(ruta_parcial, tramo(progreso, 0, 0.6))
+
+        problemas = verificar_integridad(ruta_parcial)
+        if problemas:
+            raise BackupInvalido("El respaldo no pasó la verificación de integridad: " + "; ".join(problemas[:5]))
+        progreso(0.7)
+        estadisticas = almacen.guardar(
+            ruta_parcial, ruta_backup, _tamano_pagina(ruta_parcial), tramo(progreso, 0.7, 1)
+        )
+        duracion = time.perf_counter() - inicio
+    except sqlite3.Error as e:
+        raise BackupInvalido(f"No se pudo copiar la base de datos: {e}") from e
+    finally:
+        if os.path.exists(ruta_parcial):
+            os.remove(ruta_parcial)
+
+    tamano_mb = estadisticas['tamano'] / (1024 * 1024)
 
     Backup.objects.create(
         nombre=nombre_archivo,
         ruta=ruta_backup,
-        tamano=round(tamano_mb, 2)
+        tamano=round(tamano_mb, 2),
+        paginas=paginas,
+        duracion=round(duracion, 4),
+        velocidad=round(tamano_mb / duracion, 2) if duracion > 0 else None,
+        fragmentos=estadisticas['fragmentos'],
+        fragmentos_nuevos=estadisticas['fragmentos_nuevos'],
+        almacenado=round(estadisticas['bytes_nuevos'] / (1024 * 1024), 4),
     )
 
     return nombre_archivo
 
 
+def archivos_de_respaldo():
+    """Entradas (os.DirEntry) de los manifiestos y respaldos .sqlite3 de BACKUPS_DIR."""
+    directorio = almacen.directorio_respaldos()
+    if not os.path.isdir(directorio):
+        return
+    with os.scandir(directorio) as entradas:
+        for entrada in entradas:
+            if entrada.is_file() and (almacen.es_manifiesto(entrada.name) or entrada.name.endswith(".sqlite3")):
+                yield entrada
+
+
+def _fecha_de_nombre(nombre):
+    marca = nombre.split(".", 1)[0].removeprefix("backup_")
+    for formato in ("%Y%m%d_%H%M%S_%f", "%Y%m%d_%H%M%S"):
+        try:
+            return timezone.make_aware(datetime.strptime(marca, formato))
+        except ValueError:
+            pass
+    return None
+
+
+def fila_de_archivo(ruta) -> Backup:
+    """
+    Fila del catálogo (sin guardar) para un archivo de respaldo que no la tiene,
+    con lo que se puede leer del propio archivo. Lanza almacen.ManifiestoInvalido
+    si el manifiesto es ilegible o le faltan fragmentos.
+    """
+    nombre = os.path.basename(ruta)
+    fecha = _fecha_de_nombre(nombre) or datetime.fromtimestamp(os.path.getmtime(ruta), tz=timezone.get_current_timezone())
+    fragmentos = None
+    if almacen.es_manifiesto(ruta):
+        manifiesto = almacen.leer_manifiesto(ruta)
+        faltantes = [huella for huella in manifiesto['fragmentos'] if not os.path.exists(almacen.ruta_fragmento(huella))]
+        if faltantes:
+            raise almacen.ManifiestoInvalido(f"Faltan {len(faltantes)} fragmentos del manifiesto {ruta}")
+        tamano, fragmentos = manifiesto['tamano'], len(manifiesto['fragmentos'])
+    else:
+        tamano = os.path.getsize(ruta)
+    return Backup(
+        nombre=nombre, ruta=ruta, fecha_creacion=fecha, tamano=round(tamano / (1024 * 1024), 2), fragmentos=fragmentos,
+    )
+
+
+def sincronizar_catalogo(conocidos=()) -> int:
+    """
+    Ajusta la tabla `Backup` a los archivos de BACKUPS_DIR: borra las filas sin
+    archivo y registra los archivos sin fila. `conocidos` son filas (`values()`)
+    leídas antes de una restauración: se recrean con su id y sus métricas; los
+    demás archivos se registran con `fila_de_archivo`. Devuelve cuántas filas creó.
+    """
+    archivos = {os.path.abspath(entrada.path): entrada.path for entrada in archivos_de_respaldo()}
+    previas = {os.path.abspath(fila['ruta']): fila for fila in conocidos}
+    with transaction.atomic():
+        actuales = {os.path.abspath(ruta): pk for pk, ruta in Backup.objects.values_list('pk', 'ruta')}
+        Backup.objects.filter(pk__in=[pk for ruta, pk in actuales.items() if ruta not in archivos]).delete()
+        sin_fila = archivos.keys() - actuales.keys()
+        # Primero las filas conocidas, para que un id nuevo no ocupe uno de los suyos.
+        Backup.objects.bulk_create([Backup(**previas[ruta]) for ruta in sin_fila if ruta in previas])
+        creadas = len(sin_fila & previas.keys())
+        for ruta in sin_fila - previas.keys():
+            try:
+                fila_de_archivo(archivos[ruta]).save()
+            except almacen.ManifiestoInvalido:
+                logger.warning("No se registró el respaldo %s", archivos[ruta], exc_info=True)
+                continue
+            creadas += 1
+    return creadas
+
+
 def eliminar_backup(backup_id):
     """Elimina el archivo físico y su registro en BD"""
     try:
@@ -33,36 +207,107 @@ def eliminar_backup(backup_id):
         if os.path.exists(backup.ruta):
             os.remove(backup.ruta)
         backup.delete()
-        return True
     except Backup.DoesNotExist:
         return False
 
+    # Los fragmentos son compartidos: solo se borran los que ya nadie usa. Si hay
+    # un respaldo en curso (que puede estar reutilizando fragmentos) se dejan para
+    # la siguiente corrida de `podar_backups`.
+    from .tareas import bloqueo, OperacionEnCurso
+    try:
+        with bloqueo(0):
+            almacen.recolectar()
+    except OperacionEnCurso:
+        logger.info("Respaldo en curso: los fragmentos huérfanos se recolectarán en la próxima poda")
+    except almacen.ManifiestoInvalido:
+        logger.exception("No se recolectaron los fragmentos huérfanos")
+    return True
+
 
-def restaurar_backup(backup_id):
-    """Restaura la base de datos a un respaldo anterior"""
-    from pathlib import Path
-    backup = Backup.objects.get(id=backup_id)
-    db_path = settings.DATABASES['default']['NAME']
+def ruta_generacion(ruta_base) -> str:
+    """Marca que cambia en cada restauración; ver app_backups/middleware.py."""
+    return f"{ruta_base}.generacion"
 
-    # Convertir a string por compatibilidad con Pathlib (Windows/Linux)
-    db_path = str(db_path)
 
-    # Hacemos copia de seguridad del estado actual antes de sobrescribir
-    copia_seguridad_actual = db_path + ".temp"
-    shutil.copy2(db_path, copia_seguridad_actual)
+def _marcar_generacion(ruta_base):
+    almacen.escribir_atomico(ruta_generacion(ruta_base), f"{time.time_ns()}\n".encode("ascii"))
 
+
+def reemplazar_base(ruta_nueva, ruta_base):
+    """
+    Sustituye el archivo `ruta_base` por `ruta_nueva` (en el mismo directorio) de
+    forma atómica con os.replace y devuelve los segundos que la base estuvo bloqueada.
+
+    Se cierran las conexiones de este proceso y se toma un bloqueo EXCLUSIVE sobre
+    la base actual: así se espera a que terminen las escrituras en curso de otros
+    procesos y ninguna queda con un journal a medias que SQLite aplicaría sobre el
+    archivo nuevo. Después se cambia la marca de generación para que los demás
+    workers cierren sus conexiones, que siguen apuntando al archivo anterior.
+    """
+    # El archivo nuevo queda en modo rollback-journal, como la base del proyecto.
+    nueva = sqlite3.connect(ruta_nueva)
     try:
-        # Reemplazar base de datos con el respaldo seleccionado
-        shutil.copy2(backup.ruta, db_path)
-        return True
-    except Exception as e:
-        # En caso de error, restauramos la copia temporal
-        shutil.copy2(copia_seguridad_actual, db_path)
-        print(f"Error al restaurar: {e}")
-        return False
+        nueva.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        nueva.close()
+
+    connections.close_all()
+    actual = sqlite3.connect(ruta_base, timeout=30, isolation_level=None)
+    try:
+        if os.path.exists(f"{ruta_base}-wal"):
+            actual.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        actual.execute("BEGIN EXCLUSIVE")
+        inicio = time.perf_counter()
+        os.replace(ruta_nueva, ruta_base)
+        actual.execute("ROLLBACK")
+        bloqueo = time.perf_counter() - inicio
     finally:
-        # Eliminar copia temporal si existe
-        if os.path.exists(copia_seguridad_actual):
-            os.remove(copia_seguridad_actual)
+        actual.close()
+
+    _marcar_generacion(ruta_base)
+    return bloqueo
+
+
+def restaurar_backup(backup_id, progreso=sin_progreso):
+    """
+    Restaura la base de datos a un respaldo anterior. El respaldo se reconstruye
+    en un archivo temporal junto a la base y se verifica con `PRAGMA integrity_check`;
+    solo entonces se cambia por la base actual (ver `reemplazar_base`), de modo
+    que la base queda bloqueada unos milisegundos y nunca a medio copiar.
+    """
+    backup = Backup.objects.get(id=backup_id)
+    db_path = str(settings.DATABASES['default']['NAME'])
+    if connection.vendor != 'sqlite' or not os.path.isfile(db_path):
+        logger.error("Solo se pueden restaurar bases SQLite en archivo (%s)", db_path)
+        return False
+
+    descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(db_path)), suffix=".restaurando")
+    try:
+        with os.fdopen(descriptor, "wb") as destino:
+            if almacen.es_manifiesto(backup.ruta):
+                almacen.reconstruir(backup.ruta, destino, tramo(progreso, 0, 0.8))
+            else:
+                with open(backup.ruta, "rb") as origen:
+                    shutil.copyfileobj(origen, destino)
 
+        problemas = verificar_integridad(temporal)
+        if problemas:
+            raise BackupInvalido("El respaldo no pasó la verificación de integridad: " + "; ".join(problemas[:5]))
+        progreso(0.9)
 
+        catalogo = list(Backup.objects.values())
+        bloqueo = reemplazar_base(temporal, db_path)
+        logger.info("Respaldo %s restaurado (base bloqueada %.1f ms)", backup.nombre, bloqueo * 1000)
+        # La tabla de respaldos es la de la instantánea (ni siquiera incluye el
+        # restaurado) y las cachés (contadores, paneles, índices en memoria)
+        # describen la base anterior.
+        sincronizar_catalogo(catalogo)
+        invalidar_derivados()
+        progreso(1)
+        return True
+    except Exception:
+        logger.exception("Error al restaurar el respaldo %s", backup.nombre)
+        return False
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
@@ -1,19 +1,26 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from .models import Backup
-from .utils import crear_backup, eliminar_backup, restaurar_backup
+from django.db.models import Q
+from django.http import JsonResponse, Http404
+from django.views.decorators.http import require_POST
+from .models import Backup, TareaBackup
+from .utils import eliminar_backup
+from . import tareas
+from usuario.paginacion import paginar
 from django.contrib.admin.views.decorators import staff_member_required
 
 
+@staff_member_required
 def lista_backups(request):
-    backups = Backup.objects.all().order_by('-fecha_creacion')
-    return render(request, "app_backups/backup_list.html", {"backups": backups})
+    backups = paginar(request, Backup.objects.all(), 20, orden=('-fecha_creacion', '-id'), contar=True)
+    tareas_recientes = TareaBackup.objects.select_related('backup', 'contra')[:5]
+    return render(request, "app_backups/backup_list.html", {"backups": backups, "tareas": tareas_recientes})
 
 @staff_member_required
 def crear_backup_view(request):
     if request.method == "POST":
-        nombre = crear_backup()
-        messages.success(request, f"Respaldo '{nombre}' creado exitosamente.")
+        tarea = tareas.encolar(TareaBackup.CREAR, usuario=request.user)
+        messages.success(request, f"Respaldo en cola (tarea #{tarea.pk}). Puedes seguir su avance en esta página.")
     return redirect("lista_backups")
 
 @staff_member_required
@@ -24,10 +31,38 @@ def eliminar_backup_view(request, backup_id):
         messages.error(request, "No se pudo eliminar el respaldo.")
     return redirect("lista_backups")
 
+@staff_member_required
+@require_POST
 def restaurar_backup_view(request, backup_id):
-    if restaurar_backup(backup_id):
-        messages.success(request, "✅ Base de datos restaurada correctamente.")
+    backup = get_object_or_404(Backup, pk=backup_id)
+    tarea = tareas.encolar(TareaBackup.RESTAURAR, backup=backup, usuario=request.user)
+    messages.warning(request, f"♻️ Restauración de '{backup.nombre}' en cola (tarea #{tarea.pk}).")
+    return redirect("lista_backups")
+
+@staff_member_required
+@require_POST
+def comparar_backup_view(request, backup_id):
+    """Encola la comparación del respaldo con la base actual, o la del respaldo anterior con este."""
+    backup = get_object_or_404(Backup, pk=backup_id)
+    if request.POST.get("contra") == "anterior":
+        anterior = (
+            Backup.objects.filter(
+                Q(fecha_creacion__lt=backup.fecha_creacion) | Q(fecha_creacion=backup.fecha_creacion, id__lt=backup.pk)
+            ).order_by('-fecha_creacion', '-id').first()
+        )
+        if anterior is None:
+            messages.error(request, f"'{backup.nombre}' no tiene un respaldo anterior con el cual compararse.")
+            return redirect("lista_backups")
+        tarea = tareas.encolar(TareaBackup.COMPARAR, backup=anterior, contra=backup, usuario=request.user)
     else:
-        messages.error(request, "❌ Error al restaurar el respaldo.")
+        tarea = tareas.encolar(TareaBackup.COMPARAR, backup=backup, usuario=request.user)
+    messages.info(request, f"Comparación en cola (tarea #{tarea.pk}). El resultado aparecerá en esta página.")
     return redirect("lista_backups")
 
+@staff_member_required
+def estado_tarea_view(request, tarea_id):
+    """Avance de una tarea de respaldo en JSON, consultado periódicamente desde la lista de respaldos."""
+    estado = tareas.estado(tarea_id)
+    if estado is None:
+        raise Http404("La tarea no existe")
+    return JsonResponse(estado)
@@ -0,0 +1,122 @@
+# aprendices/emparejamiento.py
+"""
+Índice de emparejamiento aprendiz ↔ proyecto para "Proyectos disponibles".
+
+Filtrar los proyectos aprobados del programa con
+`.exclude(postulaciones_aprendices__aprendiz=...)` obliga a una subconsulta
+correlacionada sobre todas las postulaciones en cada visita. En su lugar se
+guardan en la caché de Django dos listas:
+
+- por programa, las claves de orden de sus proyectos APROBADOS
+  (`(-creado_en en µs, -id)`, ascendentes: el orden del listado);
+- por aprendiz, los ids de los proyectos a los que ya se postuló.
+
+La página es entonces una diferencia de conjuntos en memoria y un `in_bulk` de
+los proyectos de la página. Las señales de `aprendices.signals` descartan la
+lista afectada al confirmarse una aprobación, edición o postulación, y la
+siguiente lectura la reconstruye con una consulta indexada. `invalidar()`
+descarta todo el índice (por ejemplo, tras restaurar un respaldo lógico).
+
+Las listas expiran tras EMPAREJAMIENTO_TTL_SEGUNDOS como red de seguridad ante
+una lectura que se cruce con una invalidación.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from empresas.models import SolicitudProyecto, Postulacion
+from usuario.utils import marca_generacion, renovar_generacion
+
+PREFIJO = "oasis:emparejamiento:"
+CLAVE_GENERACION = PREFIJO + "generacion"
+APROBADO = "APROBADO"
+TTL_POR_DEFECTO = 3600
+
+
+def clave_orden(creado_en, pk) -> tuple:
+    """Clave ascendente equivalente a ordenar por ('-creado_en', '-id')."""
+    return (-(int(creado_en.timestamp()) * 1_000_000 + creado_en.microsecond), -pk)
+
+
+def id_de_clave(clave) -> int:
+    return -clave[1]
+
+
+def _generacion() -> str:
+    return marca_generacion(CLAVE_GENERACION)
+
+
+def _ttl() -> int:
+    return getattr(settings, 'EMPAREJAMIENTO_TTL_SEGUNDOS', TTL_POR_DEFECTO)
+
+
+def _clave_programa(generacion, programa_id) -> str:
+    return f"{PREFIJO}{generacion}:programa:{programa_id}"
+
+
+def _clave_aprendiz(generacion, aprendiz_id) -> str:
+    return f"{PREFIJO}{generacion}:aprendiz:{aprendiz_id}"
+
+
+def _abiertos_bd(programa_id) -> list:
+    filas = SolicitudProyecto.objects.filter(
+        programa_formativo_id=programa_id, estado=APROBADO
+    ).values_list('creado_en', 'pk')
+    return sorted(clave_orden(creado_en, pk) for creado_en, pk in filas)
+
+
+def _postulados_bd(aprendiz_id) -> list:
+    return list(Postulacion.objects.filter(aprendiz_id=aprendiz_id).values_list('proyecto_id', flat=True))
+
+
+def disponibles(aprendiz) -> list:
+    """
+    Claves de orden (ver `clave_orden`) de los proyectos aprobados del programa
+    del aprendiz a los que aún no se ha postulado, en el orden del listado.
+    """
+    generacion = _generacion()
+    clave_programa = _clave_programa(generacion, aprendiz.programa_id)
+    clave_aprendiz = _clave_aprendiz(generacion, aprendiz.pk)
+    cacheados = cache.get_many([clave_programa, clave_aprendiz])
+
+    abiertos = cacheados.get(clave_programa)
+    if abiertos is None:
+        abiertos = _abiertos_bd(aprendiz.programa_id)
+        cache.set(clave_programa, abiertos, timeout=_ttl())
+    postulados = cacheados.get(clave_aprendiz)
+    if postulados is None:
+        postulados = _postulados_bd(aprendiz.pk)
+        cache.set(clave_aprendiz, postulados, timeout=_ttl())
+
+    postulados = set(postulados)
+    return [clave for clave in abiertos if id_de_clave(clave) not in postulados]
+
+
+def proyectos(claves) -> list:
+    """Los proyectos de una página de claves, en ese orden, con un solo `in_bulk`."""
+    por_id = SolicitudProyecto.objects.para_listado().in_bulk([id_de_clave(clave) for clave in claves])
+    return [por_id[id_de_clave(clave)] for clave in claves if id_de_clave(clave) in por_id]
+
+
+# --- Invalidación ---
+
+def invalidar_programas(programa_ids) -> None:
+    generacion = _generacion()
+    cache.delete_many([_clave_programa(generacion, programa_id) for programa_id in set(programa_ids)])
+
+
+def invalidar_aprendices(aprendiz_ids) -> None:
+    generacion = _generacion()
+    cache.delete_many([_clave_aprendiz(generacion, aprendiz_id) for aprendiz_id in set(aprendiz_ids)])
+
+
+def proyectos_cambiados(ids) -> None:
+    """Para cambios hechos con update() (sin señales): descarta los programas de esos proyectos."""
+    invalidar_programas(
+        SolicitudProyecto.objects.filter(pk__in=list(ids)).values_list('programa_formativo_id', flat=True).distinct()
+    )
+
+
+def invalidar() -> None:
+    """Descarta todo el índice: las claves de la generación anterior dejan de leerse."""
+    renovar_generacion(CLAVE_GENERACION)
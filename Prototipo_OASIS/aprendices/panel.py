@@ -0,0 +1,136 @@
+# aprendices/panel.py
+"""
+Datos del panel del aprendiz (`dashboard_aprendiz`).
+
+Los proyectos del panel son la unión de los asignados (M2M
+`SolicitudProyecto.aprendices`) y aquellos a los que se postuló. Antes se
+cargaban ambas listas completas, se unían en un dict de Python y se consultaban
+otra vez las postulaciones. Ahora salen de una sola consulta:
+
+- `pk IN (asignados) OR pk IN (postulados)`, que SQLite resuelve con dos
+  búsquedas por índice (MULTI-INDEX OR) sin recorrer la tabla de proyectos;
+- `Exists`/`Subquery` añaden si está asignado y el estado de su postulación;
+- una ventana `COUNT(*) OVER ()` da el total, de modo que solo se traen los
+  LIMITE más recientes y la memoria no crece con el historial del aprendiz.
+
+El resultado (un `Panel` con tuplas simples) se guarda en la caché por aprendiz.
+Las señales de `aprendices.signals` lo descartan al confirmarse una
+postulación, una asignación o un cambio en uno de sus proyectos, y expira tras
+PANEL_APRENDIZ_TTL_SEGUNDOS como red de seguridad.
+"""
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Q, Subquery, Window, Count
+
+from empresas.models import SolicitudProyecto, Postulacion
+from usuario.utils import marca_generacion, renovar_generacion
+
+PREFIJO = "oasis:panel_aprendiz:"
+CLAVE_GENERACION = PREFIJO + "generacion"
+TTL_POR_DEFECTO = 600
+LIMITE = 20
+
+Asignacion = SolicitudProyecto.aprendices.through
+
+
+@dataclass(frozen=True)
+class ProyectoPanel:
+    id: int
+    nombre: str
+    estado: str
+    empresa: str
+    programa: str
+    asignado: bool
+    estado_postulacion: str  # "" si solo está asignado
+
+
+@dataclass
+class Panel:
+    proyectos: list = field(default_factory=list)
+    total: int = 0
+
+    @property
+    def empresas(self) -> int:
+        """Empresas distintas entre los proyectos asignados del panel."""
+        return len({p.empresa for p in self.proyectos if p.asignado})
+
+
+def _generacion() -> str:
+    return marca_generacion(CLAVE_GENERACION)
+
+
+def _clave(generacion, aprendiz_id) -> str:
+    return f"{PREFIJO}{generacion}:{aprendiz_id}"
+
+
+def consulta(aprendiz_id):
+    """Proyectos asignados o postulados del aprendiz, anotados, en una sola consulta."""
+    asignados = Asignacion.objects.filter(perfilaprendiz_id=aprendiz_id).values('solicitudproyecto_id')
+    postulados = Postulacion.objects.filter(aprendiz_id=aprendiz_id).values('proyecto_id')
+    return (
+        SolicitudProyecto.objects
+        .filter(Q(pk__in=asignados) | Q(pk__in=postulados))
+        .annotate(
+            asignado=Exists(Asignacion.objects.filter(
+                solicitudproyecto_id=OuterRef('pk'), perfilaprendiz_id=aprendiz_id,
+            )),
+            estado_postulacion=Subquery(Postulacion.objects.filter(
+                proyecto_id=OuterRef('pk'), aprendiz_id=aprendiz_id,
+            ).values('estado')[:1]),
+            total=Window(Count('pk')),
+        )
+        .order_by('-creado_en', '-pk')
+        .values_list(
+            'pk', 'nombre', 'estado', 'empresa__razon_social', 'programa_formativo__nombre',
+            'asignado', 'estado_postulacion', 'total',
+        )
+    )
+
+
+def _desde_bd(aprendiz_id) -> Panel:
+    panel = Panel()
+    for pk, nombre, estado, empresa, programa, asignado, estado_postulacion, total in consulta(aprendiz_id)[:LIMITE]:
+        panel.total = total
+        panel.proyectos.append(ProyectoPanel(
+            pk, nombre, estado, empresa or "", programa or "", bool(asignado), estado_postulacion or "",
+        ))
+    return panel
+
+
+def panel(aprendiz) -> Panel:
+    """El panel del aprendiz, desde la caché o con una consulta si no está."""
+    clave = _clave(_generacion(), aprendiz.pk)
+    datos = cache.get(clave)
+    if datos is None:
+        datos = _desde_bd(aprendiz.pk)
+        cache.set(clave, datos, timeout=getattr(settings, 'PANEL_APRENDIZ_TTL_SEGUNDOS', TTL_POR_DEFECTO))
+    return datos
+
+
+# --- Invalidación ---
+
+def invalidar_aprendices(aprendiz_ids) -> None:
+    generacion = _generacion()
+    cache.delete_many([_clave(generacion, aprendiz_id) for aprendiz_id in set(aprendiz_ids)])
+
+
+def aprendices_de(proyecto_ids) -> set:
+    """Aprendices cuyo panel muestra alguno de esos proyectos (asignados o postulados)."""
+    proyecto_ids = list(proyecto_ids)
+    return set(
+        Asignacion.objects.filter(solicitudproyecto_id__in=proyecto_ids).values_list('perfilaprendiz_id', flat=True)
+    ) | set(
+        Postulacion.objects.filter(proyecto_id__in=proyecto_ids).values_list('aprendiz_id', flat=True)
+    )
+
+
+def proyectos_cambiados(ids) -> None:
+    """Para cambios hechos con update() (sin señales): descarta los paneles que muestran esos proyectos."""
+    invalidar_aprendices(aprendices_de(ids))
+
+
+def invalidar() -> None:
+    """Descarta todos los paneles cacheados."""
+    renovar_generacion(CLAVE_GENERACION)
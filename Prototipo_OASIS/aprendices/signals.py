@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+
+from usuario.models import ProgramaFormativo, PerfilEmpresa
+from empresas.models import SolicitudProyecto, Postulacion
+from . import emparejamiento, panel
+
+
+def _al_confirmar(funcion, ids):
+    """El índice solo se descarta cuando el cambio ya es visible para quien lo reconstruya."""
+    transaction.on_commit(lambda: funcion(ids))
+
+
+def _guardar_programa_previo(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        instance._programa_previo = (
+            SolicitudProyecto.objects.filter(pk=instance.pk).values_list('programa_formativo_id', flat=True).first()
+        )
+
+
+def _proyecto_cambiado(sender, instance, **kwargs):
+    # Aprobación, rechazo, edición o baja: cambia la lista del programa (y la del anterior, si se movió).
+    programas = {instance.programa_formativo_id, getattr(instance, '_programa_previo', instance.programa_formativo_id)}
+    _al_confirmar(emparejamiento.invalidar_programas, programas)
+
+
+def _postulacion_cambiada(sender, instance, **kwargs):
+    _al_confirmar(emparejamiento.invalidar_aprendices, [instance.aprendiz_id])
+    _al_confirmar(panel.invalidar_aprendices, [instance.aprendiz_id])
+
+
+def _proyecto_del_panel_cambiado(sender, instance, **kwargs):
+    # Nombre, estado, empresa o programa: cambia en el panel de quienes lo tienen.
+    _al_confirmar(panel.proyectos_cambiados, [instance.pk])
+
+
+def _guardar_aprendices_previos(sender, instance, **kwargs):
+    # Al borrar el proyecto sus asignaciones desaparecen sin señales: se recogen antes.
+    instance._aprendices_panel = panel.aprendices_de([instance.pk])
+
+
+def _proyecto_del_panel_eliminado(sender, instance, **kwargs):
+    _al_confirmar(panel.invalidar_aprendices, getattr(instance, '_aprendices_panel', ()))
+
+
+def _asignacion_cambiada(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse:
+        # instance es el aprendiz.
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _al_confirmar(panel.invalidar_aprendices, [instance.pk])
+    elif action == 'pre_clear':
+        instance._aprendices_panel = set(instance.aprendices.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        _al_confirmar(panel.invalidar_aprendices, getattr(instance, '_aprendices_panel', ()))
+    elif action in ('post_add', 'post_remove'):
+        _al_confirmar(panel.invalidar_aprendices, pk_set or ())
+
+
+def _empresa_cambiada(sender, instance, created, **kwargs):
+    # El panel muestra la razón social de la empresa de cada proyecto.
+    if not created:
+        transaction.on_commit(lambda: panel.proyectos_cambiados(
+            list(SolicitudProyecto.objects.filter(empresa=instance).values_list('pk', flat=True))
+        ))
+
+
+def _programa_eliminado(sender, instance, **kwargs):
+    # Los proyectos del programa pasan a NULL con un UPDATE, sin señales propias.
+    transaction.on_commit(emparejamiento.invalidar)
+
+
+pre_save.connect(_guardar_programa_previo, sender=SolicitudProyecto, dispatch_uid="emparejamiento_pre_save_proyecto")
+post_save.connect(_proyecto_cambiado, sender=SolicitudProyecto, dispatch_uid="emparejamiento_post_save_proyecto")
+post_delete.connect(_proyecto_cambiado, sender=SolicitudProyecto, dispatch_uid="emparejamiento_post_delete_proyecto")
+post_save.connect(_postulacion_cambiada, sender=Postulacion, dispatch_uid="emparejamiento_post_save_postulacion")
+post_delete.connect(_postulacion_cambiada, sender=Postulacion, dispatch_uid="emparejamiento_post_delete_postulacion")
+post_delete.connect(_programa_eliminado, sender=ProgramaFormativo, dispatch_uid="emparejamiento_post_delete_programa")
+
+post_save.connect(_proyecto_del_panel_cambiado, sender=SolicitudProyecto, dispatch_uid="panel_post_save_proyecto")
+pre_delete.connect(_guardar_aprendices_previos, sender=SolicitudProyecto, dispatch_uid="panel_pre_delete_proyecto")
+post_delete.connect(_proyecto_del_panel_eliminado, sender=SolicitudProyecto, dispatch_uid="panel_post_delete_proyecto")
+m2m_changed.connect(_asignacion_cambiada, sender=SolicitudProyecto.aprendices.through, dispatch_uid="panel_asignacion")
+post_save.connect(_empresa_cambiada, sender=PerfilEmpresa, dispatch_uid="panel_post_save_empresa")
@@ -1,3 +1,220 @@
-from django.test import TestCase
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from usuario import utils
+from usuario.models import Usuario, PerfilAprendiz, ProgramaFormativo
+from empresas.models import Postulacion
+from gestion import datos_prueba, decisiones
+from . import emparejamiento, panel
+
+
+class ProyectosDisponiblesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.programa = datos_prueba.programa()
+        otro = datos_prueba.programa("Cocina", "1", ProgramaFormativo.TECNICO)
+        empresa = datos_prueba.empresa()
+        self.usuario = Usuario.objects.create_user(username="aprendiz1", password="x", rol=Usuario.APRENDIZ)
+        self.aprendiz = PerfilAprendiz.objects.create(
+            usuario=self.usuario, documento="1001", ficha="2900001", programa=self.programa,
+        )
+
+        self.aprobados = [datos_prueba.proyecto(empresa, self.programa, f"Proyecto {i}") for i in range(14)]
+        self.pendiente = datos_prueba.proyecto(empresa, self.programa, "Por revisar", "PENDIENTE")
+        datos_prueba.proyecto(empresa, otro, "De otro programa")
+        self.client.force_login(self.usuario)
+
+    def nombres(self, respuesta):
+        return [p.nombre for p in respuesta.context['proyectos']]
+
+    def test_indice_cacheado_y_paginado(self):
+        '''Prueba que el listado sale del índice cacheado, en orden y paginado con cursor'''
+        url = reverse('aprendices:ver_proyectos')
+        primera = self.client.get(url)
+        self.assertEqual(self.nombres(primera), [f"Proyecto {i}" for i in range(13, 1, -1)])
+        self.assertEqual(primera.context['proyectos'].total, 14)
+
+        segunda = self.client.get(url + primera.context['proyectos'].url_siguiente)
+        self.assertEqual(self.nombres(segunda), ["Proyecto 1", "Proyecto 0"])
+        self.assertFalse(segunda.context['proyectos'].has_next)
+        anterior = self.client.get(url + segunda.context['proyectos'].url_anterior)
+        self.assertEqual(self.nombres(anterior), self.nombres(primera))
+
+        # Con el índice caliente no se consulta ni proyectos aprobados ni postulaciones.
+        with self.assertNumQueries(0):
+            claves = emparejamiento.disponibles(self.aprendiz)
+        self.assertEqual(len(claves), 14)
+
+    def test_aprobacion_y_postulacion_actualizan_el_indice(self):
+        '''Prueba que aprobar un proyecto o postularse se refleja en los proyectos disponibles'''
+        url = reverse('aprendices:ver_proyectos')
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            decisiones.decidir({decisiones.APROBADO: {self.pendiente.pk: "Cumple"}})
+        with self.captureOnCommitCallbacks(execute=True):
+            Postulacion.objects.create(aprendiz=self.aprendiz, proyecto=self.aprobados[13])
+
+        nombres = self.nombres(self.client.get(url))
+        self.assertEqual(nombres[0], "Por revisar")
+        self.assertNotIn("Proyecto 13", nombres)
+        self.assertEqual(len(emparejamiento.disponibles(self.aprendiz)), 14)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.aprobados[0].estado = "COMPLETADO"
+            self.aprobados[0].save()
+        self.assertEqual(len(emparejamiento.disponibles(self.aprendiz)), 13)
+
+
+class PanelAprendizTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        programa = datos_prueba.programa()
+        self.empresa = datos_prueba.empresa()
+        self.empresa.razon_social = "Acme"
+        self.empresa.save()
+        usuario = Usuario.objects.create_user(username="aprendiz1", password="x", rol=Usuario.APRENDIZ)
+        self.aprendiz = PerfilAprendiz.objects.create(usuario=usuario, documento="1001", ficha="2900001", programa=programa)
+        self.proyectos = [datos_prueba.proyecto(self.empresa, programa, f"Proyecto {i}") for i in range(3)]
+        self.client.force_login(usuario)
+
+    def test_union_sin_duplicados_en_una_consulta(self):
+        '''Prueba que el panel une asignados y postulados sin duplicar y con una sola consulta'''
+        asignado, ambos, postulado = self.proyectos
+        with self.captureOnCommitCallbacks(execute=True):
+            asignado.aprendices.add(self.aprendiz)
+            ambos.aprendices.add(self.aprendiz)
+            Postulacion.objects.create(aprendiz=self.aprendiz, proyecto=ambos, estado="ACEPTADA")
+            Postulacion.objects.create(aprendiz=self.aprendiz, proyecto=postulado)
+
+        with self.assertNumQueries(1):
+            datos = panel._desde_bd(self.aprendiz.pk)
+        self.assertEqual(datos.total, 3)
+        self.assertEqual(
+            [(p.nombre, p.asignado, p.estado_postulacion, p.empresa) for p in datos.proyectos],
+            [("Proyecto 2", False, "PENDIENTE", "Acme"), ("Proyecto 1", True, "ACEPTADA", "Acme"),
+             ("Proyecto 0", True, "", "Acme")],
+        )
+
+        respuesta = self.client.get(reverse('aprendices:dashboard_aprendiz'))
+        self.assertContains(respuesta, "Postulado")
+        self.assertContains(respuesta, "Acme")
+        # Con el panel en caché no se repite la consulta de proyectos.
+        with self.assertNumQueries(0):
+            panel.panel(self.aprendiz)
+
+    def test_cambios_descartan_el_panel(self):
+        '''Prueba que postularse, ser asignado o renombrar el proyecto se refleja en el panel'''
+        self.assertEqual(panel.panel(self.aprendiz).total, 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Postulacion.objects.create(aprendiz=self.aprendiz, proyecto=self.proyectos[0])
+        self.assertEqual(panel.panel(self.aprendiz).total, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.aprendiz.solicitudes_asignadas.add(self.proyectos[1])
+        self.assertEqual(panel.panel(self.aprendiz).total, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyectos[1].nombre = "Renombrado"
+            self.proyectos[1].save()
+        self.assertIn("Renombrado", [p.nombre for p in panel.panel(self.aprendiz).proyectos])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.proyectos[1].aprendices.clear()
+        self.assertEqual(panel.panel(self.aprendiz).total, 1)
+
+
+class PostularProyectoTests(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        programa = datos_prueba.programa()
+        self.usuario = Usuario.objects.create_user(username="aprendiz1", password="x", rol=Usuario.APRENDIZ)
+        self.aprendiz = PerfilAprendiz.objects.create(
+            usuario=self.usuario, documento="1001", ficha="2900001", programa=programa,
+        )
+        self.proyecto = datos_prueba.proyecto(datos_prueba.empresa(), programa)
+        self.url = reverse('aprendices:postular_proyecto', args=[self.proyecto.pk])
+
+    def cliente(self):
+        cliente = Client()
+        cliente.force_login(self.usuario)
+        return cliente
+
+    def test_un_insert_solo_post_e_idempotente(self):
+        '''Prueba que postularse es un solo INSERT, exige POST y repite la respuesta con la misma clave'''
+        cliente = self.cliente()
+        self.assertEqual(cliente.get(self.url).status_code, 405)
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = cliente.post(self.url, {'clave_idempotencia': 'abc'})
+        self.assertRedirects(respuesta, reverse('aprendices:ver_proyectos'), fetch_redirect_response=False)
+        postulacion = [q['sql'] for q in consultas.captured_queries if 'empresas_postulacion' in q['sql']]
+        self.assertEqual(len(postulacion), 1)
+        self.assertTrue(postulacion[0].startswith('INSERT'))
+
+        # Reenvío con la misma clave: misma redirección sin tocar la base de datos.
+        with CaptureQueriesContext(connection) as consultas:
+            repetida = cliente.post(self.url, {'clave_idempotencia': 'abc'})
+        self.assertEqual(repetida['Location'], respuesta['Location'])
+        self.assertFalse([q for q in consultas.captured_queries if 'empresas_' in q['sql']])
+
+        # Otra clave: la restricción única lo resuelve como "ya postulado".
+        self.assertEqual(cliente.post(self.url, {'clave_idempotencia': 'def'}).status_code, 302)
+        self.assertEqual(Postulacion.objects.count(), 1)
+
+    def test_duplicado_en_curso(self):
+        '''Prueba que un reenvío repite el destino de la primera petición o, si sigue en curso, vuelve al origen'''
+        cliente = self.cliente()
+        clave = f"{utils.PREFIJO_IDEMPOTENCIA}{self.usuario.pk}:{self.url}:abc"
+        origen = reverse('aprendices:ver_proyectos')
+
+        # Sigue en curso: vuelve a la página de origen con un aviso, sin esperar ni ejecutar la vista.
+        cache.set(clave, utils.EN_CURSO)
+        respuesta = cliente.post(self.url, {'clave_idempotencia': 'abc'}, HTTP_REFERER=origen, follow=True)
+        self.assertEqual(respuesta.redirect_chain[0], (origen, 302))
+        self.assertContains(respuesta, "ya se está procesando")
+        self.assertFalse(Postulacion.objects.exists())
+
+        # Ya terminó: se repite su redirección.
+        cache.set(clave, "/destino/")
+        self.assertEqual(cliente.post(self.url, {'clave_idempotencia': 'abc'})['Location'], "/destino/")
+
+    def test_postulaciones_simultaneas(self):
+        '''Prueba que 100 postulaciones simultáneas del mismo aprendiz crean una sola fila sin errores'''
+        clientes = [self.cliente() for _ in range(100)]
+        salida = threading.Barrier(len(clientes))
+
+        def postular(cliente):
+            try:
+                salida.wait()
+                while True:
+                    try:
+                        return cliente.post(self.url).status_code
+                    except OperationalError as e:
+                        # La BD de pruebas en memoria (caché compartida) no espera a que se libere
+                        # un bloqueo como haría busy_timeout: se reintenta la petición.
+                        if 'locked' not in str(e):
+                            raise
+                        time.sleep(0.005)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(clientes)) as hilos:
+            estados = list(hilos.map(postular, clientes))
+
+        self.assertEqual(estados, [302] * len(clientes))
+        self.assertEqual(Postulacion.objects.filter(aprendiz=self.aprendiz, proyecto=self.proyecto).count(), 1)
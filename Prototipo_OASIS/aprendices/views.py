@@ -1,38 +1,32 @@
+import uuid
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
 from django.db import transaction
-from usuario.utils import role_required
+from django.db.models import Exists, OuterRef
+from django.views.decorators.http import require_POST
+from usuario.utils import role_required, idempotente
+from usuario.paginacion import paginar_claves
 from usuario.models import PerfilAprendiz
 from usuario.forms import PerfilAprendizForm # Importamos el formulario correcto
 from empresas.models import SolicitudProyecto, Postulacion
+from empresas import recomendacion, postulaciones
+from . import emparejamiento, panel
 
 # --- APRENDIZ ---
 
 @role_required("APRENDIZ")
 def dashboard_aprendiz(request):
     """Panel principal del aprendiz: muestra sus proyectos asignados y postulaciones."""
-    aprendiz = get_object_or_404(PerfilAprendiz, usuario=request.user)
-
-    # 🔹 Proyectos en los que el aprendiz ya está asignado
-    proyectos_asignados = SolicitudProyecto.objects.filter(aprendices=aprendiz)
-
-    # 🔹 Postulaciones realizadas (proyectos a los que se ha postulado)
-    postulaciones = aprendiz.postulaciones_proyecto.select_related("proyecto")
-
-    # 🔹 Extraer los proyectos de las postulaciones
-    proyectos_postulados = [p.proyecto for p in postulaciones]
-
-    # 🔹 Unir ambos sin duplicados
-    proyectos = list({p.id: p for p in list(proyectos_asignados) + proyectos_postulados}.values())
+    aprendiz = get_object_or_404(PerfilAprendiz.objects.select_related('usuario', 'programa'), usuario=request.user)
 
-    # 🔹 Obtener lista de IDs de proyectos donde ya está postulado (para usar en el template)
-    postulaciones_ids = list(postulaciones.values_list("proyecto__id", flat=True))
+    # Asignados y postulados con su estado, en una consulta y cacheados por aprendiz (ver panel).
+    datos = panel.panel(aprendiz)
 
     return render(request, 'dashboard_aprendiz.html', {
         'aprendiz': aprendiz,
-        'proyectos': proyectos,          # ✅ lista de proyectos combinada
-        'postulaciones': postulaciones,  # ✅ sigue disponible por si la usas en otro bloque
-        'postulaciones_ids': postulaciones_ids,  # ✅ nueva lista simple para el {% if %}
+        'panel': datos,
+        'proyectos': datos.proyectos,
     })
 
 
@@ -41,14 +35,16 @@ def ver_proyectos(request):
     """Muestra proyectos disponibles según el programa formativo del aprendiz."""
     aprendiz = get_object_or_404(PerfilAprendiz, usuario=request.user)
 
-    proyectos = SolicitudProyecto.objects.filter(
-        programa_formativo=aprendiz.programa,
-        estado="APROBADO"
-    ).exclude(postulaciones_aprendices__aprendiz=aprendiz)  # CORRECTO, según tu modelo
+    # Aprobados del programa menos los ya postulados, desde el índice cacheado (ver emparejamiento).
+    proyectos = paginar_claves(request, emparejamiento.disponibles(aprendiz), 12)
+    proyectos.object_list = emparejamiento.proyectos(proyectos.object_list)
+    # Recomendados por área, sector y duración según sus postulaciones (solo en la primera página).
+    recomendados = recomendacion.para_aprendiz(aprendiz) if 'cursor' not in request.GET else []
 
     return render(request, 'proyectos_disponibles.html', {
         'aprendiz': aprendiz,
-        'proyectos': proyectos
+        'proyectos': proyectos,
+        'recomendados': recomendados,
     })
 
 
@@ -68,6 +64,7 @@ def detalle_proyecto(request, pk):
         'proyecto': proyecto,
         'ya_postulado': ya_postulado,
         'programa_coincide': programa_coincide,
+        'clave_idempotencia': uuid.uuid4().hex,
     }
     return render(request, 'detalle_proyecto_aprendiz.html', context)
 
@@ -112,22 +109,26 @@ def editar_perfil_aprendiz(request):
     return render(request, 'editar_perfil_aprendiz.html', context)
 
 @role_required("APRENDIZ")
+@require_POST
+@idempotente
 def postular_proyecto(request, pk):
     """Permite a un aprendiz postularse a un proyecto disponible."""
-    aprendiz = request.user.perfil_aprendiz  # CORRECTO
-    proyecto = get_object_or_404(SolicitudProyecto, pk=pk, estado="APROBADO")
+    # El perfil del aprendiz comparte pk con su usuario: basta con comprobar su programa en la misma consulta.
+    proyecto = get_object_or_404(
+        SolicitudProyecto.objects.only('nombre').annotate(programa_coincide=Exists(
+            PerfilAprendiz.objects.filter(pk=request.user.pk, programa_id=OuterRef('programa_formativo_id'))
+        )),
+        pk=pk, estado="APROBADO",
+    )
 
     # Validar que el proyecto corresponda a su programa
-    if proyecto.programa_formativo != aprendiz.programa:
+    if not proyecto.programa_coincide:
         messages.warning(request, "⚠️ Este proyecto no corresponde a tu programa formativo.")
         return redirect('aprendices:ver_proyectos')
 
-    # Verificar si ya está postulado
-    if Postulacion.objects.filter(aprendiz=aprendiz, proyecto=proyecto).exists():
+    # Un solo INSERT: la restricción única resuelve el doble clic y las peticiones simultáneas.
+    if postulaciones.postular(Postulacion, aprendiz_id=request.user.pk, proyecto=proyecto):
+        messages.success(request, f"✅ Te has postulado correctamente al proyecto '{proyecto.nombre}'.")
+    else:
         messages.info(request, "ℹ️ Ya estás postulado a este proyecto.")
-        return redirect('aprendices:ver_proyectos')
-
-    # Crear la postulación
-    Postulacion.objects.create(aprendiz=aprendiz, proyecto=proyecto)
-    messages.success(request, f"✅ Te has postulado correctamente al proyecto '{proyecto.nombre}'.")
-    return redirect('aprendices:ver_proyectos')
\ No newline at end of file
+    return redirect('aprendices:ver_proyectos')
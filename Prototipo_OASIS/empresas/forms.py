@@ -11,6 +11,7 @@ class SolicitudProyectoForm(forms.ModelForm):
             'area',
             'programa_formativo',
             'duracion_semanas',
+            'cupo',
         ]
         widgets = {
             'descripcion': forms.Textarea(attrs={'rows': 4, 'class': 'form-control'}),
@@ -18,6 +19,7 @@ class SolicitudProyectoForm(forms.ModelForm):
             'area': forms.Select(attrs={'class': 'form-select'}),
             'programa_formativo': forms.Select(attrs={'class': 'form-select'}),
             'duracion_semanas': forms.NumberInput(attrs={'class': 'form-control'}),
+            'cupo': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
         }
 
     def __init__(self, *args, **kwargs):
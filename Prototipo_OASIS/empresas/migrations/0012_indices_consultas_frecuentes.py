@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-18 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0011_solicitudproyecto_fecha_decision'),
+        ('usuario', '0008_busqueda_usuarios'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='postulacion',
+            index=models.Index(fields=['estado'], name='postulacion_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postulacion',
+            index=models.Index(fields=['proyecto', 'estado'], name='postulacion_proy_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postulacioninstructor',
+            index=models.Index(fields=['proyecto', 'estado'], name='postinstr_proy_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudproyecto',
+            index=models.Index(fields=['estado', 'creado_en'], name='solicitud_estado_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudproyecto',
+            index=models.Index(fields=['programa_formativo', 'estado', 'creado_en'], name='solicitud_prog_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitudproyecto',
+            index=models.Index(fields=['empresa', 'creado_en'], name='solicitud_empresa_creado_idx'),
+        ),
+    ]
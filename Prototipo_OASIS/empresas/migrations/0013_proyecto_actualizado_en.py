@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0012_indices_consultas_frecuentes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudproyecto',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Última Modificación'),
+        ),
+    ]
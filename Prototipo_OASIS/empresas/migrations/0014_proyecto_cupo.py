@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('empresas', '0013_proyecto_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitudproyecto',
+            name='cupo',
+            field=models.PositiveIntegerField(blank=True, help_text='Máximo de aprendices que se pueden aceptar (vacío: sin límite)', null=True, verbose_name='Cupo de Aprendices'),
+        ),
+    ]
@@ -12,6 +12,62 @@ from usuario.models import (
 from usuario.models import PerfilEmpresa, PerfilAprendiz, PerfilInstructor
  # Importa el modelo Sector si está en el mismo módulo
 
+
+# --- QUERYSETS CON FORMA PARA CADA PANTALLA ---
+# Cada método trae en la misma consulta (select_related) o en una consulta extra
+# por relación (prefetch_related) lo que recorre su plantilla, para que el número
+# de consultas de la página no crezca con el número de filas.
+
+class SolicitudProyectoQuerySet(models.QuerySet):
+
+    def para_listado(self):
+        """Listados de proyectos disponibles (aprendices, instructores)."""
+        return self.select_related('empresa', 'programa_formativo')
+
+    def para_revision(self):
+        """Revisión de solicitudes del administrador: proyecto + usuario de la empresa."""
+        return self.select_related('empresa__usuario')
+
+    def para_dashboard_empresa(self):
+        """Proyectos de una empresa con el número de aprendices asignados."""
+        return self.annotate(aprendices_asignados=models.Count('aprendices', distinct=True))
+
+    def con_participantes(self):
+        """Detalle de un proyecto: programa, instructor y aprendices con sus usuarios."""
+        return self.select_related('programa_formativo', 'instructor__usuario').prefetch_related(
+            models.Prefetch('aprendices', queryset=PerfilAprendiz.objects.select_related('usuario'))
+        )
+
+    def con_postulaciones(self):
+        """Proyecto con las postulaciones de instructores ya cargadas (y sus usuarios)."""
+        return self.prefetch_related(
+            models.Prefetch(
+                'postulaciones_instructores',
+                queryset=PostulacionInstructor.objects.para_empresa(),
+            )
+        )
+
+
+class PostulacionQuerySet(models.QuerySet):
+
+    def para_empresa(self):
+        """Postulaciones que revisa la empresa: aprendiz y su usuario."""
+        return self.select_related('aprendiz__usuario')
+
+    def para_gestion(self):
+        """Aceptar/rechazar: proyecto (con su empresa) y aprendiz con su usuario."""
+        return self.select_related('proyecto__empresa', 'aprendiz__usuario')
+
+
+class PostulacionInstructorQuerySet(models.QuerySet):
+
+    def para_empresa(self):
+        return self.select_related('instructor__usuario')
+
+    def para_gestion(self):
+        return self.select_related('proyecto__empresa', 'instructor__usuario')
+
+
 class SolicitudProyecto(models.Model):
     # --- OPCIONES DE ESTADO ---
     ESTADO_CHOICES = [
@@ -49,6 +105,12 @@ class SolicitudProyecto(models.Model):
         verbose_name="Duración Estimada (Semanas)"
     )
 
+    cupo = models.PositiveIntegerField(
+        null=True, blank=True,
+        verbose_name="Cupo de Aprendices",
+        help_text="Máximo de aprendices que se pueden aceptar (vacío: sin límite)"
+    )
+
     estado = models.CharField(
         max_length=20,
         choices=ESTADO_CHOICES,
@@ -101,8 +163,16 @@ class SolicitudProyecto(models.Model):
         auto_now_add=True,
         verbose_name="Fecha de Creación"
     )
+    # Lo usa empresas.recomendacion para sincronizar su índice; los update() masivos deben fijarlo.
+    actualizado_en = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name="Última Modificación"
+    )
     fecha_decision = models.DateTimeField(null=True, blank=True)
 
+    objects = SolicitudProyectoQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.nombre} ({self.get_estado_display()})" #type: ignore
 
@@ -110,6 +180,14 @@ class SolicitudProyecto(models.Model):
         verbose_name = "Solicitud de Proyecto"
         verbose_name_plural = "Solicitudes de Proyectos"
         ordering = ['-creado_en']
+        indexes = [
+            # filter(estado=...).order_by('-creado_en'): revisión de solicitudes y listados.
+            models.Index(fields=['estado', 'creado_en'], name='solicitud_estado_creado_idx'),
+            # Proyectos aprobados del programa del aprendiz.
+            models.Index(fields=['programa_formativo', 'estado', 'creado_en'], name='solicitud_prog_estado_idx'),
+            # Proyectos de una empresa en el orden por defecto.
+            models.Index(fields=['empresa', 'creado_en'], name='solicitud_empresa_creado_idx'),
+        ]
 
 
 
@@ -146,10 +224,16 @@ class Postulacion(models.Model):
         verbose_name="Fecha de Postulación"
     )
 
+    objects = PostulacionQuerySet.as_manager()
+
     class Meta:
         unique_together = ('aprendiz', 'proyecto')
         verbose_name = "Postulación de Aprendiz"
         verbose_name_plural = "Postulaciones de Aprendices"
+        indexes = [
+            models.Index(fields=['estado'], name='postulacion_estado_idx'),
+            models.Index(fields=['proyecto', 'estado'], name='postulacion_proy_estado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.aprendiz.usuario.username} → {self.proyecto.nombre} ({self.estado})"
@@ -182,10 +266,15 @@ class PostulacionInstructor(models.Model):
     )
     fecha_postulacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Postulación")
 
+    objects = PostulacionInstructorQuerySet.as_manager()
+
     class Meta:
         unique_together = ('instructor', 'proyecto')
         verbose_name = "Postulación de Instructor"
         verbose_name_plural = "Postulaciones de Instructores"
+        indexes = [
+            models.Index(fields=['proyecto', 'estado'], name='postinstr_proy_estado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.instructor.usuario.username} → {self.proyecto.nombre} ({self.estado})"
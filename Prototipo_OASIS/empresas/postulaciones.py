@@ -0,0 +1,122 @@
+# empresas/postulaciones.py
+"""
+Alta y resolución de postulaciones.
+
+Alta (aprendices e instructores): comprobar con `.exists()` y luego crear costaba
+dos viajes a la base de datos y no evitaba el doble clic: dos peticiones
+simultáneas pasaban ambas la comprobación y la segunda reventaba con
+IntegrityError por `unique_together`. Ahora se inserta directamente y la
+restricción única decide: si ya existía, la inserción falla dentro de un
+savepoint y se informa como "ya postulado".
+
+Resolución (la empresa acepta o rechaza aprendices): `resolver` procesa una o
+muchas postulaciones de un proyecto en una transacción:
+
+    UPDATE solicitudproyecto SET actualizado_en = ... WHERE id = ...   -- toma el bloqueo del proyecto
+    UPDATE postulacion SET estado = 'RECHAZADA' WHERE id IN (...) AND estado = 'PENDIENTE'
+    UPDATE postulacion SET estado = 'ACEPTADA'  WHERE id IN (...) AND estado = 'PENDIENTE'
+    INSERT INTO solicitudproyecto_aprendices ...                       -- asignación de los aceptados
+
+El primer UPDATE serializa a los revisores de un mismo proyecto (bloqueo de fila
+en PostgreSQL/MySQL, de escritura en SQLite) sin frenar a los de otros
+proyectos; con él tomado, las postulaciones que ya no están PENDIENTE se
+informan como conflicto y el cupo (`SolicitudProyecto.cupo`, opcional) se
+respeta: las aceptaciones que no caben quedan pendientes en `sin_cupo`. Como
+update() y bulk_create() no disparan señales, los contadores del dashboard y
+los paneles de los aprendices se ajustan aquí al confirmar la transacción.
+"""
+from dataclasses import dataclass, field
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from aprendices import panel
+from gestion import contadores
+from .models import SolicitudProyecto, Postulacion
+
+PENDIENTE = "PENDIENTE"
+ACEPTADA = "ACEPTADA"
+RECHAZADA = "RECHAZADA"
+
+Asignacion = SolicitudProyecto.aprendices.through
+
+
+def postular(modelo, **campos) -> bool:
+    """Crea la postulación; False si ya existía una con los mismos campos únicos."""
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**campos)
+    except IntegrityError:
+        return False
+    return True
+
+
+@dataclass
+class Resultado:
+    aceptadas: list = field(default_factory=list)   # ids de postulaciones aceptadas (y asignadas)
+    rechazadas: list = field(default_factory=list)
+    conflictos: list = field(default_factory=list)  # ya no estaban pendientes (o no son del proyecto)
+    sin_cupo: list = field(default_factory=list)    # siguen pendientes: el proyecto no tenía cupo
+
+    @property
+    def total(self):
+        return len(self.aceptadas) + len(self.rechazadas)
+
+
+def resolver(proyecto_id, aceptar=(), rechazar=()) -> Resultado:
+    """
+    Acepta y rechaza postulaciones de aprendices de un proyecto en una sola
+    transacción. Solo cambian las que siguen PENDIENTE; si el proyecto tiene
+    cupo, se aceptan por orden de postulación hasta llenarlo.
+    """
+    aceptar, rechazar = set(aceptar), set(rechazar) - set(aceptar)
+    resultado = Resultado()
+    if not aceptar and not rechazar:
+        return resultado
+
+    ahora = timezone.now()
+    with transaction.atomic():
+        if not SolicitudProyecto.objects.filter(pk=proyecto_id).update(actualizado_en=ahora):
+            resultado.conflictos = sorted(aceptar | rechazar)
+            return resultado
+
+        pendientes = dict(
+            Postulacion.objects.filter(proyecto_id=proyecto_id, pk__in=aceptar | rechazar, estado=PENDIENTE)
+            .order_by('fecha_postulacion', 'pk').values_list('pk', 'aprendiz_id')
+        )
+        resultado.conflictos = sorted((aceptar | rechazar) - set(pendientes))
+
+        resultado.rechazadas = [pk for pk in pendientes if pk in rechazar]
+        aceptables = [pk for pk in pendientes if pk in aceptar]
+        if aceptables:
+            cupo, ocupados = (
+                SolicitudProyecto.objects.filter(pk=proyecto_id).annotate(ocupados=Count('aprendices'))
+                .values_list('cupo', 'ocupados').get()
+            )
+            libres = len(aceptables) if cupo is None else max(0, cupo - ocupados)
+            resultado.aceptadas, resultado.sin_cupo = aceptables[:libres], aceptables[libres:]
+
+        for estado, ids in ((RECHAZADA, resultado.rechazadas), (ACEPTADA, resultado.aceptadas)):
+            if ids:
+                Postulacion.objects.filter(pk__in=ids, estado=PENDIENTE).update(estado=estado)
+        if resultado.aceptadas:
+            Asignacion.objects.bulk_create(
+                [Asignacion(solicitudproyecto_id=proyecto_id, perfilaprendiz_id=pendientes[pk])
+                 for pk in resultado.aceptadas],
+                ignore_conflicts=True,
+            )
+
+        if resultado.total:
+            _al_confirmar(resultado, [pendientes[pk] for pk in resultado.aceptadas + resultado.rechazadas])
+    return resultado
+
+
+def _al_confirmar(resultado, aprendiz_ids):
+    deltas = {f"postulaciones:APRENDIZ:{PENDIENTE}": -resultado.total}
+    if resultado.aceptadas:
+        deltas[f"postulaciones:APRENDIZ:{ACEPTADA}"] = len(resultado.aceptadas)
+    if resultado.rechazadas:
+        deltas[f"postulaciones:APRENDIZ:{RECHAZADA}"] = len(resultado.rechazadas)
+    transaction.on_commit(lambda: contadores.ajustar(deltas))
+    transaction.on_commit(lambda: panel.invalidar_aprendices(aprendiz_ids))
@@ -0,0 +1,303 @@
+# empresas/recomendacion.py
+"""
+Recomendación de proyectos aprobados para aprendices e instructores.
+
+Cada proceso mantiene en memoria un índice de los proyectos APROBADOS:
+
+- Para instructores, un índice invertido TF-IDF (ponderación BM25) sobre el
+  nombre, la descripción y el área del proyecto. La consulta es el
+  `area_conocimiento` del instructor. El top-K usa el algoritmo de umbral de
+  Fagin sobre las listas de sus términos ordenadas por peso: se detiene cuando
+  ningún proyecto no visto puede superar al K-ésimo, así que casi nunca recorre
+  las listas completas. Cada lista se reordena solo cuando cambia.
+- Para aprendices, los proyectos de cada programa agrupados por
+  (área, sector de la empresa, duración). El puntaje depende solo de esos
+  rasgos, así que se calcula una vez por grupo y no por proyecto.
+  Las preferencias salen de las postulaciones del aprendiz (áreas, sectores y
+  duración típica). Sin historial, se usan las áreas con más proyectos en su
+  programa.
+
+El índice se sincroniza de forma incremental antes de cada consulta: una
+consulta indexada trae los proyectos con `actualizado_en` posterior a la última
+sincronización (con un margen por las transacciones que confirman tarde). Los
+que dejaron de estar aprobados salen del índice. `invalidar()` obliga a todos
+los procesos a reconstruirlo: tras restaurar un respaldo y con las bajas de
+proyectos, programas o sectores, que no dejan fila que releer (ver
+empresas/signals.py). Un cambio de sector de la empresa marca sus proyectos como
+actualizados.
+
+No se usan NumPy/SciPy: las listas invertidas en diccionarios cumplen el mismo
+papel que una matriz dispersa para consultas de pocas palabras.
+"""
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+from datetime import timedelta
+from statistics import median
+
+from django.utils import timezone
+
+from usuario.utils import marca_generacion, renovar_generacion
+from .models import SolicitudProyecto, Postulacion, PostulacionInstructor
+
+APROBADO = "APROBADO"
+CLAVE_GENERACION = "oasis:recomendacion:generacion"
+MARGEN_SINCRONIZACION = timedelta(seconds=5)
+DERIVA_LONGITUD = 0.1   # se recalculan los pesos si la longitud media cambia más de un 10 %
+LIMITE = 6
+
+# BM25
+K1 = 1.2
+B = 0.75
+
+# Pesos del puntaje de aprendices.
+PESO_AREA = 3.0
+PESO_SECTOR = 2.0
+PESO_DURACION = 1.0
+ESCALA_DURACION = 4.0
+
+AREAS = dict(SolicitudProyecto.AREA_CHOICES)
+PALABRAS_VACIAS = set(
+    "a al ante con contra de del desde e el en entre es esta este hacia la las lo los o para por que se segun "
+    "sin sobre su sus un una uno unos unas y".split()
+)
+
+
+def terminos(texto) -> list:
+    """Palabras sin tildes, en minúsculas, sin palabras vacías y con un plural simple recortado."""
+    texto = unicodedata.normalize('NFKD', texto or "").encode('ascii', 'ignore').decode('ascii').lower()
+    salida = []
+    for palabra in re.findall(r"[a-z0-9]+", texto):
+        if len(palabra) < 3 or palabra in PALABRAS_VACIAS:
+            continue
+        if len(palabra) > 5 and palabra.endswith("es"):
+            palabra = palabra[:-2]
+        elif len(palabra) > 4 and palabra.endswith("s"):
+            palabra = palabra[:-1]
+        salida.append(palabra)
+    return salida
+
+
+@dataclass
+class Documento:
+    programa_id: int
+    grupo: tuple          # (área, sector, duración)
+    orden: tuple          # (-creado_en µs, -id): más reciente primero
+    frecuencias: dict     # término -> apariciones
+    longitud: int
+    actualizado_en: object
+
+
+class IndiceProyectos:
+
+    def __init__(self):
+        self.candado = threading.Lock()  # sincronizar y consultar siempre con el candado tomado
+        self.generacion = None
+        self.vaciar()
+
+    def vaciar(self):
+        self.documentos = {}     # id -> Documento
+        self.invertido = {}      # término -> {id: apariciones}
+        self.grupos = {}         # programa -> {(área, sector, duración): {ids}}
+        self.ordenadas = {}      # término -> [(-peso, orden, id)], se descarta al cambiar el término
+        self.longitud_total = 0
+        self.longitud_pesos = 1  # longitud media con la que se calcularon los pesos de `ordenadas`
+        self.marca = None        # hora de inicio de la última sincronización
+
+    # --- Mantenimiento ---
+
+    def quitar(self, pk):
+        documento = self.documentos.pop(pk, None)
+        if documento is None:
+            return
+        self.longitud_total -= documento.longitud
+        for termino in documento.frecuencias:
+            self.ordenadas.pop(termino, None)
+            lista = self.invertido[termino]
+            del lista[pk]
+            if not lista:
+                del self.invertido[termino]
+        grupos = self.grupos[documento.programa_id]
+        grupos[documento.grupo].discard(pk)
+        if not grupos[documento.grupo]:
+            del grupos[documento.grupo]
+
+    def poner(self, fila):
+        pk = fila['pk']
+        anterior = self.documentos.get(pk)
+        if anterior is not None and anterior.actualizado_en == fila['actualizado_en'] and fila['estado'] == APROBADO:
+            return  # releído por el margen de sincronización, sin cambios
+        self.quitar(pk)
+        if fila['estado'] != APROBADO:
+            return
+        palabras = terminos(f"{fila['nombre']} {fila['descripcion']} {AREAS.get(fila['area'], '')}")
+        creado = fila['creado_en']
+        documento = Documento(
+            programa_id=fila['programa_formativo_id'],
+            grupo=(fila['area'], fila['empresa__sector_id'], fila['duracion_semanas']),
+            orden=(-(int(creado.timestamp()) * 1_000_000 + creado.microsecond), -pk),
+            frecuencias=Counter(palabras),
+            longitud=len(palabras),
+            actualizado_en=fila['actualizado_en'],
+        )
+        self.documentos[pk] = documento
+        self.longitud_total += documento.longitud
+        for termino, apariciones in documento.frecuencias.items():
+            self.ordenadas.pop(termino, None)
+            self.invertido.setdefault(termino, {})[pk] = apariciones
+        self.grupos.setdefault(documento.programa_id, {}).setdefault(documento.grupo, set()).add(pk)
+
+    def sincronizar(self):
+        generacion = marca_generacion(CLAVE_GENERACION)
+
+        proyectos = SolicitudProyecto.objects.order_by()
+        if generacion != self.generacion or self.marca is None:
+            self.vaciar()
+            self.generacion = generacion
+            proyectos = proyectos.filter(estado=APROBADO)
+        else:
+            proyectos = proyectos.filter(actualizado_en__gte=self.marca - MARGEN_SINCRONIZACION)
+        self.marca = timezone.now()
+        for fila in proyectos.values(
+            'pk', 'estado', 'nombre', 'descripcion', 'area', 'duracion_semanas', 'creado_en', 'actualizado_en',
+            'programa_formativo_id', 'empresa__sector_id',
+        ).iterator(chunk_size=2000):
+            self.poner(fila)
+
+    # --- Consultas ---
+
+    def _peso(self, pk, frecuencia):
+        """Peso BM25 del término en el documento (sin el idf)."""
+        normal = K1 * (1 - B + B * self.documentos[pk].longitud / self.longitud_pesos)
+        return frecuencia * (K1 + 1) / (frecuencia + normal)
+
+    def _ordenada(self, termino):
+        promedio = self.longitud_total / len(self.documentos) or 1
+        if abs(promedio - self.longitud_pesos) > DERIVA_LONGITUD * self.longitud_pesos:
+            self.ordenadas.clear()
+            self.longitud_pesos = promedio
+        lista = self.ordenadas.get(termino)
+        if lista is None:
+            lista = sorted(
+                (-self._peso(pk, frecuencia), self.documentos[pk].orden, pk)
+                for pk, frecuencia in self.invertido[termino].items()
+            )
+            self.ordenadas[termino] = lista
+        return lista
+
+    def por_texto(self, texto, excluir=(), limite=LIMITE) -> list:
+        """
+        Ids de los `limite` proyectos más parecidos a `texto` (BM25), por el algoritmo
+        de umbral: se avanza a la vez por las listas ordenadas de cada término y cada
+        proyecto nuevo se puntúa completo; al alcanzar el umbral (la suma de los pesos
+        en la posición actual) ningún proyecto por ver puede entrar en el top.
+        """
+        total = len(self.documentos)
+        consulta = [(termino, n) for termino, n in Counter(terminos(texto)).items() if termino in self.invertido]
+        if not consulta or not total:
+            return []
+        listas = []
+        for termino, repeticiones in consulta:
+            frecuencias = self.invertido[termino]
+            idf = math.log(1 + (total - len(frecuencias) + 0.5) / (len(frecuencias) + 0.5)) * repeticiones
+            listas.append((idf, frecuencias, self._ordenada(termino)))
+
+        mejores = []   # montículo de (puntaje, -orden) de tamaño `limite`
+        vistos = set(excluir)
+        for posicion in range(max(len(ordenada) for _, _, ordenada in listas)):
+            umbral = 0.0
+            for idf, _, ordenada in listas:
+                if posicion >= len(ordenada):
+                    continue
+                peso, orden, pk = ordenada[posicion]
+                umbral -= idf * peso
+                if pk in vistos:
+                    continue
+                vistos.add(pk)
+                puntaje = sum(idf2 * self._peso(pk, f[pk]) for idf2, f, _ in listas if pk in f)
+                candidato = (puntaje, tuple(-x for x in orden), pk)
+                if len(mejores) < limite:
+                    heapq.heappush(mejores, candidato)
+                elif candidato > mejores[0]:
+                    heapq.heapreplace(mejores, candidato)
+            if len(mejores) == limite and mejores[0][0] >= umbral:
+                break
+        return [pk for _, _, pk in sorted(mejores, reverse=True)]
+
+    def por_rasgos(self, programa_id, historial, excluir=(), limite=LIMITE) -> list:
+        """
+        Ids de los `limite` proyectos del programa con mejor puntaje de área, sector y
+        duración según `historial` (grupos (área, sector, duración) de sus postulaciones).
+        """
+        grupos = self.grupos.get(programa_id)
+        if not grupos:
+            return []
+        if historial:
+            areas = Counter(area for area, _, _ in historial)
+            sectores = Counter(sector for _, sector, _ in historial)
+            duracion = median(semanas for _, _, semanas in historial)
+        else:
+            areas = Counter({area: len(ids) for (area, _, _), ids in grupos.items()})
+            sectores = Counter()
+            duracion = median(semanas for _, _, semanas in grupos)
+        total_areas = sum(areas.values()) or 1
+        total_sectores = sum(sectores.values()) or 1
+
+        def puntaje(grupo):
+            area, sector, semanas = grupo
+            return (
+                PESO_AREA * areas[area] / total_areas
+                + PESO_SECTOR * sectores[sector] / total_sectores
+                + PESO_DURACION / (1 + abs(semanas - duracion) / ESCALA_DURACION)
+            )
+
+        excluir = set(excluir)
+        elegidos = []
+        for grupo in sorted(grupos, key=puntaje, reverse=True):
+            ids = [pk for pk in grupos[grupo] if pk not in excluir]
+            elegidos.extend(heapq.nsmallest(limite - len(elegidos), ids, key=lambda pk: self.documentos[pk].orden))
+            if len(elegidos) >= limite:
+                break
+        return elegidos
+
+
+_indice = IndiceProyectos()
+
+
+def _consultar(metodo, *args):
+    """Sincroniza el índice del proceso y ejecuta `metodo` sobre él, con el candado tomado."""
+    with _indice.candado:
+        _indice.sincronizar()
+        return metodo(_indice, *args)
+
+
+def invalidar() -> None:
+    """Obliga a todos los procesos a reconstruir el índice en su próxima consulta."""
+    renovar_generacion(CLAVE_GENERACION)
+
+
+def _proyectos(ids) -> list:
+    """Los proyectos en el orden de `ids`; los que ya no están aprobados se descartan."""
+    # Solo por pk: con `estado` en el filtro SQLite prefiere el índice de estado y recorre todos los aprobados.
+    por_id = SolicitudProyecto.objects.para_listado().in_bulk(ids)
+    return [por_id[pk] for pk in ids if pk in por_id and por_id[pk].estado == APROBADO]
+
+
+def para_aprendiz(aprendiz, limite=LIMITE) -> list:
+    """Proyectos recomendados de su programa a los que aún no se ha postulado."""
+    filas = Postulacion.objects.filter(aprendiz=aprendiz).values_list(
+        'proyecto_id', 'proyecto__area', 'proyecto__empresa__sector_id', 'proyecto__duracion_semanas'
+    )
+    postulados = {fila[0]: fila[1:] for fila in filas}
+    ids = _consultar(IndiceProyectos.por_rasgos, aprendiz.programa_id, list(postulados.values()), postulados, limite)
+    return _proyectos(ids)
+
+
+def para_instructor(instructor, limite=LIMITE) -> list:
+    """Proyectos cuya descripción más se parece al área de conocimiento del instructor."""
+    postulados = set(PostulacionInstructor.objects.filter(instructor=instructor).values_list('proyecto_id', flat=True))
+    return _proyectos(_consultar(IndiceProyectos.por_texto, instructor.area_conocimiento, postulados, limite))
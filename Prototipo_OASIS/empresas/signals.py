@@ -0,0 +1,36 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.utils import timezone
+
+from usuario.models import ProgramaFormativo, PerfilEmpresa, SectorProductivo
+from .models import SolicitudProyecto
+from . import recomendacion
+
+
+def _indice_obsoleto(sender, instance, **kwargs):
+    # La sincronización incremental solo ve filas con `actualizado_en` reciente: un
+    # proyecto borrado (directamente o en cascada al eliminar su empresa) no
+    # aparece, y el SET_NULL al borrar un programa o un sector es un UPDATE sin
+    # señales. Se obliga a todos los procesos a reconstruir el índice.
+    transaction.on_commit(recomendacion.invalidar)
+
+
+def _guardar_sector_previo(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        instance._sector_previo = (
+            PerfilEmpresa.objects.filter(pk=instance.pk).values_list('sector_id', flat=True).first()
+        )
+
+
+def _sector_cambiado(sender, instance, created, **kwargs):
+    # El sector de la empresa es un rasgo de sus proyectos en el índice: se marcan
+    # como actualizados para que la próxima sincronización los relea.
+    if not created and getattr(instance, '_sector_previo', instance.sector_id) != instance.sector_id:
+        SolicitudProyecto.objects.filter(empresa=instance).update(actualizado_en=timezone.now())
+
+
+post_delete.connect(_indice_obsoleto, sender=SolicitudProyecto, dispatch_uid="recomendacion_post_delete_proyecto")
+post_delete.connect(_indice_obsoleto, sender=ProgramaFormativo, dispatch_uid="recomendacion_post_delete_programa")
+post_delete.connect(_indice_obsoleto, sender=SectorProductivo, dispatch_uid="recomendacion_post_delete_sector")
+pre_save.connect(_guardar_sector_previo, sender=PerfilEmpresa, dispatch_uid="recomendacion_pre_save_empresa")
+post_save.connect(_sector_cambiado, sender=PerfilEmpresa, dispatch_uid="recomendacion_post_save_empresa")
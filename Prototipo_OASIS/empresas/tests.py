@@ -1,3 +1,327 @@
-from django.test import TestCase
+import random
+import re
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import Q
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from gestion import datos_prueba
+from instructores.models import AsignacionInstructor
+from usuario.models import Usuario, PerfilAprendiz, PerfilEmpresa, PerfilInstructor, ProgramaFormativo, SectorProductivo
+from .models import SolicitudProyecto, Postulacion, PostulacionInstructor
+from . import recomendacion, postulaciones
+
+
+# Recorrido completo de una tabla sin índice: "SCAN tabla" (opcionalmente "AS alias").
+SCAN_COMPLETO = re.compile(r"^SCAN \S+( AS \S+)?$")
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN es específico de SQLite")
+class PlanesDeConsultaTests(TestCase):
+    """
+    Los filtros más usados por las vistas deben resolverse con índices. Si un cambio
+    en los modelos elimina un índice, esta prueba lo detecta antes de producción.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.programa = ProgramaFormativo.objects.create(nombre="ADSO", codigo="228118", tipo=ProgramaFormativo.TECNOLOGO)
+        usuario = Usuario.objects.create_user(username="empresa", email="e@oasis.test", password="x", rol=Usuario.EMPRESA)
+        cls.empresa = PerfilEmpresa.objects.get(usuario=usuario)
+        aprendiz = Usuario.objects.create_user(username="aprendiz", email="a@oasis.test", password="x")
+        cls.aprendiz = PerfilAprendiz.objects.create(usuario=aprendiz, documento="1", ficha="1", programa=cls.programa)
+        cls.proyecto = SolicitudProyecto.objects.create(
+            nombre="P", descripcion="D", area="DES", duracion_semanas=4, empresa=cls.empresa,
+            programa_formativo=cls.programa,
+        )
+
+    def plan(self, queryset):
+        sql, parametros = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, parametros)
+            return [fila[-1] for fila in cursor.fetchall()]
+
+    def assertUsaIndices(self, queryset, ordenado=False):
+        plan = self.plan(queryset)
+        completos = [paso for paso in plan if SCAN_COMPLETO.match(paso)]
+        self.assertFalse(completos, f"Recorrido completo de tabla en:\n{queryset.query}\nPlan: {plan}")
+        if ordenado:
+            self.assertNotIn("USE TEMP B-TREE FOR ORDER BY", plan, f"Ordenamiento sin índice en:\n{queryset.query}")
+
+    def test_consultas_de_proyectos(self):
+        '''Prueba que los filtros de SolicitudProyecto de las vistas usan índices'''
+        proyectos = SolicitudProyecto.objects
+        momento = self.proyecto.creado_en
+        despues_de = Q(creado_en__lt=momento) | Q(creado_en=momento, id__lt=self.proyecto.pk)
+
+        self.assertUsaIndices(proyectos.filter(estado="APROBADO"), ordenado=True)
+        self.assertUsaIndices(proyectos.filter(estado="PENDIENTE").order_by('-creado_en', '-id')[:21], ordenado=True)
+        self.assertUsaIndices(
+            proyectos.filter(estado="PENDIENTE").filter(despues_de).order_by('-creado_en', '-id')[:21], ordenado=True
+        )
+        self.assertUsaIndices(
+            proyectos.filter(programa_formativo=self.programa, estado="APROBADO")
+            .exclude(postulaciones_aprendices__aprendiz=self.aprendiz)
+            .order_by('-creado_en', '-id')[:13],
+            ordenado=True,
+        )
+        self.assertUsaIndices(proyectos.filter(empresa=self.empresa), ordenado=True)
+
+    def test_consultas_de_usuarios_y_postulaciones(self):
+        '''Prueba que el listado de usuarios y los filtros de postulaciones usan índices'''
+        self.assertUsaIndices(Usuario.objects.order_by('-date_joined', '-id')[:11], ordenado=True)
+        self.assertUsaIndices(Usuario.objects.filter(rol=Usuario.APRENDIZ).order_by('-date_joined', '-id')[:11], ordenado=True)
+        self.assertUsaIndices(Usuario.objects.filter(rol=Usuario.EMPRESA))
+
+        self.assertUsaIndices(Postulacion.objects.filter(estado="PENDIENTE"))
+        self.assertUsaIndices(Postulacion.objects.filter(proyecto=self.proyecto, estado="PENDIENTE"))
+        self.assertUsaIndices(Postulacion.objects.filter(aprendiz=self.aprendiz))
+        self.assertUsaIndices(PostulacionInstructor.objects.filter(proyecto=self.proyecto, estado="PENDIENTE"))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConsultasPorPaginaTests(TestCase):
+    """El número de consultas de las páginas con listados no depende del número de filas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser(username="admin", email="admin@oasis.test", password="x")
+        cls.empresa_usuario = Usuario.objects.create_user(
+            username="empresa", email="e@oasis.test", password="x", rol=Usuario.EMPRESA
+        )
+        cls.instructor_usuario = Usuario.objects.create_user(
+            username="instructor", email="i@oasis.test", password="x", rol=Usuario.INSTRUCTOR
+        )
+        cls.proyecto = SolicitudProyecto.objects.create(
+            nombre="Base", descripcion="D", area="DES", duracion_semanas=4,
+            empresa=cls.empresa_usuario.perfil_empresa,
+        )
+        cls.creados = 0
+
+    def agregar_filas(self, cantidad):
+        """Agrega `cantidad` proyectos pendientes, aprobados, postulaciones y asignaciones."""
+        empresa = self.empresa_usuario.perfil_empresa
+        for _ in range(cantidad):
+            n = ConsultasPorPaginaTests.creados = ConsultasPorPaginaTests.creados + 1
+            for estado in ("PENDIENTE", "APROBADO"):
+                otro = SolicitudProyecto.objects.create(
+                    nombre=f"P{n}{estado}", descripcion="D", area="DES", duracion_semanas=4,
+                    empresa=empresa, estado=estado,
+                )
+            AsignacionInstructor.objects.create(instructor=self.instructor_usuario, proyecto=otro)
+
+            aprendiz = Usuario.objects.create_user(username=f"aprendiz{n}", email=f"a{n}@oasis.test", password="x")
+            perfil = PerfilAprendiz.objects.create(usuario=aprendiz, documento=f"A{n}", ficha="1")
+            Postulacion.objects.create(aprendiz=perfil, proyecto=self.proyecto)
+            self.proyecto.aprendices.add(perfil)
+
+            instructor = Usuario.objects.create_user(
+                username=f"instructor{n}", email=f"i{n}@oasis.test", password="x", rol=Usuario.INSTRUCTOR
+            )
+            perfil = PerfilInstructor.objects.create(usuario=instructor, documento=f"I{n}", area_conocimiento="Software")
+            PostulacionInstructor.objects.create(instructor=perfil, proyecto=self.proyecto)
+
+    def contar_consultas(self, usuario, url):
+        self.client.force_login(usuario)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(consultas)
+
+    def test_consultas_constantes(self):
+        '''Prueba que revisión, postulaciones y paneles no hacen consultas por fila'''
+        paginas = [
+            (self.admin, reverse('gestion:revisar_solicitudes')),
+            (self.empresa_usuario, reverse('empresas:postulaciones_proyecto', args=[self.proyecto.pk])),
+            (self.empresa_usuario, reverse('empresas:detalle_proyecto_empresa', args=[self.proyecto.pk])),
+            (self.empresa_usuario, reverse('empresas:dashboard_empresa')),
+            (self.instructor_usuario, reverse('instructores:dashboard_instructor')),
+            (self.instructor_usuario, reverse('instructores:proyectos_disponibles')),
+        ]
+        self.agregar_filas(2)
+        pocas = [self.contar_consultas(usuario, url) for usuario, url in paginas]
+        self.agregar_filas(5)
+        muchas = [self.contar_consultas(usuario, url) for usuario, url in paginas]
+
+        self.assertEqual(pocas, muchas)
+
+
+class RecomendacionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.programa = datos_prueba.programa()
+        otro = datos_prueba.programa("Cocina", "1", ProgramaFormativo.TECNICO)
+        tecnologia, salud = SectorProductivo.objects.create(nombre="Tecnología"), SectorProductivo.objects.create(nombre="Salud")
+        empresas = {}
+        for nombre, sector in (("tec", tecnologia), ("salud", salud)):
+            usuario = Usuario.objects.create_user(username=nombre, password="x", rol=Usuario.EMPRESA)
+            empresas[nombre] = PerfilEmpresa.objects.get(usuario=usuario)
+            empresas[nombre].sector, empresas[nombre].nit = sector, f"NIT-{nombre}"
+            empresas[nombre].save()
+
+        def proyecto(nombre, descripcion, area, empresa, semanas=12, programa=self.programa):
+            return SolicitudProyecto.objects.create(
+                nombre=nombre, descripcion=descripcion, area=area, duracion_semanas=semanas, estado="APROBADO",
+                empresa=empresas[empresa], programa_formativo=programa,
+            )
+
+        self.web = proyecto("Portal web", "Aplicación web con bases de datos para inventarios", "DES", "tec")
+        self.redes = proyecto("Red local", "Cableado estructurado y redes inalámbricas", "ELE", "tec", 20)
+        self.clinica = proyecto("Agenda clínica", "Agendamiento de citas médicas", "SAL", "salud", 8)
+        self.movil = proyecto("App móvil", "Aplicaciones móviles para pedidos", "DES", "tec", 10)
+        proyecto("Menú", "Carta de temporada", "TUR", "salud", programa=otro)
+
+    def test_instructor_por_similitud_de_texto(self):
+        '''Prueba que el instructor recibe primero los proyectos afines a su área y que el índice se actualiza'''
+        usuario = Usuario.objects.create_user(username="instructor", password="x", rol=Usuario.INSTRUCTOR)
+        instructor = PerfilInstructor.objects.create(usuario=usuario, documento="2002", area_conocimiento="Redes y cableado")
+
+        self.assertEqual(recomendacion.para_instructor(instructor)[0], self.redes)
+        PostulacionInstructor.objects.create(instructor=instructor, proyecto=self.redes)
+        self.assertNotIn(self.redes, recomendacion.para_instructor(instructor))
+
+        # Cambios posteriores entran de forma incremental, sin reconstruir el índice.
+        self.web.descripcion = "Monitoreo de redes y cableado de oficinas"
+        self.web.save()
+        instructor.area_conocimiento = "Redes"
+        self.assertEqual(recomendacion.para_instructor(instructor)[0], self.web)
+        SolicitudProyecto.objects.filter(pk=self.web.pk).update(estado="COMPLETADO", actualizado_en=timezone.now())
+        self.assertNotIn(self.web, recomendacion.para_instructor(instructor))
+
+        # Con el índice al día: las postulaciones del instructor y la sincronización incremental.
+        with self.assertNumQueries(2):
+            recomendacion.para_instructor(instructor)
+
+    def test_aprendiz_por_area_sector_y_duracion(self):
+        '''Prueba que el aprendiz recibe proyectos de su programa ordenados según sus postulaciones'''
+        usuario = Usuario.objects.create_user(username="aprendiz", password="x", rol=Usuario.APRENDIZ)
+        aprendiz = PerfilAprendiz.objects.create(usuario=usuario, documento="1001", ficha="2900001", programa=self.programa)
+
+        sin_historial = recomendacion.para_aprendiz(aprendiz)
+        self.assertEqual(set(sin_historial), {self.web, self.redes, self.clinica, self.movil})
+        self.assertEqual(set(sin_historial[:2]), {self.web, self.movil})
+
+        # Pesa más el área, luego el sector y al final la cercanía de la duración.
+        Postulacion.objects.create(aprendiz=aprendiz, proyecto=self.movil)
+        self.assertEqual(recomendacion.para_aprendiz(aprendiz), [self.web, self.redes, self.clinica])
+
+    def test_indice_sigue_bajas_y_cambios_de_sector(self):
+        '''Prueba que el índice descarta proyectos borrados en cascada y relee los de una empresa que cambia de sector'''
+        usuario = Usuario.objects.create_user(username="aprendiz", password="x", rol=Usuario.APRENDIZ)
+        aprendiz = PerfilAprendiz.objects.create(usuario=usuario, documento="1001", ficha="2900001", programa=self.programa)
+        recomendacion.para_aprendiz(aprendiz)
+        indice = recomendacion._indice
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Usuario.objects.get(username="salud").delete()
+            ProgramaFormativo.objects.get(codigo="1").delete()
+        self.assertNotIn(self.clinica, recomendacion.para_aprendiz(aprendiz))
+        self.assertNotIn(self.clinica.pk, indice.documentos)
+        self.assertEqual(set(indice.grupos), {self.programa.pk})
+
+        empresa = self.web.empresa
+        empresa.sector = SectorProductivo.objects.create(nombre="Servicios")
+        empresa.save()
+        recomendacion.para_aprendiz(aprendiz)
+        self.assertEqual(indice.documentos[self.web.pk].grupo, ("DES", empresa.sector_id, 12))
+
+
+class GestionPostulacionesTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        programa = datos_prueba.programa()
+        empresa = datos_prueba.empresa(password=None)
+        self.usuario = empresa.usuario
+        self.proyecto = datos_prueba.proyecto(empresa, programa, cupo=2)
+        self.postulaciones = []
+        for i in range(4):
+            usuario = Usuario.objects.create_user(username=f"aprendiz{i}", rol=Usuario.APRENDIZ)
+            aprendiz = PerfilAprendiz.objects.create(usuario=usuario, documento=f"100{i}", ficha="1", programa=programa)
+            self.postulaciones.append(Postulacion.objects.create(aprendiz=aprendiz, proyecto=self.proyecto))
+        self.client.force_login(self.usuario)
+
+    def estados(self):
+        return list(Postulacion.objects.order_by('pk').values_list('estado', flat=True))
+
+    def test_aceptar_asigna_una_sola_vez(self):
+        '''Prueba que aceptar asigna al aprendiz al proyecto y que repetir la acción no lo procesa otra vez'''
+        url = reverse('empresas:gestionar_postulacion', args=[self.postulaciones[0].pk, 'aceptar'])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url)
+        respuesta = self.client.post(url, follow=True)
+
+        self.assertContains(respuesta, "ya fue procesada")
+        self.assertEqual(list(self.proyecto.aprendices.all()), [self.postulaciones[0].aprendiz])
+        self.assertEqual(self.estados(), ["ACEPTADA", "PENDIENTE", "PENDIENTE", "PENDIENTE"])
+
+    def test_lote_respeta_el_cupo(self):
+        '''Prueba que la gestión en bloque acepta por orden de postulación hasta el cupo y rechaza el resto marcado'''
+        primera, segunda, tercera, cuarta = [p.pk for p in self.postulaciones]
+        postulaciones.resolver(self.proyecto.pk, rechazar=[cuarta])
+
+        url = reverse('empresas:gestionar_postulaciones', args=[self.proyecto.pk])
+        self.assertEqual(self.client.get(url).status_code, 405)
+        respuesta = self.client.post(url, {'accion': 'aceptar', 'postulaciones': [tercera, segunda, primera, cuarta]}, follow=True)
+
+        self.assertContains(respuesta, "completó su cupo")
+        self.assertContains(respuesta, "ya habían sido procesadas")
+        self.assertEqual(self.estados(), ["ACEPTADA", "ACEPTADA", "PENDIENTE", "RECHAZADA"])
+        self.assertEqual(self.proyecto.aprendices.count(), 2)
+
+        resultado = postulaciones.resolver(self.proyecto.pk, rechazar=[tercera])
+        self.assertEqual((resultado.rechazadas, resultado.conflictos), ([tercera], []))
+
+
+class RevisoresSimultaneosTests(TransactionTestCase):
+
+    def test_cupo_con_revisores_simultaneos(self):
+        '''Prueba que 10 aceptaciones simultáneas en un proyecto con cupo 3 asignan exactamente 3 aprendices'''
+        programa = datos_prueba.programa()
+        empresa = datos_prueba.empresa(password=None)
+        proyecto = datos_prueba.proyecto(empresa, programa, cupo=3)
+        urls = []
+        for i in range(10):
+            usuario = Usuario.objects.create_user(username=f"aprendiz{i}", rol=Usuario.APRENDIZ)
+            aprendiz = PerfilAprendiz.objects.create(usuario=usuario, documento=f"10{i}", ficha="1", programa=programa)
+            postulacion = Postulacion.objects.create(aprendiz=aprendiz, proyecto=proyecto)
+            urls.append(reverse('empresas:gestionar_postulacion', args=[postulacion.pk, 'aceptar']))
+        clientes = [Client() for _ in urls]
+        for cliente in clientes:
+            cliente.force_login(empresa.usuario)
+        salida = threading.Barrier(len(clientes))
+
+        def aceptar(cliente, url):
+            try:
+                salida.wait()
+                while True:
+                    try:
+                        return cliente.post(url).status_code
+                    except OperationalError as e:
+                        # La BD de pruebas en memoria (caché compartida) no espera a que se libere
+                        # un bloqueo como haría busy_timeout: se reintenta la petición.
+                        if 'locked' not in str(e):
+                            raise
+                        time.sleep(random.uniform(0, 0.02))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(clientes)) as hilos:
+            estados = list(hilos.map(aceptar, clientes, urls))
+
+        self.assertEqual(estados, [302] * len(clientes))
+        self.assertEqual(proyecto.aprendices.count(), 3)
+        self.assertEqual(Postulacion.objects.filter(estado="ACEPTADA").count(), 3)
+        self.assertEqual(Postulacion.objects.filter(estado="PENDIENTE").count(), 7)
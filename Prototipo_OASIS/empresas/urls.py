@@ -16,6 +16,7 @@ urlpatterns = [
     path('proyecto/<int:pk>/postulaciones/', views.postulaciones_proyecto, name='postulaciones_proyecto'),
 
     # --- Postulaciones de aprendices ---
+    path('proyecto/<int:pk>/postulaciones/gestionar/', views.gestionar_postulaciones, name='gestionar_postulaciones'),
     path('postulacion/<int:postulacion_id>/<str:accion>/', views.gestionar_postulacion, name='gestionar_postulacion'),
 
     # --- Postulaciones de instructores ---
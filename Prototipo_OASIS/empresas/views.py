@@ -3,6 +3,7 @@ from django.http import Http404
 from django.contrib import messages
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
 
 # Decoradores y modelos de usuario
 from usuario.utils import role_required
@@ -11,6 +12,7 @@ from usuario.models import PerfilEmpresa
 # Modelos y formularios de la app empresas
 from .models import SolicitudProyecto, Postulacion, PostulacionInstructor, SolicitudProyecto, Empresa
 from .forms import SolicitudProyectoForm, EmpresaProfileForm
+from . import postulaciones
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import DetailView
 
@@ -20,7 +22,7 @@ from django.views.generic import DetailView
 @role_required("EMPRESA")
 def dashboard_empresa(request):
     empresa = request.user.perfil_empresa
-    proyectos = SolicitudProyecto.objects.filter(empresa=empresa)
+    proyectos = SolicitudProyecto.objects.filter(empresa=empresa).para_dashboard_empresa()
     return render(request, 'dashboard_empresa.html', {'proyectos': proyectos})
 
 @role_required("EMPRESA")
@@ -137,8 +139,8 @@ def editar_proyecto(request, pk):
 @role_required("EMPRESA")
 def postulaciones_proyecto(request, pk):
     empresa = request.user.perfil_empresa
-    proyecto = get_object_or_404(SolicitudProyecto, pk=pk, empresa=empresa)
-    postulaciones = Postulacion.objects.filter(proyecto=proyecto)
+    proyecto = get_object_or_404(SolicitudProyecto.objects.con_postulaciones(), pk=pk, empresa=empresa)
+    postulaciones = Postulacion.objects.filter(proyecto=proyecto).para_empresa()
 
     return render(request, 'postulaciones_proyectos.html', {
         'proyecto': proyecto,
@@ -146,41 +148,59 @@ def postulaciones_proyecto(request, pk):
     })
 
 @role_required("EMPRESA")
+@require_POST
 def gestionar_postulacion(request, postulacion_id, accion):
     """
     Permite aceptar o rechazar una postulación.
     - accion = 'aceptar' o 'rechazar'
     """
-    postulacion = get_object_or_404(Postulacion, id=postulacion_id)
+    postulacion = get_object_or_404(Postulacion.objects.para_gestion(), id=postulacion_id)
     proyecto = postulacion.proyecto
     aprendiz = postulacion.aprendiz
 
-    # Validación de permisos
-    if proyecto.empresa != request.user.perfil_empresa:
+    # Validación de permisos (el perfil de empresa comparte pk con su usuario)
+    if proyecto.empresa_id != request.user.pk:
         messages.error(request, "❌ No tienes permisos para realizar esta acción.")
         return redirect('empresas:dashboard_empresa')
 
-    if postulacion.estado != "PENDIENTE":
-        messages.warning(request, "⚠️ Esta postulación ya fue procesada.")
+    if accion not in ("aceptar", "rechazar"):
+        messages.warning(request, "⚠️ Acción no válida.")
         return redirect('empresas:postulaciones_proyecto', pk=proyecto.id)
 
-    if accion == "aceptar":
-        postulacion.estado = "ACEPTADA"
-        postulacion.save()
-
-        # 🔹 Añadir el proyecto al perfil del aprendiz
-        aprendiz.proyectos_asignados.add(proyecto)
-
+    # Cambio de estado condicionado a PENDIENTE y asignación en una transacción (ver postulaciones.resolver).
+    resultado = postulaciones.resolver(proyecto.id, **{accion: [postulacion.id]})
+    if resultado.conflictos:
+        messages.warning(request, "⚠️ Esta postulación ya fue procesada.")
+    elif resultado.sin_cupo:
+        messages.warning(request, f"⚠️ El proyecto '{proyecto.nombre}' ya completó su cupo de aprendices.")
+    elif resultado.aceptadas:
         messages.success(request, f"✅ {aprendiz.usuario.username} ha sido aceptado para el proyecto '{proyecto.nombre}'.")
-
-    elif accion == "rechazar":
-        postulacion.estado = "RECHAZADA"
-        postulacion.save()
+    else:
         messages.info(request, f"❌ {aprendiz.usuario.username} ha sido rechazado para el proyecto '{proyecto.nombre}'.")
 
-    else:
-        messages.warning(request, "⚠️ Acción no válida.")
+    return redirect('empresas:postulaciones_proyecto', pk=proyecto.id)
+
+
+@role_required("EMPRESA")
+@require_POST
+def gestionar_postulaciones(request, pk):
+    """Acepta o rechaza en bloque las postulaciones de aprendices marcadas en un proyecto."""
+    proyecto = get_object_or_404(SolicitudProyecto.objects.only('nombre'), pk=pk, empresa_id=request.user.pk)
+    accion = request.POST.get('accion')
+    ids = [int(pk) for pk in request.POST.getlist('postulaciones') if pk.isdigit()]
+    if accion not in ("aceptar", "rechazar") or not ids:
+        messages.error(request, "⚠️ Marca al menos una postulación y elige si la aceptas o la rechazas.")
+        return redirect('empresas:postulaciones_proyecto', pk=proyecto.id)
 
+    resultado = postulaciones.resolver(proyecto.id, **{accion: ids})
+    if resultado.aceptadas:
+        messages.success(request, f"✅ {len(resultado.aceptadas)} aprendiz(ces) aceptado(s) en '{proyecto.nombre}'.")
+    if resultado.rechazadas:
+        messages.info(request, f"❌ {len(resultado.rechazadas)} postulación(es) rechazada(s).")
+    if resultado.sin_cupo:
+        messages.warning(request, f"⚠️ {len(resultado.sin_cupo)} postulación(es) siguen pendientes: el proyecto completó su cupo.")
+    if resultado.conflictos:
+        messages.warning(request, f"⚠️ {len(resultado.conflictos)} postulación(es) ya habían sido procesadas.")
     return redirect('empresas:postulaciones_proyecto', pk=proyecto.id)
 
 @role_required("EMPRESA")
@@ -188,7 +208,7 @@ def gestionar_postulacion_instructor(request, postulacion_id, accion):
     """
     Permite aceptar o rechazar una postulación de instructor guía.
     """
-    postulacion = get_object_or_404(PostulacionInstructor, id=postulacion_id)
+    postulacion = get_object_or_404(PostulacionInstructor.objects.para_gestion(), id=postulacion_id)
     proyecto = postulacion.proyecto
 
     # Validar que la empresa sea dueña del proyecto
@@ -220,7 +240,7 @@ def gestionar_postulacion_instructor(request, postulacion_id, accion):
 
 def detalle_proyecto_empresa(request, pk):
     # Obtener el proyecto específico
-    proyecto = get_object_or_404(SolicitudProyecto, pk=pk)
+    proyecto = get_object_or_404(SolicitudProyecto.objects.con_participantes(), pk=pk)
 
     # Obtener las relaciones directas
     instructor = proyecto.instructor  # puede ser None
@@ -0,0 +1,36 @@
+# gestion/almacenamiento.py
+"""
+Almacenamiento privado para archivos con datos personales.
+
+Lo que se guarda en MEDIA_ROOT se sirve sin autenticación desde MEDIA_URL
+(en desarrollo, `static()` en urls.py; en producción, el servidor web). Los
+reportes generados y los CSV de importación se guardan en
+ARCHIVOS_PRIVADOS_DIR, fuera de MEDIA_ROOT y sin URL pública: solo llegan al
+usuario a través de vistas protegidas, como `descargar_reporte`.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class AlmacenamientoPrivado(FileSystemStorage):
+    """FileSystemStorage sobre ARCHIVOS_PRIVADOS_DIR (leído en cada uso) y sin URL."""
+
+    @property
+    def base_location(self):
+        return str(settings.ARCHIVOS_PRIVADOS_DIR)
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    @property
+    def base_url(self):
+        # Sin URL: `url()` falla en lugar de apuntar a MEDIA_URL.
+        return None
+
+
+privado = AlmacenamientoPrivado()
@@ -5,3 +5,7 @@ class GestionConfig(AppConfig):
     name = 'gestion'  # Debe coincidir con el nombre de la carpeta
     verbose_name = 'Gestión Administrativa OASIS'
     label = 'gestion'
+
+    def ready(self):
+        import gestion.checks
+        import gestion.signals
@@ -0,0 +1,20 @@
+# gestion/checks.py
+from django.core.checks import Tags, Warning, register
+
+from .contadores import cache_compartida
+
+
+@register(Tags.caches, deploy=True)
+def cache_para_varios_procesos(app_configs, **kwargs):
+    """
+    Con varios procesos (gunicorn, workers) la caché en memoria no sirve: los
+    contadores, las invalidaciones de los workers y las claves de idempotencia de
+    `usuario.utils.idempotente` quedarían en el proceso que las escribió.
+    """
+    if cache_compartida():
+        return []
+    return [Warning(
+        "La caché por defecto es local a cada proceso.",
+        hint="Use OASIS_CACHE=archivo u OASIS_CACHE=db en producción.",
+        id='gestion.W001',
+    )]
@@ -0,0 +1,204 @@
+# gestion/contadores.py
+"""
+Caché de contadores del dashboard administrativo.
+
+Las métricas de `gestion.metricas` se guardan como contadores planos en la caché
+de Django (una clave por rol, estado, sector, programa...). Las señales de
+`gestion.signals` los ajustan de forma incremental en cada alta, cambio o baja,
+y el comando `reconciliar_contadores` los recalcula por completo para corregir
+cualquier desviación. Leer el dashboard es entonces un `get_many` de la caché.
+"""
+import hashlib
+from collections import Counter
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from usuario.models import Usuario
+from empresas.models import SolicitudProyecto, Postulacion, PostulacionInstructor
+from .metricas import MetricasSnapshot, CLAVES_ROL, SIN_SECTOR, SIN_PROGRAMA, calcular_metricas
+
+
+PREFIJO = "oasis:contadores:"
+CLAVE_INDICE = PREFIJO + "indice"
+
+
+def _clave_cache(clave: str) -> str:
+    """Las claves llevan nombres de sector/programa (espacios, tildes): se normalizan con un hash."""
+    return PREFIJO + hashlib.md5(clave.encode('utf-8')).hexdigest()
+
+
+# --- Conversión entre snapshot y contadores planos ---
+
+def _contadores_de_snapshot(metricas: MetricasSnapshot) -> dict:
+    contadores = {
+        "usuarios:total": metricas.total_usuarios,
+        "usuarios:activos": metricas.usuarios_activos,
+        "usuarios:inactivos": metricas.usuarios_inactivos,
+    }
+    for rol, clave in CLAVES_ROL.items():
+        contadores[f"usuarios:rol:{rol}"] = metricas.usuarios_por_rol.get(clave, 0)
+    for estado, total in metricas.proyectos_por_estado.items():
+        contadores[f"proyectos:estado:{estado}"] = total
+    for sector, total in metricas.proyectos_por_sector.items():
+        contadores[f"proyectos:sector:{sector}"] = total
+    for programa, total in metricas.proyectos_por_programa.items():
+        contadores[f"proyectos:programa:{programa}"] = total
+    for estado, total in metricas.postulaciones_aprendices.items():
+        contadores[f"postulaciones:APRENDIZ:{estado}"] = total
+    for estado, total in metricas.postulaciones_instructores.items():
+        contadores[f"postulaciones:INSTRUCTOR:{estado}"] = total
+    return contadores
+
+
+def _snapshot_de_contadores(contadores: dict) -> MetricasSnapshot:
+    metricas = MetricasSnapshot(
+        total_usuarios=contadores.get("usuarios:total", 0),
+        usuarios_activos=contadores.get("usuarios:activos", 0),
+        usuarios_inactivos=contadores.get("usuarios:inactivos", 0),
+        usuarios_por_rol={clave: contadores.get(f"usuarios:rol:{rol}", 0) for rol, clave in CLAVES_ROL.items()},
+        proyectos_por_estado={estado: 0 for estado, _ in SolicitudProyecto.ESTADO_CHOICES},
+        postulaciones_aprendices={estado: 0 for estado, _ in Postulacion.ESTADOS},
+        postulaciones_instructores={estado: 0 for estado, _ in PostulacionInstructor.ESTADOS},
+    )
+    sectores, programas = Counter(), Counter()
+    for clave, total in contadores.items():
+        grupo, _, valor = clave.partition(":")
+        dimension, _, valor = valor.partition(":")
+        if grupo == "proyectos" and dimension == "estado":
+            metricas.proyectos_por_estado[valor] = total
+        elif grupo == "proyectos" and dimension == "sector" and total:
+            sectores[valor] = total
+        elif grupo == "proyectos" and dimension == "programa" and total:
+            programas[valor] = total
+        elif grupo == "postulaciones" and dimension == "APRENDIZ":
+            metricas.postulaciones_aprendices[valor] = total
+        elif grupo == "postulaciones" and dimension == "INSTRUCTOR":
+            metricas.postulaciones_instructores[valor] = total
+    metricas.proyectos_por_sector = dict(sectores.most_common())
+    metricas.proyectos_por_programa = dict(programas.most_common())
+    return metricas
+
+
+# --- Firmas: contadores a los que aporta una fila concreta ---
+
+def firma(modelo, pk, recien_creada=None) -> list:
+    """
+    Devuelve la lista de contadores a los que suma la fila `pk` de `modelo`,
+    leída directamente de la base de datos (lista vacía si ya no existe).
+
+    Una postulación recién insertada (`recien_creada`) tiene en memoria
+    exactamente lo que se escribió: su estado se toma de ahí sin releerla.
+    """
+    if modelo is Usuario:
+        fila = Usuario.objects.filter(pk=pk).values('rol', 'is_active').first()
+        if fila is None:
+            return []
+        return [
+            "usuarios:total",
+            f"usuarios:rol:{fila['rol']}",
+            "usuarios:activos" if fila['is_active'] else "usuarios:inactivos",
+        ]
+
+    if modelo is SolicitudProyecto:
+        fila = (
+            SolicitudProyecto.objects.filter(pk=pk)
+            .values('estado', 'empresa__sector__nombre', 'programa_formativo__nombre')
+            .first()
+        )
+        if fila is None:
+            return []
+        return [
+            f"proyectos:estado:{fila['estado']}",
+            f"proyectos:sector:{fila['empresa__sector__nombre'] or SIN_SECTOR}",
+            f"proyectos:programa:{fila['programa_formativo__nombre'] or SIN_PROGRAMA}",
+        ]
+
+    tipo = "APRENDIZ" if modelo is Postulacion else "INSTRUCTOR"
+    if recien_creada is not None:
+        return [f"postulaciones:{tipo}:{recien_creada.estado}"]
+    estado = modelo.objects.filter(pk=pk).values_list('estado', flat=True).first()
+    return [] if estado is None else [f"postulaciones:{tipo}:{estado}"]
+
+
+def diferencia(anterior: list, actual: list) -> dict:
+    """Deltas a aplicar para pasar de la firma `anterior` a la `actual`."""
+    deltas = Counter(actual)
+    deltas.subtract(Counter(anterior))
+    return {clave: delta for clave, delta in deltas.items() if delta}
+
+
+# --- API pública ---
+
+def ajustar(deltas: dict) -> None:
+    """
+    Aplica incrementos/decrementos a los contadores cacheados. Si falta alguna
+    clave (caché fría, expulsada o sector/programa nuevo) se invalida todo el
+    conjunto para que la próxima lectura lo reconstruya desde la base de datos.
+    """
+    if not deltas or cache.get(CLAVE_INDICE) is None:
+        return
+    for clave, delta in deltas.items():
+        try:
+            cache.incr(_clave_cache(clave), delta)
+        except ValueError:
+            invalidar()
+            return
+
+
+def cache_compartida() -> bool:
+    """
+    False si la caché vive solo en este proceso (locmem o dummy): lo que escriba
+    un worker (ajustes de contadores, invalidaciones) nunca llega al servidor web.
+    """
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def invalidar() -> None:
+    """Descarta los contadores cacheados; se recalculan en la siguiente lectura."""
+    cache.delete(CLAVE_INDICE)
+
+
+def _leer(claves: list) -> dict:
+    claves_cache = {_clave_cache(clave): clave for clave in claves}
+    return {claves_cache[k]: total for k, total in cache.get_many(list(claves_cache)).items()}
+
+
+def _recalcular() -> dict:
+    contadores = _contadores_de_snapshot(calcular_metricas())
+    cache.set_many({_clave_cache(clave): total for clave, total in contadores.items()}, timeout=None)
+    cache.set(CLAVE_INDICE, list(contadores), timeout=None)
+    return contadores
+
+
+def reconciliar() -> dict:
+    """
+    Recalcula todas las métricas con `calcular_metricas()` y reescribe la caché.
+    Devuelve las diferencias encontradas respecto a los contadores previos
+    ({clave: (cacheado, real)}), útil para detectar desviaciones.
+    """
+    indice_previo = cache.get(CLAVE_INDICE) or []
+    previos = _leer(indice_previo)
+
+    contadores = _recalcular()
+
+    desviaciones = {}
+    if indice_previo:
+        for clave in set(contadores) | set(indice_previo):
+            cacheado = previos.get(clave, 0)
+            real = contadores.get(clave, 0)
+            if cacheado != real:
+                desviaciones[clave] = (cacheado, real)
+    return desviaciones
+
+
+def obtener_metricas() -> MetricasSnapshot:
+    """Lee las métricas del dashboard desde la caché, reconstruyéndola si hace falta."""
+    indice = cache.get(CLAVE_INDICE)
+    if indice is not None:
+        valores = _leer(indice)
+        if len(valores) == len(indice):
+            return _snapshot_de_contadores(valores)
+
+    return _snapshot_de_contadores(_recalcular())
@@ -0,0 +1,39 @@
+# gestion/contrasenas.py
+"""
+Hash de contraseñas en un pool de procesos para las cargas masivas.
+
+Este módulo se importa también en los procesos hijos del pool (arrancados con
+'spawn', igual que en Windows) antes de django.setup(): no importa modelos.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+# Por debajo de esto no compensa arrancar procesos.
+MINIMO_PARA_PROCESOS = 32
+
+
+def _inicializar_proceso():
+    django.setup()
+
+
+def _hashear(contrasenas) -> list:
+    from django.contrib.auth.hashers import make_password
+    return [make_password(contrasena) for contrasena in contrasenas]
+
+
+def hashear(contrasenas, procesos=1) -> list:
+    """
+    Hashes (con el hasher por defecto de PASSWORD_HASHERS) de `contrasenas`, en el
+    mismo orden. Con más de un proceso se reparten por bloques en el pool.
+    """
+    contrasenas = list(contrasenas)
+    if procesos <= 1 or len(contrasenas) < MINIMO_PARA_PROCESOS:
+        return _hashear(contrasenas)
+
+    tamano = max(1, len(contrasenas) // (procesos * 4))
+    bloques = [contrasenas[inicio:inicio + tamano] for inicio in range(0, len(contrasenas), tamano)]
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=_inicializar_proceso) as pool:
+        return [valor for bloque in pool.map(_hashear, bloques) for valor in bloque]
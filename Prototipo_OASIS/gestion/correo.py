@@ -0,0 +1,204 @@
+# gestion/correo.py
+"""
+Bandeja de salida de correo.
+
+EMAIL_BACKEND apunta a `BackendCola`: enviar un correo (restablecer contraseña,
+notificaciones de proyectos...) solo inserta un `CorreoSaliente`, así que la
+petición ya no espera el saludo SMTP ni el TLS del proveedor. Si la transacción
+de la petición se deshace, el correo tampoco sale.
+
+El worker `enviar_correos` entrega la bandeja con el backend real
+(CORREO_BACKEND_ENTREGA):
+
+- Reclama un lote de hasta CORREO_LOTE correos con un UPDATE condicional que los
+  marca con un identificador de lote, de modo que varios workers no se pisan.
+- Envía todo el lote por una sola conexión SMTP, sin superar CORREO_POR_MINUTO.
+- Un fallo transitorio reprograma el correo con espera exponencial
+  (CORREO_ESPERA_BASE_SEGUNDOS · 2^intentos, hasta CORREO_ESPERA_MAXIMA_SEGUNDOS).
+  Tras CORREO_REINTENTOS intentos, o ante un rechazo definitivo (5xx), queda FALLIDO.
+- Los correos de un worker que murió a medio lote vuelven a la cola pasados
+  CORREO_BLOQUEO_SEGUNDOS. La entrega es "al menos una vez".
+"""
+import base64
+import logging
+import smtplib
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CorreoSaliente
+
+logger = logging.getLogger(__name__)
+
+BACKEND_ENTREGA = 'django.core.mail.backends.smtp.EmailBackend'
+LOTE = 50
+REINTENTOS = 6
+ESPERA_BASE_SEGUNDOS = 30
+ESPERA_MAXIMA_SEGUNDOS = 3600
+BLOQUEO_SEGUNDOS = 600
+
+
+def _ajuste(nombre, defecto):
+    return getattr(settings, f'CORREO_{nombre}', defecto)
+
+
+# --- Encolado ---
+
+def a_registro(mensaje) -> CorreoSaliente:
+    """Copia un EmailMessage (o EmailMultiAlternatives) en un CorreoSaliente sin guardar."""
+    adjuntos = []
+    for adjunto in mensaje.attachments:
+        if not isinstance(adjunto, tuple):
+            raise ValueError("La bandeja de salida solo admite adjuntos (nombre, contenido, tipo).")
+        nombre, contenido, tipo = adjunto
+        if isinstance(contenido, str):
+            contenido = contenido.encode('utf-8')
+        adjuntos.append([nombre, base64.b64encode(contenido).decode('ascii'), tipo])
+
+    return CorreoSaliente(
+        remitente=mensaje.from_email or settings.DEFAULT_FROM_EMAIL,
+        destinatarios=list(mensaje.to), cc=list(mensaje.cc), cco=list(mensaje.bcc),
+        responder_a=list(mensaje.reply_to), cabeceras=dict(mensaje.extra_headers),
+        asunto=mensaje.subject, cuerpo=mensaje.body, subtipo=mensaje.content_subtype,
+        alternativas=[list(alternativa) for alternativa in getattr(mensaje, 'alternatives', [])],
+        adjuntos=adjuntos,
+    )
+
+
+def a_mensaje(correo: CorreoSaliente, conexion=None) -> EmailMultiAlternatives:
+    mensaje = EmailMultiAlternatives(
+        subject=correo.asunto, body=correo.cuerpo, from_email=correo.remitente,
+        to=correo.destinatarios, cc=correo.cc, bcc=correo.cco, reply_to=correo.responder_a,
+        headers=correo.cabeceras, connection=conexion,
+        alternatives=[tuple(alternativa) for alternativa in correo.alternativas],
+    )
+    mensaje.content_subtype = correo.subtipo
+    for nombre, contenido, tipo in correo.adjuntos:
+        mensaje.attach(nombre, base64.b64decode(contenido), tipo)
+    return mensaje
+
+
+class BackendCola(BaseEmailBackend):
+    """Backend de correo que encola los mensajes en la bandeja de salida en un solo INSERT."""
+
+    def send_messages(self, email_messages):
+        correos = [a_registro(mensaje) for mensaje in email_messages if mensaje.recipients()]
+        if correos:
+            CorreoSaliente.objects.bulk_create(correos)
+        return len(correos)
+
+
+# --- Entrega ---
+
+class Limitador:
+    """Espacia los envíos para no superar `por_minuto` (sin límite si es 0 o None)."""
+
+    def __init__(self, por_minuto=None):
+        self.intervalo = 60 / por_minuto if por_minuto else 0
+        self.siguiente = 0.0
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        ahora = time.monotonic()
+        if self.siguiente > ahora:
+            time.sleep(self.siguiente - ahora)
+        self.siguiente = max(ahora, self.siguiente) + self.intervalo
+
+
+def espera(intentos) -> timedelta:
+    """Espera antes del siguiente intento tras `intentos` fallidos."""
+    base = _ajuste('ESPERA_BASE_SEGUNDOS', ESPERA_BASE_SEGUNDOS)
+    return timedelta(seconds=min(base * 2 ** max(0, intentos - 1), _ajuste('ESPERA_MAXIMA_SEGUNDOS', ESPERA_MAXIMA_SEGUNDOS)))
+
+
+def _permanente(error) -> bool:
+    """Rechazos que no se arreglan reintentando: destinatarios inválidos o respuestas 5xx."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+
+def liberar_bloqueados() -> int:
+    """Devuelve a la cola los correos de lotes que nunca terminaron."""
+    limite = timezone.now() - timedelta(seconds=_ajuste('BLOQUEO_SEGUNDOS', BLOQUEO_SEGUNDOS))
+    return CorreoSaliente.objects.filter(estado=CorreoSaliente.EN_PROCESO, tomado_en__lt=limite).update(
+        estado=CorreoSaliente.PENDIENTE, reclamado_por=""
+    )
+
+
+def reclamar(lote=None) -> list:
+    """Marca con un identificador propio hasta `lote` correos vencidos y los devuelve."""
+    ahora = timezone.now()
+    ids = list(
+        CorreoSaliente.objects.filter(estado=CorreoSaliente.PENDIENTE, proximo_intento__lte=ahora)
+        .order_by('proximo_intento', 'pk').values_list('pk', flat=True)[:lote or _ajuste('LOTE', LOTE)]
+    )
+    if not ids:
+        return []
+    marca = uuid.uuid4().hex
+    CorreoSaliente.objects.filter(pk__in=ids, estado=CorreoSaliente.PENDIENTE).update(
+        estado=CorreoSaliente.EN_PROCESO, reclamado_por=marca, tomado_en=ahora
+    )
+    return list(CorreoSaliente.objects.filter(reclamado_por=marca, estado=CorreoSaliente.EN_PROCESO).order_by('pk'))
+
+
+def _registrar_fallo(correo, error):
+    intentos = correo.intentos + 1
+    definitivo = _permanente(error) or intentos >= _ajuste('REINTENTOS', REINTENTOS)
+    CorreoSaliente.objects.filter(pk=correo.pk).update(
+        estado=CorreoSaliente.FALLIDO if definitivo else CorreoSaliente.PENDIENTE,
+        intentos=F('intentos') + 1, proximo_intento=timezone.now() + espera(intentos),
+        reclamado_por="", error=f"{type(error).__name__}: {error}",
+    )
+    return definitivo
+
+
+def enviar_lote(lote=None, limitador=None) -> dict:
+    """
+    Entrega un lote de la bandeja por una sola conexión. Devuelve cuántos correos
+    se enviaron, se reprogramaron y fallaron definitivamente.
+    """
+    totales = {'enviados': 0, 'reprogramados': 0, 'fallidos': 0}
+    correos = reclamar(lote)
+    if not correos:
+        return totales
+    limitador = limitador or Limitador(_ajuste('POR_MINUTO', None))
+    conexion = get_connection(_ajuste('BACKEND_ENTREGA', BACKEND_ENTREGA), fail_silently=False)
+    enviados = []
+    pendientes = list(correos)
+    try:
+        conexion.open()
+        while pendientes:
+            correo = pendientes.pop(0)
+            limitador.esperar()
+            try:
+                conexion.send_messages([a_mensaje(correo, conexion)])
+            except Exception as e:
+                clave = 'fallidos' if _registrar_fallo(correo, e) else 'reprogramados'
+                totales[clave] += 1
+                logger.warning("No se pudo enviar el correo #%s: %s", correo.pk, e)
+                # Tras un error la sesión SMTP puede haber quedado inservible.
+                conexion.close()
+                conexion.open()
+            else:
+                enviados.append(correo.pk)
+    except Exception as e:
+        # No hay conexión con el proveedor: el resto del lote vuelve a la cola.
+        logger.warning("Sin conexión de correo; se reprograman %s correos: %s", len(pendientes), e)
+        for correo in pendientes:
+            totales['fallidos' if _registrar_fallo(correo, e) else 'reprogramados'] += 1
+    finally:
+        conexion.close()
+        if enviados:
+            CorreoSaliente.objects.filter(pk__in=enviados).update(
+                estado=CorreoSaliente.ENVIADO, enviado_en=timezone.now(), reclamado_por="", error=""
+            )
+    totales['enviados'] = len(enviados)
+    return totales
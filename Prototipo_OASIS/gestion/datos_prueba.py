@@ -0,0 +1,182 @@
+# gestion/datos_prueba.py
+"""
+Generación de datos sintéticos para pruebas de carga y benchmarks.
+
+`base_de_datos_temporal()` crea una base SQLite en un archivo temporal (con todas
+las migraciones aplicadas) y la elimina al salir, de modo que los benchmarks nunca
+tocan db.sqlite3. `sembrar()` la llena con `bulk_create` por lotes y `actores()`
+elige en esos datos un usuario de cada rol para las pruebas de las vistas.
+
+`programa()`, `empresa()` y `proyecto()` crean las filas mínimas que repiten las
+pruebas unitarias (el programa ADSO, una empresa y un proyecto aprobado).
+"""
+import os
+import random
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+
+from usuario import busqueda
+from usuario.models import Usuario, PerfilEmpresa, PerfilAprendiz, PerfilInstructor, ProgramaFormativo, SectorProductivo
+from empresas.models import SolicitudProyecto, Postulacion, PostulacionInstructor
+from instructores.models import AsignacionInstructor
+
+
+LOTE = 5000
+CONTRASENA = "oasis-benchmark"
+
+
+@contextmanager
+def base_de_datos_temporal():
+    """Crea y activa una base de datos de prueba en un archivo temporal."""
+    directorio = tempfile.mkdtemp(prefix="oasis_bench_")
+    ajustes = settings.DATABASES['default'].setdefault('TEST', {})
+    nombre_previo = ajustes.get('NAME')
+    ajustes['NAME'] = os.path.join(directorio, "bench.sqlite3")
+
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield ajustes['NAME']
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        ajustes['NAME'] = nombre_previo
+        if os.path.isdir(directorio):
+            os.rmdir(directorio)
+
+
+def _en_lotes(modelo, objetos):
+    for inicio in range(0, len(objetos), LOTE):
+        modelo.objects.bulk_create(objetos[inicio:inicio + LOTE])
+
+
+def sembrar(usuarios=1000, proyectos_por_empresa=2, postulaciones_por_aprendiz=2, semilla=42) -> dict:
+    """
+    Crea `usuarios` usuarios (80% aprendices, 10% instructores, 10% empresas) con
+    sus perfiles, proyectos y postulaciones. Devuelve el número de filas por entidad.
+    """
+    aleatorio = random.Random(semilla)
+    contrasena = make_password(CONTRASENA)
+
+    sectores = [SectorProductivo(nombre=f"Sector {i}") for i in range(8)]
+    SectorProductivo.objects.bulk_create(sectores)
+    programas = [
+        ProgramaFormativo(nombre=f"Programa {i}", tipo=ProgramaFormativo.TECNOLOGO, codigo=f"P{i:04d}")
+        for i in range(12)
+    ]
+    ProgramaFormativo.objects.bulk_create(programas)
+    sectores = list(SectorProductivo.objects.all())
+    programas = list(ProgramaFormativo.objects.all())
+
+    roles = [Usuario.APRENDIZ] * 8 + [Usuario.INSTRUCTOR, Usuario.EMPRESA]
+    _en_lotes(Usuario, [
+        Usuario(
+            username=f"usuario{i:06d}", email=f"usuario{i:06d}@oasis.test", password=contrasena,
+            first_name=f"Nombre{i}", last_name=f"Apellido{i}", rol=roles[i % len(roles)],
+        )
+        for i in range(usuarios)
+    ])
+
+    ids_por_rol = {rol: [] for rol in set(roles)}
+    for pk, rol in Usuario.objects.filter(username__startswith="usuario").values_list('pk', 'rol'):
+        ids_por_rol[rol].append(pk)
+
+    _en_lotes(PerfilEmpresa, [
+        PerfilEmpresa(usuario_id=pk, razon_social=f"Empresa {pk}", nit=f"9{pk:09d}", telefono="3000000000",
+                      sector=aleatorio.choice(sectores))
+        for pk in ids_por_rol[Usuario.EMPRESA]
+    ])
+    _en_lotes(PerfilAprendiz, [
+        PerfilAprendiz(usuario_id=pk, documento=f"{pk:010d}", ficha=f"{2500000 + pk % 500}",
+                       programa=aleatorio.choice(programas))
+        for pk in ids_por_rol[Usuario.APRENDIZ]
+    ])
+    _en_lotes(PerfilInstructor, [
+        PerfilInstructor(usuario_id=pk, documento=f"{pk:010d}", area_conocimiento=aleatorio.choice(["Software", "Redes", "Diseño"]))
+        for pk in ids_por_rol[Usuario.INSTRUCTOR]
+    ])
+
+    areas = [codigo for codigo, _ in SolicitudProyecto.AREA_CHOICES]
+    estados = ["APROBADO", "APROBADO", "PENDIENTE", "RECHAZADO", "EN_DESARROLLO"]
+    _en_lotes(SolicitudProyecto, [
+        SolicitudProyecto(
+            nombre=f"Proyecto {pk}-{n}", descripcion=f"Descripción del proyecto {n} de la empresa {pk}",
+            area=aleatorio.choice(areas), duracion_semanas=aleatorio.randint(4, 24),
+            estado=aleatorio.choice(estados), empresa_id=pk, programa_formativo=aleatorio.choice(programas),
+        )
+        for pk in ids_por_rol[Usuario.EMPRESA] for n in range(proyectos_por_empresa)
+    ])
+
+    proyectos = list(SolicitudProyecto.objects.values_list('pk', flat=True))
+    if proyectos:
+        _en_lotes(Postulacion, [
+            Postulacion(aprendiz_id=pk, proyecto_id=proyecto)
+            for pk in ids_por_rol[Usuario.APRENDIZ]
+            for proyecto in aleatorio.sample(proyectos, min(postulaciones_por_aprendiz, len(proyectos)))
+        ])
+        _en_lotes(PostulacionInstructor, [
+            PostulacionInstructor(instructor_id=pk, proyecto_id=aleatorio.choice(proyectos))
+            for pk in ids_por_rol[Usuario.INSTRUCTOR]
+        ])
+
+    # bulk_create no dispara señales: el índice de búsqueda se reconstruye completo.
+    busqueda.reconstruir()
+
+    return {
+        'usuarios': Usuario.objects.count(),
+        'proyectos': len(proyectos),
+        'postulaciones': Postulacion.objects.count(),
+    }
+
+
+def actores() -> dict:
+    """
+    Sobre datos ya sembrados, devuelve un usuario por rol con relaciones útiles
+    para recorrer sus pantallas: un proyecto de la empresa con postulaciones de
+    aprendices e instructores, un aprendiz con programa y postulaciones, y un
+    instructor asignado a ese proyecto. Crea además un superusuario administrador.
+    """
+    proyecto = (
+        SolicitudProyecto.objects
+        .filter(postulaciones_aprendices__isnull=False, postulaciones_instructores__isnull=False)
+        .select_related('empresa__usuario')
+        .first()
+    )
+    aprendiz = (
+        PerfilAprendiz.objects.filter(programa__isnull=False, postulaciones_proyecto__isnull=False)
+        .select_related('usuario').first()
+    )
+    instructor = PerfilInstructor.objects.select_related('usuario').first()
+    AsignacionInstructor.objects.get_or_create(instructor=instructor.usuario, proyecto=proyecto)
+
+    admin = Usuario.objects.create_superuser(
+        username="admin_pruebas", email="admin_pruebas@oasis.test", password=CONTRASENA
+    )
+    return {
+        Usuario.ADMIN: admin,
+        Usuario.EMPRESA: proyecto.empresa.usuario,
+        Usuario.APRENDIZ: aprendiz.usuario,
+        Usuario.INSTRUCTOR: instructor.usuario,
+        'proyecto': proyecto,
+    }
+
+
+# --- Filas mínimas para las pruebas unitarias ---
+
+def programa(nombre="ADSO", codigo="228118", tipo=ProgramaFormativo.TECNOLOGO) -> ProgramaFormativo:
+    return ProgramaFormativo.objects.create(nombre=nombre, codigo=codigo, tipo=tipo)
+
+
+def empresa(username="empresa1", password="x", **campos) -> PerfilEmpresa:
+    """Usuario de rol EMPRESA; su perfil lo crea la señal de alta."""
+    return Usuario.objects.create_user(username=username, password=password, rol=Usuario.EMPRESA, **campos).perfil_empresa
+
+
+def proyecto(empresa, programa, nombre="Proyecto", estado="APROBADO", **campos) -> SolicitudProyecto:
+    """Proyecto de `empresa` para `programa` (área DES, 8 semanas, salvo que se indique otra cosa)."""
+    campos = {'descripcion': "...", 'area': "DES", 'duracion_semanas': 8, **campos}
+    return SolicitudProyecto.objects.create(
+        nombre=nombre, estado=estado, empresa=empresa, programa_formativo=programa, **campos,
+    )
@@ -0,0 +1,137 @@
+# gestion/decisiones.py
+"""
+Aprobación y rechazo de solicitudes de proyecto, una o muchas a la vez.
+
+Cada tipo de decisión es un solo UPDATE sobre todas las solicitudes elegidas:
+
+    UPDATE ... SET estado = 'APROBADO', motivo_aprobacion = CASE id WHEN ... END, fecha_decision = ...
+    WHERE id IN (...) AND estado = 'PENDIENTE'
+
+La condición sobre `estado` es una concurrencia optimista: si otro administrador
+ya decidió alguna, esa fila no se toca y se informa como conflicto. Como update()
+no dispara señales, los contadores del dashboard y el índice de proyectos
+disponibles (aprendices.emparejamiento) se ajustan aquí, y las
+notificaciones a las empresas se encolan en la bandeja de salida al confirmar la
+transacción (gestion.correo), fuera del UPDATE.
+"""
+import logging
+from dataclasses import dataclass, field
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Case, TextField, Value, When
+from django.utils import timezone
+
+from aprendices import emparejamiento
+from empresas.models import SolicitudProyecto
+from . import contadores
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE = "PENDIENTE"
+APROBADO = "APROBADO"
+RECHAZADO = "RECHAZADO"
+CAMPO_MOTIVO = {APROBADO: 'motivo_aprobacion', RECHAZADO: 'motivo_rechazo'}
+
+
+@dataclass
+class Resultado:
+    aplicadas: dict = field(default_factory=dict)   # estado -> [ids actualizados]
+    conflictos: list = field(default_factory=list)  # ids que ya no estaban pendientes
+
+    @property
+    def total(self):
+        return sum(len(ids) for ids in self.aplicadas.values())
+
+
+def _motivo(motivos: dict):
+    """Un valor si todas comparten motivo; si no, un CASE por id."""
+    distintos = set(motivos.values())
+    if len(distintos) == 1:
+        return Value(distintos.pop())
+    return Case(*[When(pk=pk, then=Value(motivo)) for pk, motivo in motivos.items()], output_field=TextField())
+
+
+def decidir(decisiones: dict) -> Resultado:
+    """
+    Aplica `decisiones` ({APROBADO|RECHAZADO: {id: motivo}}) en una transacción,
+    con un UPDATE por tipo de decisión. Solo cambian las solicitudes que siguen
+    PENDIENTE; el resto queda en `conflictos`.
+    """
+    resultado = Resultado()
+    ahora = timezone.now()
+    with transaction.atomic():
+        for estado, motivos in decisiones.items():
+            if estado not in CAMPO_MOTIVO:
+                raise ValueError(f"Decisión no válida: {estado}")
+            if not motivos:
+                continue
+            # Bloquea las filas (PostgreSQL/MySQL) para que el UPDATE toque exactamente estas.
+            pendientes = list(
+                SolicitudProyecto.objects.select_for_update()
+                .filter(pk__in=list(motivos), estado=PENDIENTE).values_list('pk', flat=True)
+            )
+            resultado.conflictos.extend(sorted(set(motivos) - set(pendientes)))
+            if not pendientes:
+                continue
+            SolicitudProyecto.objects.filter(pk__in=pendientes, estado=PENDIENTE).update(
+                estado=estado, fecha_decision=ahora, actualizado_en=ahora,
+                **{CAMPO_MOTIVO[estado]: _motivo({pk: motivos[pk] for pk in pendientes})},
+            )
+            resultado.aplicadas[estado] = pendientes
+
+        if resultado.total:
+            deltas = {f"proyectos:estado:{PENDIENTE}": -resultado.total}
+            for estado, ids in resultado.aplicadas.items():
+                deltas[f"proyectos:estado:{estado}"] = len(ids)
+            ids = [pk for ids in resultado.aplicadas.values() for pk in ids]
+            transaction.on_commit(lambda: contadores.ajustar(deltas))
+            transaction.on_commit(lambda: emparejamiento.proyectos_cambiados(ids))
+            transaction.on_commit(lambda: notificar(ids))
+    return resultado
+
+
+# --- Notificaciones ---
+
+ASUNTOS = {
+    APROBADO: "✅ Tu proyecto '{nombre}' fue aprobado",
+    RECHAZADO: "❌ Tu proyecto '{nombre}' fue rechazado",
+}
+
+
+def mensajes(ids) -> list:
+    """Un correo por solicitud decidida para el usuario de su empresa (una sola consulta)."""
+    proyectos = (
+        SolicitudProyecto.objects.filter(pk__in=ids).select_related('empresa__usuario')
+        .only('nombre', 'estado', 'motivo_aprobacion', 'motivo_rechazo', 'empresa__usuario__email',
+              'empresa__usuario__username')
+    )
+    correos = []
+    for proyecto in proyectos:
+        destinatario = proyecto.empresa.usuario.email
+        if not destinatario or proyecto.estado not in ASUNTOS:
+            continue
+        motivo = getattr(proyecto, CAMPO_MOTIVO[proyecto.estado]) or ""
+        correos.append(EmailMessage(
+            subject=ASUNTOS[proyecto.estado].format(nombre=proyecto.nombre),
+            body=(
+                f"Hola {proyecto.empresa.usuario.username},\n\n"
+                f"La solicitud del proyecto '{proyecto.nombre}' fue revisada por el equipo de OASIS.\n\n"
+                f"Motivo: {motivo}\n"
+            ),
+            to=[destinatario],
+        ))
+    return correos
+
+
+def notificar(ids) -> int:
+    """Entrega al backend de correo (la bandeja de salida) las notificaciones de las solicitudes decididas."""
+    correos = mensajes(ids)
+    if not correos:
+        return 0
+    try:
+        return get_connection(fail_silently=False).send_messages(correos) or 0
+    except Exception:
+        # La decisión ya está confirmada: un fallo de correo no debe deshacerla.
+        logger.exception("No se pudieron enviar las notificaciones de %s solicitudes", len(correos))
+        return 0
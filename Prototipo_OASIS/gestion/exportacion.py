@@ -0,0 +1,210 @@
+# gestion/exportacion.py
+"""
+Exportación masiva de las entidades del sistema a CSV (opcionalmente gzip) y XLSX.
+
+Cada entidad se lee con una sola consulta `values_list` que ya trae unidas las
+relaciones necesarias (usuario, sector, programa...), recorrida por lotes con
+`.iterator(chunk_size=...)`; en PostgreSQL esto usa un cursor del lado del
+servidor. Los archivos se producen en flujo: la memoria no depende del número de filas.
+"""
+import csv
+import re
+import tempfile
+import zipfile
+import zlib
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from usuario.models import Usuario, PerfilEmpresa, PerfilAprendiz, PerfilInstructor
+from empresas.models import SolicitudProyecto, Postulacion, PostulacionInstructor
+
+
+TAMANO_LOTE = 2000
+TAMANO_BLOQUE = 64 * 1024
+
+# entidad -> (modelo, [(encabezado, lookup), ...])
+ENTIDADES = {
+    'usuarios': (Usuario, [
+        ("id", 'id'), ("usuario", 'username'), ("email", 'email'), ("nombres", 'first_name'),
+        ("apellidos", 'last_name'), ("rol", 'rol'), ("activo", 'is_active'), ("fecha_registro", 'date_joined'),
+    ]),
+    'empresas': (PerfilEmpresa, [
+        ("usuario_id", 'usuario_id'), ("usuario", 'usuario__username'), ("razon_social", 'razon_social'),
+        ("nit", 'nit'), ("telefono", 'telefono'), ("sector", 'sector__nombre'),
+    ]),
+    'aprendices': (PerfilAprendiz, [
+        ("usuario_id", 'usuario_id'), ("usuario", 'usuario__username'), ("email", 'usuario__email'),
+        ("tipo_documento", 'tipo_documento'), ("documento", 'documento'), ("ficha", 'ficha'),
+        ("programa", 'programa__nombre'),
+    ]),
+    'instructores': (PerfilInstructor, [
+        ("usuario_id", 'usuario_id'), ("usuario", 'usuario__username'), ("email", 'usuario__email'),
+        ("tipo_documento", 'tipo_documento'), ("documento", 'documento'), ("area_conocimiento", 'area_conocimiento'),
+    ]),
+    'proyectos': (SolicitudProyecto, [
+        ("id", 'id'), ("nombre", 'nombre'), ("area", 'area'), ("duracion_semanas", 'duracion_semanas'),
+        ("estado", 'estado'), ("empresa", 'empresa__razon_social'), ("programa", 'programa_formativo__nombre'),
+        ("instructor", 'instructor__usuario__username'), ("creado_en", 'creado_en'), ("fecha_decision", 'fecha_decision'),
+    ]),
+    'postulaciones': (Postulacion, [
+        ("id", 'id'), ("aprendiz", 'aprendiz__usuario__username'), ("documento", 'aprendiz__documento'),
+        ("proyecto_id", 'proyecto_id'), ("proyecto", 'proyecto__nombre'), ("estado", 'estado'),
+        ("fecha_postulacion", 'fecha_postulacion'),
+    ]),
+    'postulaciones_instructores': (PostulacionInstructor, [
+        ("id", 'id'), ("instructor", 'instructor__usuario__username'), ("proyecto_id", 'proyecto_id'),
+        ("proyecto", 'proyecto__nombre'), ("estado", 'estado'), ("fecha_postulacion", 'fecha_postulacion'),
+    ]),
+}
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+def encabezados(entidad) -> list:
+    return [encabezado for encabezado, _ in ENTIDADES[entidad][1]]
+
+
+def filas(entidad, lote=TAMANO_LOTE):
+    """Tuplas de la entidad en orden de clave primaria, leídas por lotes en una sola consulta."""
+    modelo, columnas = ENTIDADES[entidad]
+    consulta = modelo.objects.order_by('pk').values_list(*[lookup for _, lookup in columnas])
+    return consulta.iterator(chunk_size=lote)
+
+
+# Excel y LibreOffice evalúan como fórmula una celda de texto que empieza así
+# (inyección de CSV): se antepone un apóstrofo para que se muestre como texto.
+_INICIO_DE_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, str) and valor.startswith(_INICIO_DE_FORMULA):
+        return "'" + valor
+    return str(valor)
+
+
+# --- CSV ---
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de almacenarla."""
+    def write(self, valor):
+        return valor
+
+
+def exportar_csv(entidad, lote=TAMANO_LOTE):
+    """Generador de bytes CSV (UTF-8 con BOM para que Excel respete las tildes)."""
+    escritor = csv.writer(_Eco())
+    bloque = ["\ufeff" + escritor.writerow(encabezados(entidad))]
+    tamano = 0
+    for fila in filas(entidad, lote):
+        linea = escritor.writerow([_texto(valor) for valor in fila])
+        bloque.append(linea)
+        tamano += len(linea)
+        if tamano >= TAMANO_BLOQUE:
+            yield "".join(bloque).encode('utf-8')
+            bloque, tamano = [], 0
+    if bloque:
+        yield "".join(bloque).encode('utf-8')
+
+
+def comprimir_gzip(bloques):
+    """Comprime en flujo un generador de bytes con formato gzip."""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloque in bloques:
+        comprimido = compresor.compress(bloque)
+        if comprimido:
+            yield comprimido
+    yield compresor.flush()
+
+
+# --- XLSX ---
+
+_CARACTERES_INVALIDOS_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _celda(valor) -> str:
+    if isinstance(valor, bool) or valor is None:
+        valor = _texto(valor)
+    if isinstance(valor, (int, float)):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub("", _texto(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+def exportar_xlsx(entidad, lote=TAMANO_LOTE):
+    """
+    Generador de bytes de un libro XLSX de una hoja (cadenas en línea, sin estilos).
+    El ZIP se arma en un archivo temporal que pasa a disco al superar unos pocos MB.
+    """
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as temporal:
+        with zipfile.ZipFile(temporal, 'w', compression=zipfile.ZIP_DEFLATED) as libro:
+            for nombre, contenido in _XLSX_ESTATICOS.items():
+                libro.writestr(nombre, contenido)
+            libro.writestr('xl/workbook.xml', (
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                f'<sheets><sheet name="{entidad[:31]}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+            ))
+            with libro.open('xl/worksheets/sheet1.xml', 'w') as hoja:
+                hoja.write(
+                    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                )
+                hoja.write(("<row>" + "".join(_celda(e) for e in encabezados(entidad)) + "</row>").encode('utf-8'))
+                for fila in filas(entidad, lote):
+                    hoja.write(("<row>" + "".join(_celda(valor) for valor in fila) + "</row>").encode('utf-8'))
+                hoja.write(b'</sheetData></worksheet>')
+
+        temporal.seek(0)
+        while True:
+            bloque = temporal.read(TAMANO_BLOQUE)
+            if not bloque:
+                break
+            yield bloque
+
+
+def exportar(entidad, formato='csv', lote=TAMANO_LOTE):
+    """Punto de entrada único: generador de bytes de la entidad en el formato pedido."""
+    if formato == 'xlsx':
+        return exportar_xlsx(entidad, lote)
+    if formato == 'csv.gz':
+        return comprimir_gzip(exportar_csv(entidad, lote))
+    return exportar_csv(entidad, lote)
@@ -1,6 +1,7 @@
 # gestion/forms.py
 from django import forms
 from usuario.models import Usuario
+from .models import ImportacionAprendices
 
 class UsuarioForm(forms.ModelForm):
     password = forms.CharField(widget=forms.PasswordInput)
@@ -19,3 +20,19 @@ class UsuarioForm(forms.ModelForm):
         if commit:
             user.save()
         return user
+
+
+class ImportacionAprendicesForm(forms.ModelForm):
+    TAMANO_MAXIMO = 5 * 1024 * 1024
+
+    class Meta:
+        model = ImportacionAprendices
+        fields = ['archivo', 'solo_validas']
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith('.csv'):
+            raise forms.ValidationError("El archivo debe ser un CSV.")
+        if archivo.size > self.TAMANO_MAXIMO:
+            raise forms.ValidationError("El archivo supera el tamaño máximo de 5 MB.")
+        return archivo
@@ -0,0 +1,360 @@
+# gestion/importacion.py
+"""
+Importación masiva de aprendices (una ficha completa) desde un CSV.
+
+El registro uno a uno (`RegistroAprendizForm`) hace por cada aprendiz un
+`full_clean()`, una consulta de unicidad, el hash de la contraseña y un segundo
+INSERT para el perfil. Aquí cada fase trabaja sobre el archivo completo:
+
+1. Lectura y validación de cada fila en memoria (mismas reglas que el registro).
+2. Unicidad de usuario y documento con consultas `__in` por lotes, contra la base
+   y dentro del propio archivo.
+3. Hash de las contraseñas en un pool de procesos (es la fase más costosa: PBKDF2
+   tarda del orden de 0,3 s por contraseña). Sin contraseña, la cuenta queda con
+   contraseña inutilizable y el aprendiz la define con "¿Olvidaste tu contraseña?".
+4. `bulk_create` de Usuario y PerfilAprendiz en una sola transacción. Como
+   bulk_create no dispara señales, al confirmar se indexan los usuarios creados en
+   la búsqueda y se ajustan los contadores del dashboard.
+
+El CSV subido se guarda en el almacenamiento privado (fuera de MEDIA_ROOT) y se
+borra al terminar la importación, haya fallado o no; si el worker se detiene a
+medias, `liberar_bloqueadas` la marca como fallida y lo borra.
+
+Columnas (encabezado obligatorio; las mismas que la exportación de aprendices):
+usuario, email, nombres, apellidos, tipo_documento, documento, ficha, programa
+(código o nombre), contrasena. Se aceptan ',' y ';' como separador.
+"""
+import csv
+import io
+import logging
+import multiprocessing
+import time
+from dataclasses import dataclass, field, asdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from usuario import busqueda
+from usuario.models import Usuario, PerfilAprendiz, ProgramaFormativo
+from . import contadores
+from .contrasenas import hashear as _hashear_en_pool
+from .models import ImportacionAprendices
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS = ['usuario', 'email', 'nombres', 'apellidos', 'tipo_documento', 'documento', 'ficha', 'programa', 'contrasena']
+OBLIGATORIAS = ['usuario', 'documento', 'ficha', 'programa']
+LOTE = 500
+MAX_FILAS = 10_000
+
+_validar_usuario = UnicodeUsernameValidator()
+_TIPOS_DOCUMENTO = {codigo for codigo, _ in PerfilAprendiz.TIPOS_DOCUMENTO}
+
+
+class ArchivoInvalido(Exception):
+    """El archivo no es un CSV legible con las columnas esperadas."""
+
+
+@dataclass
+class Fila:
+    linea: int
+    usuario: str
+    email: str
+    nombres: str
+    apellidos: str
+    tipo_documento: str
+    documento: str
+    ficha: str
+    programa: str
+    contrasena: str
+    programa_id: int = None
+
+
+@dataclass
+class Resultado:
+    filas: int = 0
+    creados: int = 0
+    errores: list = field(default_factory=list)   # [{'linea', 'campo', 'mensaje'}]
+    tiempos: dict = field(default_factory=dict)   # fase -> segundos
+
+    def error(self, linea, campo, mensaje):
+        self.errores.append({'linea': linea, 'campo': campo, 'mensaje': mensaje})
+
+
+# --- Lectura ---
+
+def _decodificar(contenido: bytes) -> str:
+    try:
+        return contenido.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        # CSV guardado desde Excel en español.
+        return contenido.decode('cp1252', errors='replace')
+
+
+def leer(contenido: bytes) -> list:
+    """Filas del CSV (con su número de línea) o ArchivoInvalido."""
+    texto = _decodificar(contenido)
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=',;')
+    except csv.Error:
+        dialecto = csv.excel
+    lector = csv.DictReader(io.StringIO(texto), dialect=dialecto)
+
+    encabezados = [(nombre or '').strip().lower() for nombre in (lector.fieldnames or [])]
+    faltantes = [columna for columna in OBLIGATORIAS if columna not in encabezados]
+    if faltantes:
+        raise ArchivoInvalido(f"Faltan columnas obligatorias: {', '.join(faltantes)}.")
+    lector.fieldnames = encabezados
+
+    filas = []
+    for registro in lector:
+        if len(filas) >= MAX_FILAS:
+            raise ArchivoInvalido(f"El archivo supera el máximo de {MAX_FILAS} filas por importación.")
+        valores = {columna: (registro.get(columna) or '').strip() for columna in COLUMNAS}
+        if not any(valores.values()):
+            continue
+        valores['tipo_documento'] = valores['tipo_documento'].upper() or 'CC'
+        filas.append(Fila(linea=lector.line_num, **valores))
+    return filas
+
+
+# --- Validación ---
+
+def _validar_fila(fila, programas, resultado) -> bool:
+    errores = len(resultado.errores)
+    for columna in OBLIGATORIAS:
+        if not getattr(fila, columna):
+            resultado.error(fila.linea, columna, "Campo obligatorio.")
+    if len(resultado.errores) > errores:
+        return False
+
+    try:
+        _validar_usuario(fila.usuario)
+    except ValidationError as e:
+        resultado.error(fila.linea, 'usuario', e.messages[0])
+    if len(fila.usuario) > 150:
+        resultado.error(fila.linea, 'usuario', "Máximo 150 caracteres.")
+    if fila.email:
+        try:
+            validate_email(fila.email)
+        except ValidationError:
+            resultado.error(fila.linea, 'email', "Correo electrónico inválido.")
+    for columna in ('nombres', 'apellidos'):
+        if len(getattr(fila, columna)) > 150:
+            resultado.error(fila.linea, columna, "Máximo 150 caracteres.")
+    if fila.tipo_documento not in _TIPOS_DOCUMENTO:
+        resultado.error(fila.linea, 'tipo_documento', f"Debe ser uno de: {', '.join(sorted(_TIPOS_DOCUMENTO))}.")
+    if not fila.documento.isalnum():
+        resultado.error(fila.linea, 'documento', "El documento solo puede contener números y letras.")
+    elif len(fila.documento) > 10:
+        resultado.error(fila.linea, 'documento', "Máximo 10 caracteres.")
+    if len(fila.ficha) > 10:
+        resultado.error(fila.linea, 'ficha', "Máximo 10 caracteres.")
+
+    fila.programa_id = programas.get(fila.programa.lower())
+    if fila.programa_id is None:
+        resultado.error(fila.linea, 'programa', f"No existe un programa activo con código o nombre '{fila.programa}'.")
+    if fila.contrasena:
+        try:
+            validate_password(fila.contrasena, Usuario(username=fila.usuario, email=fila.email))
+        except ValidationError as e:
+            resultado.error(fila.linea, 'contrasena', " ".join(e.messages))
+    return len(resultado.errores) == errores
+
+
+def _existentes(consulta, campo, valores) -> set:
+    """Valores de `campo` ya presentes en la base, consultados por lotes."""
+    valores = sorted(set(valores))
+    encontrados = set()
+    for inicio in range(0, len(valores), LOTE):
+        lote = valores[inicio:inicio + LOTE]
+        encontrados.update(consulta.filter(**{f"{campo}__in": lote}).values_list(campo, flat=True))
+    return encontrados
+
+
+def _marcar_repetidos(filas, campo, existentes, etiqueta, resultado) -> set:
+    """Líneas con `campo` ya registrado en la base o repetido en una línea anterior del archivo."""
+    invalidas, vistos = set(), {}
+    for fila in filas:
+        valor = getattr(fila, campo)
+        if valor in existentes:
+            resultado.error(fila.linea, campo, f"Este {etiqueta} ya se encuentra registrado.")
+            invalidas.add(fila.linea)
+        elif valor in vistos:
+            resultado.error(fila.linea, campo, f"{etiqueta.capitalize()} repetido en la línea {vistos[valor]}.")
+            invalidas.add(fila.linea)
+        else:
+            vistos[valor] = fila.linea
+    return invalidas
+
+
+def validar(filas, resultado) -> list:
+    """Filas válidas; los errores quedan en `resultado`."""
+    programas = {}
+    for pk, codigo, nombre in ProgramaFormativo.objects.filter(activo=True).values_list('pk', 'codigo', 'nombre'):
+        programas[codigo.lower()] = programas[nombre.lower()] = pk
+
+    candidatas = [fila for fila in filas if _validar_fila(fila, programas, resultado)]
+    invalidas = _marcar_repetidos(
+        candidatas, 'usuario', _existentes(Usuario.objects.all(), 'username', [f.usuario for f in candidatas]),
+        "nombre de usuario", resultado,
+    )
+    invalidas |= _marcar_repetidos(
+        candidatas, 'documento',
+        _existentes(PerfilAprendiz.objects.all(), 'documento', [f.documento for f in candidatas]),
+        "documento", resultado,
+    )
+    resultado.errores.sort(key=lambda error: error['linea'])
+    return [fila for fila in candidatas if fila.linea not in invalidas]
+
+
+# --- Contraseñas ---
+
+def hashear(contrasenas, procesos=None) -> list:
+    """
+    Hashes de las contraseñas en el mismo orden, calculados en un pool de procesos
+    (IMPORTACION_PROCESOS, por defecto uno por CPU). Las vacías quedan inutilizables.
+    """
+    procesos = procesos or getattr(settings, 'IMPORTACION_PROCESOS', None) or multiprocessing.cpu_count()
+    hashes = [make_password(None) for _ in contrasenas]
+    con_valor = [i for i, contrasena in enumerate(contrasenas) if contrasena]
+    for i, valor in zip(con_valor, _hashear_en_pool([contrasenas[i] for i in con_valor], procesos)):
+        hashes[i] = valor
+    return hashes
+
+
+# --- Inserción ---
+
+def insertar(filas, hashes) -> list:
+    """Crea usuarios y perfiles en una sola transacción; devuelve los ids creados."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        Usuario.objects.bulk_create([
+            Usuario(
+                username=fila.usuario, email=fila.email, first_name=fila.nombres, last_name=fila.apellidos,
+                password=contrasena, rol=Usuario.APRENDIZ, date_joined=ahora,
+            )
+            for fila, contrasena in zip(filas, hashes)
+        ], batch_size=LOTE)
+        ids = {}
+        nombres = [fila.usuario for fila in filas]
+        for inicio in range(0, len(nombres), LOTE):
+            ids.update(Usuario.objects.filter(username__in=nombres[inicio:inicio + LOTE]).values_list('username', 'pk'))
+        PerfilAprendiz.objects.bulk_create([
+            PerfilAprendiz(
+                usuario_id=ids[fila.usuario], tipo_documento=fila.tipo_documento, documento=fila.documento,
+                ficha=fila.ficha, programa_id=fila.programa_id,
+            )
+            for fila in filas
+        ], batch_size=LOTE)
+
+        creados = list(ids.values())
+        transaction.on_commit(lambda: _despues_de_insertar(creados))
+    return creados
+
+
+def _despues_de_insertar(creados):
+    # Lo que harían las señales de post_save, una vez para todo el lote.
+    busqueda.indexar(creados)
+    contadores.ajustar({
+        "usuarios:total": len(creados),
+        f"usuarios:rol:{Usuario.APRENDIZ}": len(creados),
+        "usuarios:activos": len(creados),
+    })
+
+
+def importar(contenido: bytes, solo_validas=False, procesos=None) -> Resultado:
+    """
+    Valida e importa un CSV de aprendices. Si hay errores y no se pide
+    `solo_validas`, no se crea ninguno. Lanza ArchivoInvalido si no se puede leer.
+    """
+    resultado = Resultado()
+    inicio = time.perf_counter()
+    filas = leer(contenido)
+    resultado.filas = len(filas)
+    resultado.tiempos['lectura'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    validas = validar(filas, resultado)
+    resultado.tiempos['validacion'] = time.perf_counter() - inicio
+    if not validas or (resultado.errores and not solo_validas):
+        return resultado
+
+    inicio = time.perf_counter()
+    hashes = hashear([fila.contrasena for fila in validas], procesos)
+    resultado.tiempos['contrasenas'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    try:
+        resultado.creados = len(insertar(validas, hashes))
+    except IntegrityError:
+        # Otro registro tomó un usuario o documento entre la validación y la inserción.
+        resultado.error(0, '', "Un usuario o documento se registró mientras se importaba; vuelve a intentarlo.")
+    resultado.tiempos['insercion'] = time.perf_counter() - inicio
+    return resultado
+
+
+# --- Cola de importaciones ---
+
+def ids_pendientes(limite=None) -> list:
+    ids = (
+        ImportacionAprendices.objects.filter(estado=ImportacionAprendices.PENDIENTE)
+        .order_by('creado_en').values_list('pk', flat=True)
+    )
+    return list(ids[:limite] if limite else ids)
+
+
+def liberar_bloqueadas() -> int:
+    """
+    Marca como fallidas las importaciones que un worker tomó y nunca terminó (EN_PROCESO
+    desde hace más de IMPORTACION_BLOQUEO_SEGUNDOS) y borra su CSV.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.IMPORTACION_BLOQUEO_SEGUNDOS)
+    liberadas = 0
+    for importacion in ImportacionAprendices.objects.filter(
+        estado=ImportacionAprendices.EN_PROCESO, iniciado_en__lt=limite
+    ):
+        if importacion.archivo:
+            importacion.archivo.delete(save=False)
+        liberadas += ImportacionAprendices.objects.filter(
+            pk=importacion.pk, estado=ImportacionAprendices.EN_PROCESO
+        ).update(
+            estado=ImportacionAprendices.FALLIDO, archivo="", finalizado_en=timezone.now(),
+            error="El worker se detuvo antes de terminar la importación; vuelva a subir el archivo.",
+        )
+    return liberadas
+
+
+def procesar_importacion(importacion_id, procesos=None) -> str:
+    """Ejecuta una importación pendiente (reclamada con un UPDATE condicional, como los reportes)."""
+    reclamada = ImportacionAprendices.objects.filter(
+        pk=importacion_id, estado=ImportacionAprendices.PENDIENTE
+    ).update(estado=ImportacionAprendices.EN_PROCESO, iniciado_en=timezone.now())
+    if not reclamada:
+        return ImportacionAprendices.objects.filter(pk=importacion_id).values_list('estado', flat=True).first() or ""
+
+    importacion = ImportacionAprendices.objects.get(pk=importacion_id)
+    try:
+        with importacion.archivo.open('rb') as archivo:
+            resultado = importar(archivo.read(), importacion.solo_validas, procesos)
+    except Exception as e:
+        if not isinstance(e, ArchivoInvalido):
+            logger.exception("Error en la importación de aprendices #%s", importacion.pk)
+        estado, campos = ImportacionAprendices.FALLIDO, {'error': str(e)}
+    else:
+        estado, campos = ImportacionAprendices.COMPLETADO, asdict(resultado)
+    finally:
+        # El CSV trae contraseñas en claro: no se conserva una vez procesado.
+        importacion.archivo.delete(save=False)
+
+    ImportacionAprendices.objects.filter(pk=importacion.pk).update(
+        estado=estado, archivo="", finalizado_en=timezone.now(), **campos,
+    )
+    return estado
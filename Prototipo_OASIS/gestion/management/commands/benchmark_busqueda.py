@@ -0,0 +1,44 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion import datos_prueba
+from usuario import busqueda
+from usuario.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de la búsqueda de usuarios sobre una base SQLite temporal "
+        "sembrada con datos sintéticos. No modifica la base de datos configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100_000, help="Usuarios a sembrar (por defecto 100000).")
+        parser.add_argument('--repeticiones', type=int, default=50, help="Repeticiones por consulta.")
+
+    def handle(self, *args, **options):
+        with datos_prueba.base_de_datos_temporal() as ruta:
+            inicio = time.perf_counter()
+            totales = datos_prueba.sembrar(usuarios=options['usuarios'])
+            self.stdout.write(f"Base temporal {ruta} sembrada en {time.perf_counter() - inicio:.1f}s: {totales}")
+
+            muestra = Usuario.objects.order_by('?').select_related('perfil_aprendiz').filter(rol=Usuario.APRENDIZ).first()
+            consultas = [
+                muestra.username, muestra.username[:9], muestra.email.split('@')[0],
+                muestra.perfil_aprendiz.documento[:6], f"{muestra.first_name} {muestra.last_name}",
+                "empresa", "apellido1", "usuario",
+            ]
+
+            self.stdout.write(f"Backend: {busqueda.backend().nombre}")
+            self.stdout.write(f"{'consulta':<28}{'resultados':>11}{'p50 ms':>9}{'p95 ms':>9}")
+            for texto in consultas:
+                tiempos = []
+                for _ in range(options['repeticiones']):
+                    inicio = time.perf_counter()
+                    ids = busqueda.buscar(texto)
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+                self.stdout.write(f"{texto:<28}{len(ids):>11}{statistics.median(tiempos):>9.2f}{p95:>9.2f}")
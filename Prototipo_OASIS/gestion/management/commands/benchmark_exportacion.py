@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from gestion import datos_prueba, exportacion
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el rendimiento (filas/segundo) de la exportación masiva sobre una base SQLite "
+        "temporal sembrada con datos sintéticos. No modifica la base de datos configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100_000, help="Usuarios a sembrar (por defecto 100000).")
+        parser.add_argument('--lote', type=int, default=exportacion.TAMANO_LOTE, help="Tamaño de lote del iterador.")
+        parser.add_argument('--formatos', nargs='+', default=['csv', 'csv.gz', 'xlsx'], choices=list(exportacion.FORMATOS))
+
+    def handle(self, *args, **options):
+        with datos_prueba.base_de_datos_temporal() as ruta:
+            inicio = time.perf_counter()
+            totales = datos_prueba.sembrar(usuarios=options['usuarios'])
+            self.stdout.write(f"Base temporal {ruta} sembrada en {time.perf_counter() - inicio:.1f}s: {totales}")
+
+            self.stdout.write(f"{'entidad':<28}{'formato':<8}{'filas':>9}{'consultas':>11}{'MB':>8}{'seg':>8}{'filas/s':>12}")
+            for entidad in exportacion.ENTIDADES:
+                filas = exportacion.ENTIDADES[entidad][0].objects.count()
+                for formato in options['formatos']:
+                    with CaptureQueriesContext(connection) as consultas:
+                        inicio = time.perf_counter()
+                        tamano = sum(len(bloque) for bloque in exportacion.exportar(entidad, formato, options['lote']))
+                        duracion = time.perf_counter() - inicio
+                    self.stdout.write(
+                        f"{entidad:<28}{formato:<8}{filas:>9}{len(consultas):>11}{tamano / 1e6:>8.2f}"
+                        f"{duracion:>8.2f}{filas / duracion if duracion else 0:>12,.0f}"
+                    )
@@ -0,0 +1,71 @@
+import csv
+import io
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from gestion import datos_prueba, importacion
+from usuario.models import Usuario, PerfilAprendiz, ProgramaFormativo
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el rendimiento (filas/segundo) de la importación masiva de aprendices frente al registro "
+        "uno a uno, sobre una base SQLite temporal sembrada con datos sintéticos. "
+        "No modifica la base de datos configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10_000, help="Usuarios a sembrar antes de importar.")
+        parser.add_argument('--filas', type=int, default=2000, help="Aprendices en el CSV (por defecto 2000, una cohorte).")
+        parser.add_argument('--muestra', type=int, default=100, help="Aprendices a registrar uno a uno como referencia.")
+        parser.add_argument('--contrasenas', action='store_true', help="Incluye contraseñas (mide también el hash).")
+        parser.add_argument('--procesos', type=int, default=None, help="Procesos para el hash de contraseñas.")
+
+    def handle(self, *args, **options):
+        with datos_prueba.base_de_datos_temporal() as ruta:
+            inicio = time.perf_counter()
+            totales = datos_prueba.sembrar(usuarios=options['usuarios'])
+            self.stdout.write(f"Base temporal {ruta} sembrada en {time.perf_counter() - inicio:.1f}s: {totales}")
+            programa = ProgramaFormativo.objects.first()
+
+            duracion = self._uno_a_uno(options['muestra'], programa, options['contrasenas'])
+            por_fila = duracion / max(1, options['muestra'])
+            self.stdout.write(
+                f"Uno a uno: {options['muestra']} aprendices en {duracion:.2f}s "
+                f"({1 / por_fila if por_fila else 0:,.0f} filas/s)"
+            )
+
+            contenido = self._csv(options['filas'], programa, options['contrasenas'])
+            resultado = importacion.importar(contenido, procesos=options['procesos'])
+            total = sum(resultado.tiempos.values())
+            fases = ", ".join(f"{fase} {segundos:.2f}s" for fase, segundos in resultado.tiempos.items())
+            self.stdout.write(
+                f"Importación masiva: {resultado.creados} de {resultado.filas} aprendices en {total:.2f}s "
+                f"({resultado.filas / total if total else 0:,.0f} filas/s; {fases}); {len(resultado.errores)} errores"
+            )
+            if total:
+                self.stdout.write(f"Aceleración estimada: x{por_fila * resultado.filas / total:.1f}")
+
+    def _uno_a_uno(self, cantidad, programa, con_contrasena):
+        # El mismo trabajo que RegistroAprendizForm.save() por cada aprendiz.
+        inicio = time.perf_counter()
+        for i in range(cantidad):
+            with transaction.atomic():
+                usuario = Usuario(username=f"registro{i:06d}", email=f"registro{i:06d}@oasis.test", rol=Usuario.APRENDIZ)
+                usuario.set_password(f"Clave-{i:06d}-oasis" if con_contrasena else None)
+                usuario.save()
+                PerfilAprendiz.objects.create(usuario=usuario, documento=f"R{i:08d}", ficha="2900000", programa=programa)
+        return time.perf_counter() - inicio
+
+    def _csv(self, filas, programa, con_contrasena) -> bytes:
+        salida = io.StringIO()
+        escritor = csv.writer(salida)
+        escritor.writerow(importacion.COLUMNAS)
+        for i in range(filas):
+            escritor.writerow([
+                f"importado{i:06d}", f"importado{i:06d}@oasis.test", f"Nombre{i}", f"Apellido{i}", "CC",
+                f"I{i:08d}", "2900001", programa.codigo, f"Clave-{i:06d}-oasis" if con_contrasena else "",
+            ])
+        return salida.getvalue().encode('utf-8')
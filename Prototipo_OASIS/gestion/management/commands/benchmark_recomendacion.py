@@ -0,0 +1,68 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from empresas import recomendacion
+from empresas.models import SolicitudProyecto
+from gestion import datos_prueba
+from usuario.models import PerfilAprendiz, PerfilInstructor
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la construcción del índice de recomendación y la latencia de las recomendaciones "
+        "para aprendices e instructores sobre una base SQLite temporal sembrada con datos sintéticos. "
+        "No modifica la base de datos configurada."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=10_000, help="Usuarios a sembrar (10% son empresas).")
+        parser.add_argument('--proyectos-por-empresa', type=int, default=50, help="Proyectos por empresa (por defecto 50).")
+        parser.add_argument('--repeticiones', type=int, default=200, help="Consultas por tipo de usuario.")
+
+    def handle(self, *args, **options):
+        with datos_prueba.base_de_datos_temporal() as ruta:
+            inicio = time.perf_counter()
+            totales = datos_prueba.sembrar(
+                usuarios=options['usuarios'], proyectos_por_empresa=options['proyectos_por_empresa'],
+            )
+            aprobados = SolicitudProyecto.objects.filter(estado="APROBADO").count()
+            self.stdout.write(
+                f"Base temporal {ruta} sembrada en {time.perf_counter() - inicio:.1f}s: {totales}; {aprobados} aprobados"
+            )
+
+            recomendacion.invalidar()
+            inicio = time.perf_counter()
+            recomendacion._consultar(recomendacion.IndiceProyectos.por_texto, "")
+            self.stdout.write(f"Índice construido en {time.perf_counter() - inicio:.2f}s")
+
+            aprendices = list(PerfilAprendiz.objects.all()[:options['repeticiones']])
+            instructores = list(PerfilInstructor.objects.all()[:options['repeticiones']])
+            self._medir("Aprendiz (rasgos)", aprendices, recomendacion.para_aprendiz)
+            self._medir("Instructor (TF-IDF)", instructores, recomendacion.para_instructor)
+
+            # Peor caso: términos presentes en todas las descripciones sintéticas.
+            indice = recomendacion._indice
+            tiempos = []
+            for _ in range(20):
+                inicio = time.perf_counter()
+                indice.por_texto("proyecto de la empresa")
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            self.stdout.write(
+                f"Peor caso (términos en los {len(indice.documentos)} proyectos): "
+                f"p50 {statistics.median(tiempos):.1f} ms"
+            )
+
+    def _medir(self, etiqueta, perfiles, funcion):
+        tiempos = []
+        for perfil in perfiles:
+            inicio = time.perf_counter()
+            funcion(perfil)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        if tiempos:
+            tiempos.sort()
+            self.stdout.write(
+                f"{etiqueta}: p50 {statistics.median(tiempos):.2f} ms, "
+                f"p95 {tiempos[int(len(tiempos) * 0.95) - 1]:.2f} ms (incluye las consultas SQL)"
+            )
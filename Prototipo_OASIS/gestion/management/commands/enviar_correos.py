@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from gestion.correo import Limitador, enviar_lote, liberar_bloqueados
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker que entrega la bandeja de salida de correo: un lote por conexión SMTP, "
+        "con reintentos y espera exponencial, sin superar CORREO_POR_MINUTO."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=None, help="Correos por conexión (por defecto CORREO_LOTE).")
+        parser.add_argument('--intervalo', type=int, default=5, help="Segundos de espera cuando no hay correos pendientes.")
+        parser.add_argument('--una-vez', action='store_true', help="Entrega los correos vencidos y termina.")
+
+    def handle(self, *args, **options):
+        # Un solo limitador para todo el worker: el límite vale entre lotes, no solo dentro de cada uno.
+        limitador = Limitador(getattr(settings, 'CORREO_POR_MINUTO', None))
+        while True:
+            liberados = liberar_bloqueados()
+            if liberados:
+                self.stdout.write(f"{liberados} correos de lotes interrumpidos vuelven a la cola")
+            totales = enviar_lote(options['lote'], limitador)
+            if any(totales.values()):
+                self.stdout.write(
+                    f"Enviados {totales['enviados']}, reprogramados {totales['reprogramados']}, "
+                    f"fallidos {totales['fallidos']}"
+                )
+            elif options['una_vez']:
+                break
+            else:
+                time.sleep(options['intervalo'])
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from gestion.contadores import cache_compartida
+from gestion.importacion import ids_pendientes, liberar_bloqueadas, procesar_importacion
+
+
+class Command(BaseCommand):
+    help = "Worker que ejecuta las importaciones masivas de aprendices subidas desde la gestión de usuarios."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos', type=int, default=None,
+            help="Procesos para el hash de contraseñas (por defecto IMPORTACION_PROCESOS o el número de CPU).",
+        )
+        parser.add_argument('--intervalo', type=int, default=5, help="Segundos de espera cuando no hay importaciones pendientes.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa las importaciones pendientes y termina.")
+
+    def handle(self, *args, **options):
+        # Tras importar, el worker ajusta los contadores e invalida cachés: con una
+        # caché local al proceso el servidor web no vería esos cambios.
+        if not cache_compartida():
+            raise CommandError(
+                "El worker de importaciones necesita una caché compartida con el servidor web: "
+                "use OASIS_CACHE=archivo u OASIS_CACHE=db."
+            )
+        while True:
+            liberadas = liberar_bloqueadas()
+            if liberadas:
+                self.stdout.write(f"{liberadas} importaciones interrumpidas marcadas como fallidas")
+            ids = ids_pendientes()
+            for importacion_id in ids:
+                estado = procesar_importacion(importacion_id, options['procesos'])
+                self.stdout.write(f"Importación #{importacion_id}: {estado}")
+
+            if not ids:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
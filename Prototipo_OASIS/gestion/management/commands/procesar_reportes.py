@@ -0,0 +1,55 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+
+# Este módulo se importa también en los procesos hijos del pool (arrancados con
+# 'spawn', igual que en Windows) antes de django.setup(): los modelos se importan
+# de forma diferida dentro de las funciones.
+
+
+def _inicializar_proceso():
+    django.setup()
+
+
+def _procesar(job_id):
+    from gestion.trabajos import procesar_job
+    return procesar_job(job_id)
+
+
+class Command(BaseCommand):
+    help = "Worker que genera en segundo plano los reportes solicitados desde la página de reportes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=1, help="Número de procesos del pool local (por defecto 1).")
+        parser.add_argument('--intervalo', type=int, default=5, help="Segundos de espera cuando no hay trabajos pendientes.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa los trabajos pendientes y termina.")
+
+    def handle(self, *args, **options):
+        procesos = max(1, options['procesos'])
+
+        if procesos == 1:
+            self._bucle(lambda ids: map(_procesar, ids), procesos, options)
+            return
+
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=_inicializar_proceso) as pool:
+            self._bucle(lambda ids: pool.map(_procesar, ids), procesos, options)
+
+    def _bucle(self, ejecutar, procesos, options):
+        from gestion.trabajos import ids_pendientes, liberar_bloqueados
+
+        while True:
+            liberados = liberar_bloqueados()
+            if liberados:
+                self.stdout.write(f"{liberados} reportes interrumpidos vuelven a la cola")
+            ids = ids_pendientes(limite=procesos * 4)
+            for job_id, estado in zip(ids, ejecutar(ids)):
+                self.stdout.write(f"Reporte #{job_id}: {estado}")
+
+            if not ids:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from gestion import contadores
+
+
+class Command(BaseCommand):
+    help = "Recalcula por completo los contadores cacheados del dashboard administrativo y reporta desviaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo', type=int, default=0,
+            help="Segundos entre reconciliaciones. Si es 0 (por defecto) se ejecuta una sola vez."
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+        while True:
+            desviaciones = contadores.reconciliar()
+            if desviaciones:
+                for clave, (cacheado, real) in sorted(desviaciones.items()):
+                    self.stdout.write(self.style.WARNING(f"{clave}: caché={cacheado} real={real}"))
+            self.stdout.write(self.style.SUCCESS(f"Contadores reconciliados ({len(desviaciones)} desviaciones)."))
+
+            if not intervalo:
+                break
+            time.sleep(intervalo)
@@ -0,0 +1,134 @@
+# gestion/metricas.py
+"""
+Motor de métricas del panel administrativo.
+
+Cada cifra del dashboard y de la página de reportes se calcula con UNA consulta
+agregada por modelo (conteos condicionales o agrupados), en lugar de un COUNT(*)
+por rol o por estado.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.db.models import Count, Q, Value, CharField
+
+from usuario.models import Usuario
+from empresas.models import SolicitudProyecto, Postulacion, PostulacionInstructor
+
+
+SIN_SECTOR = "Sin sector"
+SIN_PROGRAMA = "Sin programa"
+
+# Claves usadas por las plantillas para los conteos por rol.
+CLAVES_ROL = {
+    Usuario.ADMIN: 'admins',
+    Usuario.INSTRUCTOR: 'instructores',
+    Usuario.EMPRESA: 'empresas',
+    Usuario.APRENDIZ: 'aprendices',
+}
+
+
+@dataclass
+class MetricasSnapshot:
+    """Fotografía de las métricas del sistema en un instante dado."""
+    total_usuarios: int = 0
+    usuarios_por_rol: dict = field(default_factory=dict)
+    usuarios_activos: int = 0
+    usuarios_inactivos: int = 0
+    proyectos_por_estado: dict = field(default_factory=dict)
+    proyectos_por_sector: dict = field(default_factory=dict)
+    proyectos_por_programa: dict = field(default_factory=dict)
+    postulaciones_aprendices: dict = field(default_factory=dict)
+    postulaciones_instructores: dict = field(default_factory=dict)
+
+    @property
+    def total_proyectos(self) -> int:
+        return sum(self.proyectos_por_estado.values())
+
+    @property
+    def proyectos_pendientes(self) -> int:
+        return self.proyectos_por_estado.get("PENDIENTE", 0)
+
+    @property
+    def total_postulaciones(self) -> int:
+        return sum(self.postulaciones_aprendices.values()) + sum(self.postulaciones_instructores.values())
+
+
+def _metricas_usuarios() -> dict:
+    """Conteos por rol y por actividad en una sola consulta condicional."""
+    agregados = {'total': Count('id')}
+    for rol, clave in CLAVES_ROL.items():
+        agregados[clave] = Count('id', filter=Q(rol=rol))
+    agregados['activos'] = Count('id', filter=Q(is_active=True))
+
+    resultado = Usuario.objects.aggregate(**agregados)
+    return {
+        'total_usuarios': resultado['total'],
+        'usuarios_por_rol': {clave: resultado[clave] for clave in CLAVES_ROL.values()},
+        'usuarios_activos': resultado['activos'],
+        'usuarios_inactivos': resultado['total'] - resultado['activos'],
+    }
+
+
+def _metricas_proyectos() -> dict:
+    """
+    Agrupa los proyectos por (estado, sector, programa) en una sola consulta y
+    deriva los tres desgloses en memoria. El número de grupos está acotado por
+    el catálogo de sectores y programas, no por el número de proyectos.
+    """
+    grupos = (
+        SolicitudProyecto.objects
+        .order_by()
+        .values('estado', 'empresa__sector__nombre', 'programa_formativo__nombre')
+        .annotate(total=Count('id'))
+    )
+
+    por_estado = Counter({estado: 0 for estado, _ in SolicitudProyecto.ESTADO_CHOICES})
+    por_sector = Counter()
+    por_programa = Counter()
+    for grupo in grupos:
+        por_estado[grupo['estado']] += grupo['total']
+        por_sector[grupo['empresa__sector__nombre'] or SIN_SECTOR] += grupo['total']
+        por_programa[grupo['programa_formativo__nombre'] or SIN_PROGRAMA] += grupo['total']
+
+    return {
+        'proyectos_por_estado': dict(por_estado),
+        'proyectos_por_sector': dict(por_sector.most_common()),
+        'proyectos_por_programa': dict(por_programa.most_common()),
+    }
+
+
+def _metricas_postulaciones() -> dict:
+    """Conteos por estado de ambos tipos de postulación en una sola consulta (UNION ALL)."""
+    aprendices = (
+        Postulacion.objects.order_by()
+        .annotate(tipo=Value('APRENDIZ', output_field=CharField()))
+        .values('tipo', 'estado')
+        .annotate(total=Count('id'))
+    )
+    instructores = (
+        PostulacionInstructor.objects.order_by()
+        .annotate(tipo=Value('INSTRUCTOR', output_field=CharField()))
+        .values('tipo', 'estado')
+        .annotate(total=Count('id'))
+    )
+
+    por_tipo = {
+        'APRENDIZ': {estado: 0 for estado, _ in Postulacion.ESTADOS},
+        'INSTRUCTOR': {estado: 0 for estado, _ in PostulacionInstructor.ESTADOS},
+    }
+    for fila in aprendices.union(instructores, all=True):
+        por_tipo[fila['tipo']][fila['estado']] = fila['total']
+
+    return {
+        'postulaciones_aprendices': por_tipo['APRENDIZ'],
+        'postulaciones_instructores': por_tipo['INSTRUCTOR'],
+    }
+
+
+def calcular_metricas() -> MetricasSnapshot:
+    """Calcula todas las métricas del panel con tres consultas en total."""
+    return MetricasSnapshot(
+        **_metricas_usuarios(),
+        **_metricas_proyectos(),
+        **_metricas_postulaciones(),
+    )
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacionAprendices',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.FileField(upload_to='importaciones/', verbose_name='Archivo CSV')),
+                ('solo_validas', models.BooleanField(default=False, help_text='Si no se marca, un solo error en el archivo impide importar cualquier fila.', verbose_name='Importar solo filas válidas')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('COMPLETADO', 'Completado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('filas', models.PositiveIntegerField(default=0, verbose_name='Filas Leídas')),
+                ('creados', models.PositiveIntegerField(default=0, verbose_name='Aprendices Creados')),
+                ('errores', models.JSONField(blank=True, default=list, verbose_name='Errores por Fila')),
+                ('tiempos', models.JSONField(blank=True, default=dict, verbose_name='Segundos por Fase')),
+                ('error', models.TextField(blank=True, verbose_name='Detalle del Error')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Solicitud')),
+                ('iniciado_en', models.DateTimeField(blank=True, null=True)),
+                ('finalizado_en', models.DateTimeField(blank=True, null=True)),
+                ('solicitado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importaciones_solicitadas', to=settings.AUTH_USER_MODEL, verbose_name='Solicitado por')),
+            ],
+            options={
+                'verbose_name': 'Importación de Aprendices',
+                'verbose_name_plural': 'Importaciones de Aprendices',
+                'ordering': ['-creado_en'],
+            },
+        ),
+    ]
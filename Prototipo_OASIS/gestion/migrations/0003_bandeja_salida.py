@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:31
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0002_importacion_aprendices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CorreoSaliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('remitente', models.CharField(max_length=254, verbose_name='Remitente')),
+                ('destinatarios', models.JSONField(default=list, verbose_name='Para')),
+                ('cc', models.JSONField(blank=True, default=list, verbose_name='CC')),
+                ('cco', models.JSONField(blank=True, default=list, verbose_name='CCO')),
+                ('responder_a', models.JSONField(blank=True, default=list, verbose_name='Responder a')),
+                ('cabeceras', models.JSONField(blank=True, default=dict, verbose_name='Cabeceras')),
+                ('asunto', models.TextField(blank=True, verbose_name='Asunto')),
+                ('cuerpo', models.TextField(blank=True, verbose_name='Cuerpo')),
+                ('subtipo', models.CharField(default='plain', max_length=20, verbose_name='Subtipo del Cuerpo')),
+                ('alternativas', models.JSONField(blank=True, default=list, verbose_name='Versiones Alternativas')),
+                ('adjuntos', models.JSONField(blank=True, default=list, verbose_name='Adjuntos (base64)')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En proceso'), ('ENVIADO', 'Enviado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20, verbose_name='Estado')),
+                ('intentos', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento')),
+                ('reclamado_por', models.CharField(blank=True, max_length=32, verbose_name='Lote que lo Envía')),
+                ('error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('creado_en', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Registro')),
+                ('tomado_en', models.DateTimeField(blank=True, null=True)),
+                ('enviado_en', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Correo Saliente',
+                'verbose_name_plural': 'Bandeja de Salida',
+                'ordering': ['-creado_en'],
+                'indexes': [models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_proximo_idx')],
+            },
+        ),
+    ]
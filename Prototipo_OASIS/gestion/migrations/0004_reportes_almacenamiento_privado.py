@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:15
+
+import gestion.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0003_bandeja_salida'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportejob',
+            name='archivo',
+            field=models.FileField(blank=True, storage=gestion.almacenamiento.AlmacenamientoPrivado(), upload_to='reportes/', verbose_name='Archivo Generado'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:17
+
+import gestion.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('gestion', '0004_reportes_almacenamiento_privado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='importacionaprendices',
+            name='archivo',
+            field=models.FileField(storage=gestion.almacenamiento.AlmacenamientoPrivado(), upload_to='importaciones/', verbose_name='Archivo CSV'),
+        ),
+    ]
@@ -1,3 +1,149 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+from .almacenamiento import privado
+
+
+class ReporteJob(models.Model):
+    """Solicitud de generación en segundo plano del reporte general del sistema."""
+    PENDIENTE = "PENDIENTE"
+    EN_PROCESO = "EN_PROCESO"
+    COMPLETADO = "COMPLETADO"
+    FALLIDO = "FALLIDO"
+
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_PROCESO, "En proceso"),
+        (COMPLETADO, "Completado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    parametros = models.JSONField(default=dict, verbose_name="Parámetros del Reporte")
+    huella = models.CharField(max_length=64, db_index=True, verbose_name="Huella de Parámetros")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    archivo = models.FileField(upload_to='reportes/', storage=privado, blank=True, verbose_name="Archivo Generado")
+    error = models.TextField(blank=True, verbose_name="Detalle del Error")
+
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes_solicitados',
+        verbose_name="Solicitado por"
+    )
+
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Solicitud")
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    finalizado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Trabajo de Reporte"
+        verbose_name_plural = "Trabajos de Reportes"
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"Reporte #{self.pk} ({self.get_estado_display()})" #type: ignore
+
+
+class ImportacionAprendices(models.Model):
+    """Carga masiva de aprendices desde un CSV, procesada por el worker `procesar_importaciones`."""
+    PENDIENTE = "PENDIENTE"
+    EN_PROCESO = "EN_PROCESO"
+    COMPLETADO = "COMPLETADO"
+    FALLIDO = "FALLIDO"
+
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_PROCESO, "En proceso"),
+        (COMPLETADO, "Completado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    archivo = models.FileField(upload_to='importaciones/', storage=privado, verbose_name="Archivo CSV")
+    solo_validas = models.BooleanField(
+        default=False, verbose_name="Importar solo filas válidas",
+        help_text="Si no se marca, un solo error en el archivo impide importar cualquier fila."
+    )
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    filas = models.PositiveIntegerField(default=0, verbose_name="Filas Leídas")
+    creados = models.PositiveIntegerField(default=0, verbose_name="Aprendices Creados")
+    errores = models.JSONField(default=list, blank=True, verbose_name="Errores por Fila")
+    tiempos = models.JSONField(default=dict, blank=True, verbose_name="Segundos por Fase")
+    error = models.TextField(blank=True, verbose_name="Detalle del Error")
+
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='importaciones_solicitadas',
+        verbose_name="Solicitado por"
+    )
+
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Solicitud")
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    finalizado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Importación de Aprendices"
+        verbose_name_plural = "Importaciones de Aprendices"
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"Importación #{self.pk} ({self.get_estado_display()})" #type: ignore
+
+    @property
+    def filas_por_segundo(self):
+        total = sum(self.tiempos.values()) if self.tiempos else 0
+        return round(self.filas / total) if total else None
+
+
+class CorreoSaliente(models.Model):
+    """
+    Correo en la bandeja de salida. El backend `gestion.correo.BackendCola` lo
+    registra en lugar de enviarlo y el worker `enviar_correos` lo entrega.
+    """
+    PENDIENTE = "PENDIENTE"
+    EN_PROCESO = "EN_PROCESO"
+    ENVIADO = "ENVIADO"
+    FALLIDO = "FALLIDO"
+
+    ESTADOS = [
+        (PENDIENTE, "Pendiente"),
+        (EN_PROCESO, "En proceso"),
+        (ENVIADO, "Enviado"),
+        (FALLIDO, "Fallido"),
+    ]
+
+    remitente = models.CharField(max_length=254, verbose_name="Remitente")
+    destinatarios = models.JSONField(default=list, verbose_name="Para")
+    cc = models.JSONField(default=list, blank=True, verbose_name="CC")
+    cco = models.JSONField(default=list, blank=True, verbose_name="CCO")
+    responder_a = models.JSONField(default=list, blank=True, verbose_name="Responder a")
+    cabeceras = models.JSONField(default=dict, blank=True, verbose_name="Cabeceras")
+    asunto = models.TextField(blank=True, verbose_name="Asunto")
+    cuerpo = models.TextField(blank=True, verbose_name="Cuerpo")
+    subtipo = models.CharField(max_length=20, default="plain", verbose_name="Subtipo del Cuerpo")
+    alternativas = models.JSONField(default=list, blank=True, verbose_name="Versiones Alternativas")
+    adjuntos = models.JSONField(default=list, blank=True, verbose_name="Adjuntos (base64)")
+
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    proximo_intento = models.DateTimeField(default=timezone.now, verbose_name="Próximo Intento")
+    reclamado_por = models.CharField(max_length=32, blank=True, verbose_name="Lote que lo Envía")
+    error = models.TextField(blank=True, verbose_name="Último Error")
+
+    creado_en = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de Registro")
+    tomado_en = models.DateTimeField(null=True, blank=True)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Correo Saliente"
+        verbose_name_plural = "Bandeja de Salida"
+        ordering = ['-creado_en']
+        indexes = [models.Index(fields=['estado', 'proximo_intento'], name='correo_estado_proximo_idx')]
+
+    def __str__(self):
+        return f"Correo #{self.pk} a {', '.join(self.destinatarios)} ({self.get_estado_display()})" #type: ignore
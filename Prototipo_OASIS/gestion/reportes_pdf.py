@@ -0,0 +1,185 @@
+# gestion/reportes_pdf.py
+"""
+Generación en flujo (streaming) del reporte general del sistema en PDF.
+
+El lienzo de reportlab conserva todas las páginas en memoria hasta `save()`, así
+que para reportes con decenas de miles de filas usamos un escritor PDF mínimo que
+emite cada página en cuanto se completa. Las filas se leen por lotes con
+`.iterator(chunk_size=...)` y solo las columnas necesarias (`only()`), de modo que
+la memoria del worker se mantiene constante sin importar el tamaño del reporte.
+"""
+import zlib
+from datetime import datetime
+
+from usuario.models import Usuario, PerfilEmpresa, PerfilAprendiz, PerfilInstructor, ProgramaFormativo, SectorProductivo
+
+
+# Tamaño carta en puntos y margen de 1 pulgada (igual que el reporte con reportlab).
+ANCHO, ALTO = 612, 792
+MARGEN = 72
+TAMANO_LOTE = 2000
+
+
+class PdfEnFlujo:
+    """
+    Escritor PDF 1.4 que produce el documento como una secuencia de bloques de bytes.
+
+    Los objetos 1 (catálogo), 2 (árbol de páginas) y 3-4 (fuentes) se reservan al
+    inicio; cada página emite su contenido y su objeto de página, y el árbol de
+    páginas y la tabla xref se escriben al final. Solo se conservan en memoria los
+    desplazamientos de los objetos y los identificadores de página.
+    """
+    FUENTES = {"F1": "Helvetica", "F2": "Helvetica-Bold"}
+
+    def __init__(self):
+        self._posicion = 0
+        self._desplazamientos = {}
+        self._paginas = []
+        self._siguiente_id = 5
+
+    def _objeto(self, numero, cuerpo: bytes) -> bytes:
+        self._desplazamientos[numero] = self._posicion
+        datos = b"%d 0 obj\n" % numero + cuerpo + b"\nendobj\n"
+        self._posicion += len(datos)
+        return datos
+
+    def _nuevo_id(self) -> int:
+        numero = self._siguiente_id
+        self._siguiente_id += 1
+        return numero
+
+    def inicio(self) -> bytes:
+        cabecera = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        self._posicion = len(cabecera)
+        bloques = [cabecera]
+        for numero, fuente in zip((3, 4), self.FUENTES.values()):
+            bloques.append(self._objeto(
+                numero,
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % fuente.encode()
+            ))
+        return b"".join(bloques)
+
+    def pagina(self, operaciones: list) -> bytes:
+        contenido = zlib.compress(b"\n".join(operaciones))
+        id_contenido, id_pagina = self._nuevo_id(), self._nuevo_id()
+        self._paginas.append(id_pagina)
+        return self._objeto(
+            id_contenido,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(contenido) + contenido + b"\nendstream"
+        ) + self._objeto(
+            id_pagina,
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>" % (ANCHO, ALTO, id_contenido)
+        )
+
+    def fin(self) -> bytes:
+        hijos = b" ".join(b"%d 0 R" % numero for numero in self._paginas)
+        bloques = [
+            self._objeto(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (hijos, len(self._paginas))),
+            self._objeto(1, b"<< /Type /Catalog /Pages 2 0 R >>"),
+        ]
+        inicio_xref = self._posicion
+        total = self._siguiente_id
+        xref = [b"xref\n0 %d\n" % total, b"0000000000 65535 f \n"]
+        xref += [b"%010d 00000 n \n" % self._desplazamientos[numero] for numero in range(1, total)]
+        xref.append(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (total, inicio_xref))
+        bloques.append(b"".join(xref))
+        return b"".join(bloques)
+
+    @staticmethod
+    def texto(fuente: str, tamano: int, x: float, y: float, texto: str) -> bytes:
+        """Operadores PDF para dibujar una línea de texto (equivale a canvas.drawString)."""
+        codificado = texto.encode('cp1252', errors='replace')
+        codificado = codificado.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+        return b"BT /%s %d Tf %.2f %.2f Td (%s) Tj ET" % (fuente.encode(), tamano, x, y, codificado)
+
+
+# --- Secciones del reporte (cada una lee sus filas por lotes) ---
+
+def _filas_usuarios(lote):
+    for u in Usuario.objects.only('username', 'rol', 'email', 'esta_activo').order_by('pk').iterator(chunk_size=lote):
+        yield f"{u.username} | Rol: {u.rol} | Email: {u.email or 'N/A'} | Activo: {'Sí' if u.esta_activo else 'No'}"
+
+
+def _filas_empresas(lote):
+    empresas = (
+        PerfilEmpresa.objects.select_related('usuario', 'sector')
+        .only('razon_social', 'nit', 'sector', 'sector__nombre', 'usuario', 'usuario__username')
+        .order_by('pk')
+    )
+    for e in empresas.iterator(chunk_size=lote):
+        yield f"{e.razon_social} | NIT: {e.nit} | Sector: {e.sector or 'N/A'} | Usuario: {e.usuario.username}"
+
+
+def _filas_aprendices(lote):
+    aprendices = (
+        PerfilAprendiz.objects.select_related('usuario', 'programa')
+        .only('documento', 'ficha', 'programa', 'programa__nombre', 'usuario', 'usuario__username')
+        .order_by('pk')
+    )
+    for a in aprendices.iterator(chunk_size=lote):
+        yield f"{a.usuario.username} | Doc: {a.documento} | Programa: {a.programa or 'N/A'} | Ficha: {a.ficha}"
+
+
+def _filas_instructores(lote):
+    instructores = (
+        PerfilInstructor.objects.select_related('usuario')
+        .only('documento', 'area_conocimiento', 'usuario', 'usuario__username')
+        .order_by('pk')
+    )
+    for i in instructores.iterator(chunk_size=lote):
+        yield f"{i.usuario.username} | Doc: {i.documento} | Área: {i.area_conocimiento}"
+
+
+def _filas_programas(lote):
+    for p in ProgramaFormativo.objects.only('nombre', 'tipo', 'codigo').order_by('pk').iterator(chunk_size=lote):
+        yield f"{p.nombre} | Tipo: {p.tipo} | Código: {p.codigo}"
+
+
+def _filas_sectores(lote):
+    for s in SectorProductivo.objects.only('nombre', 'descripcion').order_by('pk').iterator(chunk_size=lote):
+        yield f"{s.nombre} | {s.descripcion or 'Sin descripción'}"
+
+
+SECCIONES = {
+    'usuarios': ("Usuarios del Sistema", _filas_usuarios),
+    'empresas': ("Perfiles de Empresa", _filas_empresas),
+    'aprendices': ("Perfiles de Aprendices", _filas_aprendices),
+    'instructores': ("Perfiles de Instructores", _filas_instructores),
+    'programas': ("Programas Formativos", _filas_programas),
+    'sectores': ("Sectores Productivos", _filas_sectores),
+}
+
+
+def _lineas(secciones, lote):
+    """Secuencia de (fuente, tamaño, texto, avance vertical) del reporte completo."""
+    yield ("F2", 16, "Reporte General del Sistema OASIS", 15)
+    yield ("F1", 10, f"Generado el {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", 25)
+    for indice, clave in enumerate(secciones):
+        titulo, filas = SECCIONES[clave]
+        if indice:
+            yield (None, 0, "", 20)
+        yield ("F2", 14, titulo, 20)
+        for texto in filas(lote):
+            yield ("F1", 10, texto, 15)
+
+
+def generar_reporte_pdf(secciones=None, lote=TAMANO_LOTE):
+    """
+    Generador que produce el reporte general en bloques de bytes, una página a la vez.
+    `secciones` es una lista de claves de SECCIONES (por defecto, todas).
+    """
+    pdf = PdfEnFlujo()
+    yield pdf.inicio()
+
+    operaciones, y = [], ALTO - MARGEN
+    for fuente, tamano, texto, avance in _lineas(secciones or list(SECCIONES), lote):
+        if y < MARGEN:
+            yield pdf.pagina(operaciones)
+            operaciones, y = [], ALTO - MARGEN
+        if fuente:
+            operaciones.append(PdfEnFlujo.texto(fuente, tamano, MARGEN, y, texto))
+        y -= avance
+
+    yield pdf.pagina(operaciones)
+    yield pdf.fin()
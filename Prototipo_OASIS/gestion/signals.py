@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from usuario.models import Usuario
+from empresas.models import SolicitudProyecto, Postulacion, PostulacionInstructor
+from . import contadores
+
+# Modelos cuyos cambios afectan a los contadores del dashboard administrativo.
+MODELOS_CONTADOS = (Usuario, SolicitudProyecto, Postulacion, PostulacionInstructor)
+
+
+def _aplicar_al_confirmar(deltas):
+    """Los contadores solo se tocan si la transacción llega a confirmarse."""
+    if deltas:
+        transaction.on_commit(lambda: contadores.ajustar(deltas))
+
+
+def _guardar_firma_previa(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:
+        instance._firma_contadores = contadores.firma(sender, instance.pk)
+
+
+def _ajustar_tras_guardar(sender, instance, created, **kwargs):
+    anterior = [] if created else getattr(instance, '_firma_contadores', [])
+    actual = contadores.firma(sender, instance.pk, instance if created else None)
+    _aplicar_al_confirmar(contadores.diferencia(anterior, actual))
+
+
+def _ajustar_tras_eliminar(sender, instance, **kwargs):
+    _aplicar_al_confirmar(contadores.diferencia(getattr(instance, '_firma_contadores', []), []))
+
+
+for modelo in MODELOS_CONTADOS:
+    pre_save.connect(_guardar_firma_previa, sender=modelo, dispatch_uid=f"contadores_pre_save_{modelo.__name__}")
+    post_save.connect(_ajustar_tras_guardar, sender=modelo, dispatch_uid=f"contadores_post_save_{modelo.__name__}")
+    pre_delete.connect(_guardar_firma_previa, sender=modelo, dispatch_uid=f"contadores_pre_delete_{modelo.__name__}")
+    post_delete.connect(_ajustar_tras_eliminar, sender=modelo, dispatch_uid=f"contadores_post_delete_{modelo.__name__}")
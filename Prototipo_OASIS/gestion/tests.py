@@ -1,3 +1,406 @@
-from django.test import TestCase
+import csv
+import io
+import os
+import shutil
+import smtplib
+import tempfile
+import zipfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from usuario import busqueda
+from usuario.models import Usuario, PerfilAprendiz, SectorProductivo
+from empresas.models import SolicitudProyecto
+from .metricas import calcular_metricas
+from . import checks, contadores, trabajos, exportacion, datos_prueba, importacion, decisiones, correo
+from .models import ReporteJob, ImportacionAprendices, CorreoSaliente
+from .reportes_pdf import generar_reporte_pdf
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        sector = SectorProductivo.objects.create(nombre="Tecnología")
+        programa = datos_prueba.programa()
+        empresa = datos_prueba.empresa()
+        empresa.sector = sector
+        empresa.save()
+        Usuario.objects.create_user(username="aprendiz1", password="x", rol=Usuario.APRENDIZ, is_active=False)
+
+        for estado in ("PENDIENTE", "PENDIENTE", "APROBADO"):
+            datos_prueba.proyecto(empresa, programa, f"Proyecto {estado}", estado)
+
+    def test_metricas_en_tres_consultas(self):
+        '''Prueba que todas las métricas salen de una consulta agregada por modelo'''
+        with self.assertNumQueries(3):
+            metricas = calcular_metricas()
+
+        self.assertEqual(metricas.total_usuarios, 2)
+        self.assertEqual(metricas.usuarios_por_rol['empresas'], 1)
+        self.assertEqual(metricas.usuarios_inactivos, 1)
+        self.assertEqual(metricas.proyectos_pendientes, 2)
+        self.assertEqual(metricas.proyectos_por_estado['APROBADO'], 1)
+        self.assertEqual(metricas.proyectos_por_sector, {"Tecnología": 3})
+        self.assertEqual(metricas.proyectos_por_programa, {"ADSO": 3})
+        self.assertEqual(metricas.postulaciones_aprendices['PENDIENTE'], 0)
+
+
+class ContadoresCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_contadores_incrementales(self):
+        '''Prueba que las señales mantienen los contadores sin recalcular'''
+        contadores.reconciliar()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario = Usuario.objects.create_user(username="instructor1", password="x", rol=Usuario.INSTRUCTOR)
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.rol = Usuario.ADMIN
+            usuario.save()
+
+        with self.assertNumQueries(0):
+            metricas = contadores.obtener_metricas()
+        self.assertEqual(metricas.total_usuarios, 1)
+        self.assertEqual(metricas.usuarios_por_rol['admins'], 1)
+        self.assertEqual(metricas.usuarios_por_rol['instructores'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            usuario.delete()
+        self.assertEqual(contadores.obtener_metricas().total_usuarios, 0)
+        self.assertEqual(contadores.reconciliar(), {})
+
+    def test_reconciliar_detecta_desviaciones(self):
+        '''Prueba que la reconciliación corrige cambios hechos sin señales'''
+        contadores.reconciliar()
+        Usuario.objects.bulk_create([Usuario(username="masivo", rol=Usuario.APRENDIZ)])
+
+        self.assertEqual(contadores.obtener_metricas().total_usuarios, 0)
+        desviaciones = contadores.reconciliar()
+        self.assertEqual(desviaciones["usuarios:total"], (0, 1))
+        self.assertEqual(contadores.obtener_metricas().usuarios_por_rol['aprendices'], 1)
+
+    def test_check_de_cache_compartida(self):
+        '''Prueba que `check --deploy` advierte de la caché en memoria y no de una compartida'''
+        self.assertEqual([aviso.id for aviso in checks.cache_para_varios_procesos(None)], ['gestion.W001'])
+
+        archivo = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir()}
+        with override_settings(CACHES={'default': archivo}):
+            self.assertEqual(checks.cache_para_varios_procesos(None), [])
+
+
+class ReportePdfTests(TestCase):
+
+    def test_reporte_en_flujo(self):
+        '''Prueba que el reporte se emite por páginas y forma un PDF completo'''
+        Usuario.objects.bulk_create([Usuario(username=f"usuario{i}", rol=Usuario.APRENDIZ) for i in range(120)])
+
+        bloques = list(generar_reporte_pdf(lote=50))
+        pdf = b"".join(bloques)
+
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertTrue(pdf.endswith(b"%%EOF\n"))
+        # Cabecera + una entrega por página + cierre (árbol de páginas y xref)
+        self.assertIn(b"/Count %d" % (len(bloques) - 2), pdf)
+        self.assertGreater(len(bloques), 3)
+
+
+class ReporteJobTests(TestCase):
+
+    def setUp(self):
+        self.privado = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.privado, ignore_errors=True)
+        self.admin = Usuario.objects.create_superuser("admin", "admin@oasis.co", "x")
+        self.client.force_login(self.admin)
+
+    def test_flujo_completo_y_reutilizacion(self):
+        '''Prueba que el trabajo se genera, se descarga y se reutiliza dentro del TTL'''
+        with override_settings(ARCHIVOS_PRIVADOS_DIR=self.privado):
+            self.client.post(reverse('gestion:solicitar_reporte'), {'secciones': ['usuarios']})
+            job = ReporteJob.objects.get()
+            self.assertEqual(job.estado, ReporteJob.PENDIENTE)
+
+            self.assertEqual(trabajos.procesar_job(job.pk), ReporteJob.COMPLETADO)
+            # Fuera de MEDIA_ROOT y sin URL pública: solo se llega por descargar_reporte.
+            job.refresh_from_db()
+            self.assertTrue(job.archivo.path.startswith(self.privado))
+            with self.assertRaises(ValueError):
+                job.archivo.url
+            estado = self.client.get(reverse('gestion:estado_reporte', args=[job.pk])).json()
+            self.assertEqual(estado['url_descarga'], reverse('gestion:descargar_reporte', args=[job.pk]))
+
+            respuesta = self.client.get(estado['url_descarga'])
+            self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+            self.assertTrue(b"".join(respuesta.streaming_content).startswith(b"%PDF"))
+
+            self.client.post(reverse('gestion:solicitar_reporte'), {'secciones': ['usuarios']})
+            self.assertEqual(ReporteJob.objects.count(), 1)
+
+            self.client.post(reverse('gestion:solicitar_reporte'), {'secciones': ['sectores']})
+            self.assertEqual(ReporteJob.objects.count(), 2)
+
+
+    def test_trabajo_de_worker_detenido(self):
+        '''Prueba que un trabajo EN_PROCESO de un worker detenido no se reutiliza y vuelve a la cola'''
+        parametros = trabajos.normalizar_parametros(['usuarios'])
+        colgado = trabajos.solicitar_reporte(parametros)
+        ReporteJob.objects.filter(pk=colgado.pk).update(
+            estado=ReporteJob.EN_PROCESO, iniciado_en=timezone.now() - timedelta(hours=1)
+        )
+
+        nuevo = trabajos.solicitar_reporte(parametros)
+        self.assertNotEqual(nuevo.pk, colgado.pk)
+
+        self.assertEqual(trabajos.liberar_bloqueados(), 1)
+        self.assertEqual(trabajos.ids_pendientes(), [colgado.pk, nuevo.pk])
+
+
+class ExportacionTests(TestCase):
+
+    def test_exportacion_en_una_consulta(self):
+        '''Prueba que cada exportación es una sola consulta sin importar el número de filas'''
+        datos_prueba.sembrar(usuarios=60)
+
+        for entidad in exportacion.ENTIDADES:
+            with self.assertNumQueries(1):
+                contenido = b"".join(exportacion.exportar(entidad, 'csv', lote=7)).decode('utf-8-sig')
+            filas = list(csv.reader(io.StringIO(contenido)))
+            self.assertEqual(filas[0], exportacion.encabezados(entidad))
+            self.assertEqual(len(filas) - 1, exportacion.ENTIDADES[entidad][0].objects.count())
+
+        libro = zipfile.ZipFile(io.BytesIO(b"".join(exportacion.exportar('usuarios', 'xlsx'))))
+        self.assertIn(b"usuario000059", libro.read('xl/worksheets/sheet1.xml'))
+
+
+    def test_celdas_con_formula(self):
+        '''Prueba que un texto que Excel evaluaría como fórmula se exporta como texto'''
+        Usuario.objects.create_user(
+            username="formula", password="x", first_name='=HYPERLINK("http://x")', last_name="-2+3"
+        )
+
+        contenido = b"".join(exportacion.exportar('usuarios', 'csv')).decode('utf-8-sig')
+        fila = next(fila for fila in csv.reader(io.StringIO(contenido)) if fila[1] == "formula")
+        self.assertEqual(fila[3:5], ["'=HYPERLINK(\"http://x\")", "'-2+3"])
+
+        libro = zipfile.ZipFile(io.BytesIO(b"".join(exportacion.exportar('usuarios', 'xlsx'))))
+        self.assertIn(b"'=HYPERLINK", libro.read('xl/worksheets/sheet1.xml'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImportacionAprendicesTests(TestCase):
+
+    def setUp(self):
+        self.privado = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.privado, ignore_errors=True)
+        self.programa = datos_prueba.programa()
+        self.admin = Usuario.objects.create_superuser("admin", "admin@oasis.co", "x")
+        self.client.force_login(self.admin)
+
+    def csv(self, filas):
+        salida = io.StringIO()
+        escritor = csv.writer(salida, delimiter=';')
+        escritor.writerow(importacion.COLUMNAS)
+        escritor.writerows(filas)
+        return salida.getvalue().encode('utf-8')
+
+    def test_errores_por_fila(self):
+        '''Prueba que se informan los errores de cada fila y, por defecto, no se importa ninguna'''
+        contenido = self.csv([
+            ["ana", "ana@oasis.co", "Ana", "Pérez", "CC", "1001", "2900001", "228118", ""],
+            ["admin", "", "", "", "CC", "1002", "2900001", "228118", ""],
+            ["luis", "", "", "", "CC", "1001", "2900001", "adso", ""],
+            ["eva", "correo-malo", "", "", "XX", "10-03", "", "999", ""],
+        ])
+
+        resultado = importacion.importar(contenido)
+
+        errores = {(error['linea'], error['campo']) for error in resultado.errores}
+        self.assertEqual(errores, {(3, 'usuario'), (4, 'documento'), (5, 'ficha')})
+        self.assertEqual((resultado.filas, resultado.creados), (4, 0))
+        self.assertFalse(Usuario.objects.filter(username="ana").exists())
+
+        resultado = importacion.importar(contenido, solo_validas=True, procesos=1)
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual(PerfilAprendiz.objects.get(documento="1001").usuario.username, "ana")
+
+    def test_importacion_en_segundo_plano(self):
+        '''Prueba que el CSV subido se importa con consultas por lote e índice y contadores al día'''
+        filas = [
+            [f"aprendiz{i:03d}", f"a{i}@oasis.co", f"Nombre{i}", "Apellido", "TI", f"{5000 + i}", "2900001", "ADSO",
+             "Clave-segura-123" if i == 0 else ""]
+            for i in range(120)
+        ]
+        contadores.obtener_metricas()
+        with override_settings(ARCHIVOS_PRIVADOS_DIR=self.privado):
+            archivo = SimpleUploadedFile("ficha.csv", self.csv(filas), content_type="text/csv")
+            respuesta = self.client.post(reverse('gestion:importar_aprendices'), {'archivo': archivo})
+            self.assertEqual(respuesta.status_code, 302)
+            importacion_job = ImportacionAprendices.objects.get()
+            ruta = importacion_job.archivo.path
+            self.assertTrue(ruta.startswith(self.privado))
+
+            busqueda.backend()
+            with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+                estado = importacion.procesar_importacion(importacion_job.pk, procesos=1)
+
+        # Consultas por lote, no por fila: 120 aprendices caben en unas pocas.
+        self.assertLess(len(consultas), 20)
+        self.assertEqual(estado, ImportacionAprendices.COMPLETADO)
+        importacion_job.refresh_from_db()
+        self.assertEqual((importacion_job.filas, importacion_job.creados, importacion_job.errores), (120, 120, []))
+        # El CSV (con contraseñas en claro) se borra al terminar.
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(importacion_job.archivo)
+        self.assertTrue(Usuario.objects.get(username="aprendiz000").check_password("Clave-segura-123"))
+        self.assertFalse(Usuario.objects.get(username="aprendiz001").has_usable_password())
+        self.assertEqual(PerfilAprendiz.objects.filter(programa=self.programa, tipo_documento="TI").count(), 120)
+        self.assertEqual(len(busqueda.buscar("aprendiz119")), 1)
+        self.assertEqual(contadores.obtener_metricas().total_usuarios, 121)
+        self.assertContains(self.client.get(reverse('gestion:importar_aprendices')), "120</strong> de 120")
+
+    def test_libera_importaciones_interrumpidas(self):
+        '''Prueba que una importación tomada por un worker que se detuvo queda fallida y sin su CSV'''
+        with override_settings(ARCHIVOS_PRIVADOS_DIR=self.privado):
+            colgada, reciente = (
+                ImportacionAprendices.objects.create(
+                    archivo=SimpleUploadedFile("ficha.csv", self.csv([])), estado=ImportacionAprendices.EN_PROCESO,
+                    iniciado_en=timezone.now() - timedelta(seconds=segundos),
+                )
+                for segundos in (2 * 3600, 60)
+            )
+            ruta = colgada.archivo.path
+
+            self.assertEqual(importacion.liberar_bloqueadas(), 1)
+
+        colgada.refresh_from_db()
+        self.assertEqual(colgada.estado, ImportacionAprendices.FALLIDO)
+        self.assertFalse(colgada.archivo)
+        self.assertFalse(os.path.exists(ruta))
+        reciente.refresh_from_db()
+        self.assertEqual(reciente.estado, ImportacionAprendices.EN_PROCESO)
+
+    def test_worker_exige_cache_compartida(self):
+        '''Prueba que el worker no arranca con una caché local al proceso'''
+        with self.assertRaises(CommandError):
+            call_command('procesar_importaciones', una_vez=True)
+
+        archivo = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': self.privado}
+        with override_settings(CACHES={'default': archivo}):
+            call_command('procesar_importaciones', una_vez=True, stdout=io.StringIO())
+
+
+class DecisionesProyectosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        programa = datos_prueba.programa()
+        empresa = datos_prueba.empresa(email="empresa@oasis.co")
+        self.proyectos = [datos_prueba.proyecto(empresa, programa, f"Proyecto {i}", "PENDIENTE") for i in range(4)]
+        self.admin = Usuario.objects.create_superuser("admin", "admin@oasis.co", "x")
+        self.client.force_login(self.admin)
+
+    def test_decision_en_bloque(self):
+        '''Prueba que se decide con un UPDATE por tipo, se informan conflictos y se notifica a cada empresa'''
+        ya_aprobado = self.proyectos[3]
+        SolicitudProyecto.objects.filter(pk=ya_aprobado.pk).update(estado="APROBADO")
+        cache.clear()
+        contadores.obtener_metricas()
+        ids = [p.pk for p in self.proyectos]
+
+        with CaptureQueriesContext(connection) as consultas, self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(reverse('gestion:decidir_proyectos'), {
+                'proyectos': ids, 'decision': "RECHAZADO", 'motivo': "Falta alcance",
+                f'motivo_{ids[0]}': "Duplicado de otro proyecto",
+            })
+
+        self.assertEqual(respuesta.status_code, 302)
+        updates = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE "empresas_solicitudproyecto"')]
+        self.assertEqual(len(updates), 1)
+        rechazados = SolicitudProyecto.objects.filter(estado="RECHAZADO").order_by('pk')
+        self.assertEqual([p.pk for p in rechazados], ids[:3])
+        self.assertEqual(rechazados[0].motivo_rechazo, "Duplicado de otro proyecto")
+        self.assertEqual(rechazados[1].motivo_rechazo, "Falta alcance")
+        self.assertIsNotNone(rechazados[1].fecha_decision)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ["empresa@oasis.co"])
+
+        metricas = contadores.obtener_metricas()
+        self.assertEqual(metricas.proyectos_pendientes, 0)
+        self.assertEqual(metricas.proyectos_por_estado['RECHAZADO'], 3)
+
+        # Una segunda decisión sobre las mismas solicitudes no las toca.
+        resultado = decisiones.decidir({"APROBADO": {pk: "Cumple" for pk in ids}})
+        self.assertEqual((resultado.total, resultado.conflictos), (0, ids))
+
+
+class BackendSinServidor(BaseEmailBackend):
+    """Simula un proveedor SMTP caído."""
+
+    def open(self):
+        raise smtplib.SMTPConnectError(421, "Servicio no disponible")
+
+    def send_messages(self, email_messages):
+        raise smtplib.SMTPServerDisconnected("Sin conexión")
+
+
+@override_settings(EMAIL_BACKEND='gestion.correo.BackendCola', CORREO_POR_MINUTO=None)
+class BandejaSalidaTests(TestCase):
+
+    def setUp(self):
+        self.buzon = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.buzon, ignore_errors=True)
+
+    def test_entrega_por_lote_en_una_conexion(self):
+        '''Prueba que enviar solo encola y que el worker entrega todo el lote por una conexión'''
+        send_mail("Restablecer contraseña", "Enlace", "oasis@oasis.co", ["ana@oasis.co"])
+        mensaje = EmailMultiAlternatives("Proyecto aprobado", "Texto", "oasis@oasis.co", ["empresa@oasis.co"])
+        mensaje.attach_alternative("<p>HTML</p>", "text/html")
+        mensaje.attach("acta.txt", "Acta", "text/plain")
+        mensaje.send()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(CorreoSaliente.objects.filter(estado=CorreoSaliente.PENDIENTE).count(), 2)
+
+        with override_settings(
+            CORREO_BACKEND_ENTREGA='django.core.mail.backends.filebased.EmailBackend', EMAIL_FILE_PATH=self.buzon,
+        ):
+            self.assertEqual(correo.enviar_lote(), {'enviados': 2, 'reprogramados': 0, 'fallidos': 0})
+
+        archivos = os.listdir(self.buzon)
+        self.assertEqual(len(archivos), 1)
+        with open(os.path.join(self.buzon, archivos[0]), 'rb') as archivo:
+            contenido = archivo.read()
+        self.assertIn(b"\n\nEnlace\n", contenido)
+        self.assertIn(b"text/html", contenido)
+        self.assertIn(b'filename="acta.txt"', contenido)
+        self.assertEqual(CorreoSaliente.objects.filter(estado=CorreoSaliente.ENVIADO).count(), 2)
+        self.assertEqual(correo.enviar_lote(), {'enviados': 0, 'reprogramados': 0, 'fallidos': 0})
+
+    @override_settings(CORREO_BACKEND_ENTREGA='gestion.tests.BackendSinServidor', CORREO_REINTENTOS=2)
+    def test_reintentos_con_espera(self):
+        '''Prueba que un fallo del proveedor reprograma el correo con espera y al agotar reintentos queda fallido'''
+        send_mail("Aviso", "Texto", "oasis@oasis.co", ["ana@oasis.co"])
+
+        self.assertEqual(correo.enviar_lote(), {'enviados': 0, 'reprogramados': 1, 'fallidos': 0})
+        pendiente = CorreoSaliente.objects.get()
+        self.assertEqual((pendiente.estado, pendiente.intentos), (CorreoSaliente.PENDIENTE, 1))
+        self.assertGreater(pendiente.proximo_intento, timezone.now())
+        self.assertIn("SMTPConnectError", pendiente.error)
+        # Aún no vence su espera: el worker no lo vuelve a tomar.
+        self.assertEqual(correo.enviar_lote()['reprogramados'], 0)
+
+        CorreoSaliente.objects.update(proximo_intento=timezone.now())
+        self.assertEqual(correo.enviar_lote()['fallidos'], 1)
+        self.assertEqual(CorreoSaliente.objects.get().estado, CorreoSaliente.FALLIDO)
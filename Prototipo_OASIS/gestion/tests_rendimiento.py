@@ -0,0 +1,339 @@
+"""
+Presupuestos de rendimiento por vista: número máximo de consultas SQL y latencia p95.
+
+Se siembra un conjunto de datos con gestion.datos_prueba y se recorre cada ruta con
+nombre del proyecto con el rol que exige (`role_required`). Cada ruta tiene su
+presupuesto en RUTAS; una ruta nueva sin presupuesto hace fallar la prueba de
+cobertura. Si se define OASIS_RENDIMIENTO_REPORTE, al terminar se escribe ahí un
+reporte JSON (ordenado, para comparar entre commits); si no, no se escribe nada.
+
+El presupuesto de consultas siempre se exige. La latencia depende de la máquina y
+de su carga, así que por defecto solo se informa en el reporte (`p95_excedido`);
+se exige con OASIS_RENDIMIENTO_LATENCIA=1 (p. ej. en una máquina dedicada).
+
+Corre igual con `python manage.py test gestion.tests_rendimiento` que con `pytest`.
+Variables de entorno:
+  OASIS_RENDIMIENTO_REPETICIONES  peticiones por ruta para calcular la p95 (5).
+  OASIS_RENDIMIENTO_REPORTE       ruta del reporte JSON (sin ella no hay reporte).
+  OASIS_RENDIMIENTO_LATENCIA      1 para fallar si la p95 supera el presupuesto.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from app_backups.models import Backup, TareaBackup
+from empresas.models import SolicitudProyecto, Postulacion, PostulacionInstructor
+from usuario.models import Usuario, ProgramaFormativo, SectorProductivo
+from . import datos_prueba
+from .models import ReporteJob
+
+REPETICIONES = int(os.environ.get('OASIS_RENDIMIENTO_REPETICIONES', 5))
+REPORTE = os.environ.get('OASIS_RENDIMIENTO_REPORTE')
+EXIGIR_LATENCIA = os.environ.get('OASIS_RENDIMIENTO_LATENCIA') == '1'
+
+# Espacios de nombres cubiertos; las rutas sin espacio de nombres (respaldos,
+# restablecimiento de contraseña) también se cubren. Se excluye el admin de Django.
+ESPACIOS_EXCLUIDOS = {'admin'}
+
+
+@dataclass
+class Ruta:
+    rol: Optional[str]                      # None = visitante sin sesión
+    consultas: int                          # máximo de consultas SQL por petición
+    p95_ms: float                           # latencia p95 máxima en milisegundos
+    args: Callable = lambda datos: []       # argumentos de la URL; se evalúa antes de cada petición
+    metodo: str = 'get'
+    datos: dict = field(default_factory=dict)  # o función de los datos, si depende de objetos desechables
+    querystring: str = ''
+    estado: int = 200
+    omitir: str = ''                        # motivo para no ejecutar la ruta
+
+
+# --- Objetos desechables para las rutas que modifican datos ---
+
+def _proyecto(datos, estado="PENDIENTE"):
+    actor = datos[Usuario.APRENDIZ].perfil_aprendiz
+    return SolicitudProyecto.objects.create(
+        nombre="Proyecto desechable", descripcion="D", area="DES", duracion_semanas=4, estado=estado,
+        empresa=datos['proyecto'].empresa, programa_formativo=actor.programa,
+    )
+
+
+def _programa(datos):
+    n = ProgramaFormativo.objects.count()
+    return ProgramaFormativo.objects.create(nombre=f"Desechable {n}", codigo=f"D{n}", tipo=ProgramaFormativo.TECNICO)
+
+
+def _postulacion(datos):
+    return Postulacion.objects.create(aprendiz=datos[Usuario.APRENDIZ].perfil_aprendiz, proyecto=_proyecto(datos))
+
+
+def _proyecto_con_postulacion(datos):
+    # `args` se evalúa antes que `datos`: la postulación queda a mano para el formulario.
+    datos['postulacion_lote'] = _postulacion(datos)
+    return [datos['postulacion_lote'].proyecto_id]
+
+
+def _postulacion_instructor(datos):
+    return PostulacionInstructor.objects.create(
+        instructor=datos[Usuario.INSTRUCTOR].perfil_instructor, proyecto=_proyecto(datos)
+    )
+
+
+def _backup(datos):
+    # Solo el registro: la restauración se encola y nunca se ejecuta en la prueba.
+    return Backup.objects.create(nombre="desechable.manifiesto.json", ruta="desechable.manifiesto.json", tamano=0)
+
+
+def _enlace_restablecer(datos):
+    usuario = datos[Usuario.APRENDIZ]
+    return [urlsafe_base64_encode(force_bytes(usuario.pk)), default_token_generator.make_token(usuario)]
+
+
+ADMIN, EMPRESA, APRENDIZ, INSTRUCTOR = Usuario.ADMIN, Usuario.EMPRESA, Usuario.APRENDIZ, Usuario.INSTRUCTOR
+
+RUTAS = {
+    # --- gestion ---
+    'gestion:dashboard_admin': Ruta(ADMIN, 8, 300),
+    'gestion:listar_usuarios': Ruta(ADMIN, 6, 300),
+    'gestion:crear_usuario': Ruta(ADMIN, 4, 300),
+    'gestion:importar_aprendices': Ruta(ADMIN, 5, 300),
+    'gestion:editar_usuario': Ruta(ADMIN, 5, 300, args=lambda d: [d[APRENDIZ].pk]),
+    'gestion:eliminar_usuario': Ruta(ADMIN, 5, 300, args=lambda d: [d[APRENDIZ].pk]),
+    'gestion:detalle_usuario': Ruta(ADMIN, 8, 300, args=lambda d: [d[APRENDIZ].pk]),
+    'gestion:gestion_programas': Ruta(ADMIN, 5, 300),
+    'gestion:editar_programa': Ruta(ADMIN, 5, 300, args=lambda d: [_programa(d).pk]),
+    'gestion:eliminar_programa': Ruta(ADMIN, 8, 300, args=lambda d: [_programa(d).pk], estado=302),
+    'gestion:gestion_sectores': Ruta(ADMIN, 5, 300),
+    'gestion:editar_sector': Ruta(ADMIN, 5, 300, args=lambda d: [SectorProductivo.objects.first().pk]),
+    'gestion:eliminar_sector': Ruta(
+        ADMIN, 8, 300, args=lambda d: [SectorProductivo.objects.create(nombre=f"S{time.monotonic_ns()}").pk],
+        estado=302,
+    ),
+    'gestion:revisar_solicitudes': Ruta(ADMIN, 5, 300),
+    'gestion:aprobar_proyecto': Ruta(
+        ADMIN, 8, 300, args=lambda d: [_proyecto(d).pk], metodo='post',
+        datos={'motivo_aprobacion': "Cumple"}, estado=302,
+    ),
+    'gestion:rechazar_proyecto': Ruta(
+        ADMIN, 8, 300, args=lambda d: [_proyecto(d).pk], metodo='post',
+        datos={'motivo_rechazo': "No cumple"}, estado=302,
+    ),
+    'gestion:decidir_proyectos': Ruta(
+        ADMIN, 8, 300, metodo='post', estado=302,
+        datos=lambda d: {'proyectos': [_proyecto(d).pk, _proyecto(d).pk], 'decision': "APROBADO", 'motivo': "Cumple"},
+    ),
+    'gestion:reportes': Ruta(ADMIN, 8, 300),
+    'gestion:reporte_completo': Ruta(ADMIN, 10, 3000),
+    'gestion:solicitar_reporte': Ruta(ADMIN, 6, 300, metodo='post', estado=302),
+    'gestion:estado_reporte': Ruta(ADMIN, 5, 300, args=lambda d: [d['reporte'].pk]),
+    'gestion:descargar_reporte': Ruta(ADMIN, 5, 300, args=lambda d: [d['reporte'].pk], estado=404),
+    'gestion:exportar_entidad': Ruta(ADMIN, 5, 1000, args=lambda d: ['postulaciones'], querystring='?formato=csv'),
+
+    # --- empresas ---
+    'empresas:dashboard_empresa': Ruta(EMPRESA, 6, 300),
+    'empresas:editar_perfil_empresa': Ruta(EMPRESA, 6, 300),
+    'empresas:mi_perfil_empresa': Ruta(EMPRESA, 6, 300),
+    'empresas:crear_proyecto': Ruta(EMPRESA, 6, 300),
+    'empresas:editar_proyecto': Ruta(EMPRESA, 7, 300, args=lambda d: [d['proyecto'].pk]),
+    'empresas:detalle_proyecto_empresa': Ruta(EMPRESA, 6, 300, args=lambda d: [d['proyecto'].pk]),
+    'empresas:postulaciones_proyecto': Ruta(EMPRESA, 8, 300, args=lambda d: [d['proyecto'].pk]),
+    'empresas:gestionar_postulacion': Ruta(
+        EMPRESA, 9, 300, args=lambda d: [_postulacion(d).pk, 'rechazar'], metodo='post', estado=302,
+    ),
+    'empresas:gestionar_postulaciones': Ruta(
+        EMPRESA, 10, 300, args=_proyecto_con_postulacion, metodo='post', estado=302,
+        datos=lambda d: {'accion': 'aceptar', 'postulaciones': [d['postulacion_lote'].pk]},
+    ),
+    'empresas:gestionar_postulacion_instructor': Ruta(
+        EMPRESA, 9, 300, args=lambda d: [_postulacion_instructor(d).pk, 'rechazar'], estado=302,
+    ),
+    'empresas:detalle_solicitud': Ruta(EMPRESA, 9, 300, args=lambda d: [d['proyecto'].pk]),
+
+    # --- aprendices ---
+    'aprendices:dashboard_aprendiz': Ruta(APRENDIZ, 5, 300),
+    'aprendices:ver_proyectos': Ruta(APRENDIZ, 8, 300),
+    'aprendices:perfil_aprendiz': Ruta(APRENDIZ, 6, 300),
+    'aprendices:detalle_proyecto': Ruta(APRENDIZ, 11, 300, args=lambda d: [_proyecto(d, "APROBADO").pk]),
+    'aprendices:postular_proyecto': Ruta(
+        APRENDIZ, 7, 300, args=lambda d: [_proyecto(d, "APROBADO").pk], metodo='post', estado=302,
+    ),
+    'aprendices:editar_perfil': Ruta(APRENDIZ, 6, 300),
+
+    # --- instructores ---
+    'instructores:dashboard_instructor': Ruta(INSTRUCTOR, 5, 300),
+    'instructores:mi_perfil_instructor': Ruta(INSTRUCTOR, 6, 300),
+    'instructores:editar_perfil_instructor': Ruta(INSTRUCTOR, 5, 300),
+    'instructores:perfil_instructor': Ruta(INSTRUCTOR, 6, 300, args=lambda d: [d[INSTRUCTOR].pk]),
+    'instructores:proyectos_asignados': Ruta(
+        INSTRUCTOR, 6, 300, omitir="la plantilla enlaza la ruta inexistente 'seguimiento_avance'"
+    ),
+    'instructores:seguimiento_avance': Ruta(
+        INSTRUCTOR, 8, 300, args=lambda d: [d['proyecto'].pk], omitir="error de sintaxis en seguimiento_avance.html"
+    ),
+    'instructores:proyectos_disponibles': Ruta(INSTRUCTOR, 7, 300),
+    'instructores:detalle_proyecto_instructor': Ruta(INSTRUCTOR, 7, 300, args=lambda d: [d['proyecto'].pk]),
+    'instructores:postular_proyecto_instructor': Ruta(
+        INSTRUCTOR, 7, 300, args=lambda d: [_proyecto(d, "APROBADO").pk], metodo='post', estado=302,
+    ),
+
+    # --- usuario (auth) ---
+    'auth:elegir_registro': Ruta(None, 2, 300),
+    'auth:registro_aprendiz': Ruta(None, 3, 300),
+    'auth:registro_empresa': Ruta(None, 3, 300),
+    'auth:registro_instructor': Ruta(None, 2, 300),
+    'auth:login': Ruta(None, 2, 300),
+    'auth:logout': Ruta(APRENDIZ, 6, 300, metodo='post', estado=302),
+    'auth:contacto': Ruta(None, 2, 300),
+    'auth:manual_usuario': Ruta(None, 2, 300),
+    'auth:descargar_manual_pdf': Ruta(None, 2, 1000),
+    'auth:password_reset': Ruta(None, 2, 300, omitir="usa la plantilla inexistente auth/password_reset_form.html"),
+    'auth:password_reset_done': Ruta(None, 2, 300, omitir="usa la plantilla inexistente auth/password_reset_done.html"),
+    'auth:password_reset_confirm': Ruta(None, 7, 300, args=_enlace_restablecer, estado=302),
+    'auth:password_reset_complete': Ruta(
+        None, 2, 300, omitir="usa la plantilla inexistente auth/password_reset_complete.html"
+    ),
+    'password_reset': Ruta(None, 2, 300),
+    'password_reset_done': Ruta(None, 2, 300),
+    'password_reset_confirm': Ruta(None, 7, 300, args=_enlace_restablecer, estado=302),
+    'password_reset_complete': Ruta(None, 2, 300),
+
+    # --- home ---
+    'home:inicio': Ruta(None, 2, 300),
+    'home:acerca_de': Ruta(None, 2, 300),
+    'home:tyc': Ruta(None, 2, 300),
+    'home:Policy_Data_Protection': Ruta(None, 2, 300),
+
+    # --- app_backups ---
+    'lista_backups': Ruta(ADMIN, 5, 300),
+    'crear_backup': Ruta(ADMIN, 5, 300, metodo='post', estado=302),
+    'eliminar_backup': Ruta(ADMIN, 5, 300, args=lambda d: [0], estado=302),
+    'restaurar_backup': Ruta(ADMIN, 7, 300, args=lambda d: [_backup(d).pk], metodo='post', estado=302),
+    'comparar_backup': Ruta(ADMIN, 7, 300, args=lambda d: [_backup(d).pk], metodo='post', estado=302),
+    'estado_tarea_backup': Ruta(ADMIN, 5, 300, args=lambda d: [d['tarea_backup'].pk]),
+}
+
+
+def rutas_con_nombre(patrones=None, espacio=''):
+    """Nombres completos (con espacio de nombres) de todas las rutas del proyecto."""
+    nombres = set()
+    for patron in get_resolver().url_patterns if patrones is None else patrones:
+        if isinstance(patron, URLResolver):
+            if patron.namespace in ESPACIOS_EXCLUIDOS:
+                continue
+            prefijo = f"{espacio}{patron.namespace}:" if patron.namespace else espacio
+            nombres |= rutas_con_nombre(patron.url_patterns, prefijo)
+        elif isinstance(patron, URLPattern) and patron.name:
+            nombres.add(f"{espacio}{patron.name}")
+    return nombres
+
+
+def _percentil(valores, percentil):
+    ordenados = sorted(valores)
+    return ordenados[max(0, int(round(percentil * len(ordenados))) - 1)]
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class PresupuestoRendimientoTests(TestCase):
+    """Una prueba por ruta (generadas abajo) más la de cobertura de rutas."""
+
+    resultados = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        datos_prueba.sembrar(usuarios=400, proyectos_por_empresa=3, postulaciones_por_aprendiz=3)
+        cls.datos = datos_prueba.actores()
+        cls.datos['reporte'] = ReporteJob.objects.create(parametros={'secciones': ['programas']}, huella="rendimiento")
+        cls.datos['tarea_backup'] = TareaBackup.objects.create(tipo=TareaBackup.CREAR)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if REPORTE and cls.resultados:
+            with open(REPORTE, 'w', encoding='utf-8') as archivo:
+                json.dump(cls.resultados, archivo, indent=2, sort_keys=True, ensure_ascii=False)
+                archivo.write("\n")
+
+    def setUp(self):
+        # Los contadores del dashboard y la caché de métricas no deben venir de otra prueba.
+        cache.clear()
+
+    def medir(self, nombre, ruta):
+        consultas, tiempos, estado = 0, [], None
+        for _ in range(REPETICIONES):
+            if ruta.rol:
+                self.client.force_login(self.datos[ruta.rol])
+            else:
+                self.client.logout()
+            url = reverse(nombre, args=ruta.args(self.datos)) + ruta.querystring
+            datos = ruta.datos(self.datos) if callable(ruta.datos) else ruta.datos
+
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                respuesta = getattr(self.client, ruta.metodo)(url, datos)
+                if respuesta.streaming:
+                    b"".join(respuesta.streaming_content)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            respuesta.close()
+
+            consultas = max(consultas, len(capturadas))
+            estado = respuesta.status_code
+            self.assertEqual(estado, ruta.estado, f"{nombre} ({url}) respondió {estado}")
+
+        resultado = {
+            'rol': ruta.rol or "ANONIMO",
+            'estado': estado,
+            'consultas': consultas,
+            'consultas_max': ruta.consultas,
+            'p50_ms': round(_percentil(tiempos, 0.5), 2),
+            'p95_ms': round(_percentil(tiempos, 0.95), 2),
+            'p95_ms_max': ruta.p95_ms,
+        }
+        resultado['p95_excedido'] = resultado['p95_ms'] > ruta.p95_ms
+        type(self).resultados[nombre] = resultado
+        return resultado
+
+    def verificar(self, nombre):
+        ruta = RUTAS[nombre]
+        if ruta.omitir:
+            type(self).resultados[nombre] = {'omitida': ruta.omitir}
+            self.skipTest(ruta.omitir)
+
+        resultado = self.medir(nombre, ruta)
+        self.assertLessEqual(
+            resultado['consultas'], ruta.consultas,
+            f"{nombre}: {resultado['consultas']} consultas (presupuesto {ruta.consultas})",
+        )
+        if EXIGIR_LATENCIA:
+            self.assertLessEqual(
+                resultado['p95_ms'], ruta.p95_ms,
+                f"{nombre}: p95 {resultado['p95_ms']} ms (presupuesto {ruta.p95_ms} ms)",
+            )
+
+    def test_todas_las_rutas_tienen_presupuesto(self):
+        '''Prueba que cada ruta con nombre del proyecto tiene un presupuesto (y que no sobran)'''
+        existentes = rutas_con_nombre()
+        self.assertEqual(sorted(existentes - set(RUTAS)), [], "Rutas sin presupuesto en RUTAS")
+        self.assertEqual(sorted(set(RUTAS) - existentes), [], "Presupuestos de rutas que ya no existen")
+
+
+def _prueba_para(nombre):
+    def prueba(self):
+        self.verificar(nombre)
+    prueba.__doc__ = f"Presupuesto de consultas y latencia de {nombre}"
+    return prueba
+
+
+for _nombre in RUTAS:
+    setattr(PresupuestoRendimientoTests, "test_" + _nombre.replace(':', '__'), _prueba_para(_nombre))
@@ -0,0 +1,107 @@
+# gestion/trabajos.py
+"""
+Cola de trabajos para generar el reporte general fuera del ciclo de la petición.
+
+La vista solo registra un `ReporteJob`; el comando `procesar_reportes` (que puede
+correr como un pool de procesos locales) genera el PDF en el almacenamiento
+privado (ARCHIVOS_PRIVADOS_DIR/reportes/), que solo se descarga por `descargar_reporte`.
+Si ya existe un trabajo con los mismos parámetros dentro del TTL configurado en
+REPORTES_TTL_SEGUNDOS, se reutiliza en lugar de generar otro archivo. Un trabajo
+EN_PROCESO desde hace más de REPORTES_BLOQUEO_SEGUNDOS quedó de un worker que se
+detuvo: no se reutiliza y `liberar_bloqueados` lo devuelve a la cola.
+"""
+import hashlib
+import json
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .almacenamiento import privado
+from .models import ReporteJob
+from .reportes_pdf import SECCIONES, generar_reporte_pdf
+
+logger = logging.getLogger(__name__)
+
+
+def normalizar_parametros(secciones=None) -> dict:
+    """Parámetros canónicos del reporte: solo secciones válidas y en orden fijo."""
+    elegidas = [clave for clave in SECCIONES if not secciones or clave in secciones]
+    return {'secciones': elegidas}
+
+
+def huella_parametros(parametros: dict) -> str:
+    return hashlib.sha256(json.dumps(parametros, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def solicitar_reporte(parametros: dict, usuario=None) -> ReporteJob:
+    """
+    Devuelve un trabajo para los parámetros dados: uno en curso o un artefacto
+    reciente con la misma huella si existe, o un trabajo nuevo en estado PENDIENTE.
+    """
+    huella = huella_parametros(parametros)
+    limite = timezone.now() - timedelta(seconds=settings.REPORTES_TTL_SEGUNDOS)
+
+    candidatos = (
+        ReporteJob.objects.filter(huella=huella, creado_en__gte=limite)
+        .exclude(estado=ReporteJob.FALLIDO).exclude(_bloqueados())
+    )
+    for job in candidatos.order_by('-creado_en')[:1]:
+        if job.estado != ReporteJob.COMPLETADO or (job.archivo and job.archivo.storage.exists(job.archivo.name)):
+            return job
+
+    return ReporteJob.objects.create(parametros=parametros, huella=huella, solicitado_por=usuario)
+
+
+def _bloqueados() -> Q:
+    limite = timezone.now() - timedelta(seconds=settings.REPORTES_BLOQUEO_SEGUNDOS)
+    return Q(estado=ReporteJob.EN_PROCESO, iniciado_en__lt=limite)
+
+
+def liberar_bloqueados() -> int:
+    """Devuelve a la cola los trabajos que un worker tomó y nunca terminó."""
+    return ReporteJob.objects.filter(_bloqueados()).update(estado=ReporteJob.PENDIENTE, iniciado_en=None)
+
+
+def ids_pendientes(limite=None) -> list:
+    ids = ReporteJob.objects.filter(estado=ReporteJob.PENDIENTE).order_by('creado_en').values_list('pk', flat=True)
+    return list(ids[:limite] if limite else ids)
+
+
+def procesar_job(job_id) -> str:
+    """
+    Genera el PDF de un trabajo. El paso PENDIENTE -> EN_PROCESO es un UPDATE
+    condicional, así que si varios workers toman el mismo trabajo solo uno lo procesa.
+    """
+    reclamado = ReporteJob.objects.filter(pk=job_id, estado=ReporteJob.PENDIENTE).update(
+        estado=ReporteJob.EN_PROCESO, iniciado_en=timezone.now()
+    )
+    if not reclamado:
+        return ReporteJob.objects.filter(pk=job_id).values_list('estado', flat=True).first() or ""
+
+    job = ReporteJob.objects.get(pk=job_id)
+    nombre = f"reportes/reporte_{job.pk}_{job.huella[:12]}.pdf"
+    ruta = privado.path(nombre)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+
+    try:
+        with open(ruta + ".parcial", 'wb') as destino:
+            for bloque in generar_reporte_pdf(job.parametros.get('secciones')):
+                destino.write(bloque)
+        os.replace(ruta + ".parcial", ruta)
+    except Exception as e:
+        logger.exception("Error generando el reporte #%s", job.pk)
+        if os.path.exists(ruta + ".parcial"):
+            os.remove(ruta + ".parcial")
+        ReporteJob.objects.filter(pk=job.pk).update(
+            estado=ReporteJob.FALLIDO, error=str(e), finalizado_en=timezone.now()
+        )
+        return ReporteJob.FALLIDO
+
+    ReporteJob.objects.filter(pk=job.pk).update(
+        estado=ReporteJob.COMPLETADO, archivo=nombre, finalizado_en=timezone.now()
+    )
+    return ReporteJob.COMPLETADO
@@ -10,6 +10,7 @@ urlpatterns = [
     # Usuarios
     path('usuarios/', views.listar_usuarios, name='listar_usuarios'),
     path('usuarios/crear/', views.crear_usuario, name='crear_usuario'),
+    path('usuarios/importar/', views.importar_aprendices, name='importar_aprendices'),
     path('usuarios/editar/<int:pk>/', views.editar_usuario, name='editar_usuario'),
     path('usuarios/eliminar/<int:pk>/', views.eliminar_usuario, name='eliminar_usuario'),
     path('usuarios/<int:pk>/', DetalleUsuarioView.as_view(), name='detalle_usuario'),
@@ -28,9 +29,14 @@ urlpatterns = [
     path('proyectos/', views.revisar_solicitudes, name='revisar_solicitudes'),
     path('proyectos/aprobar/<int:pk>/', views.aprobar_proyecto, name='aprobar_proyecto'),
     path('proyectos/rechazar/<int:pk>/', views.rechazar_proyecto, name='rechazar_proyecto'),
+    path('proyectos/decidir/', views.decidir_proyectos, name='decidir_proyectos'),
 
     # Reportes
     path('reportes/', views.reportes, name='reportes'),
     path('reporte-completo/', views.generar_reporte_completo, name='reporte_completo'),
+    path('reportes/solicitar/', views.solicitar_reporte, name='solicitar_reporte'),
+    path('reportes/<int:pk>/estado/', views.estado_reporte, name='estado_reporte'),
+    path('reportes/<int:pk>/descargar/', views.descargar_reporte, name='descargar_reporte'),
+    path('exportar/<str:entidad>/', views.exportar_entidad, name='exportar_entidad'),
 
 ]
\ No newline at end of file
@@ -1,6 +1,5 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.core.paginator import Paginator
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView
 from django.db.models import Count
@@ -8,24 +7,29 @@ from django.contrib.auth.mixins import UserPassesTestMixin
 
 # Decoradores y modelos/funciones de usuario
 from usuario.utils import role_required
+from usuario.paginacion import paginar, paginar_claves
+from usuario import busqueda
 from usuario.models import Usuario, ProgramaFormativo, SectorProductivo
 from usuario.forms import ProgramaFormativoForm, SectorProductivoForm
 
 # Formularios propios de la app gestión
-from .forms import UsuarioForm
+from .forms import UsuarioForm, ImportacionAprendicesForm
+from .contadores import obtener_metricas
 
 # Modelos externos relacionados
 from empresas.models import SolicitudProyecto
 from django.views.decorators.http import require_POST, require_http_methods
 from empresas.models import SolicitudProyecto
 
-# Modelos de reportes de la app gestión
-from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
+# Reportes de la app gestión
+from django.http import StreamingHttpResponse, JsonResponse, FileResponse, Http404
+from django.urls import reverse
 from datetime import datetime
-from usuario.models import Usuario, PerfilEmpresa, PerfilAprendiz, PerfilInstructor, ProgramaFormativo, SectorProductivo
+from .models import ReporteJob, ImportacionAprendices
+from .importacion import COLUMNAS as COLUMNAS_IMPORTACION
+from .reportes_pdf import generar_reporte_pdf, SECCIONES
+from . import trabajos, exportacion, decisiones
+from usuario.models import Usuario, ProgramaFormativo, SectorProductivo
 
 
 # --- Vistas del Dashboard y Métricas ---
@@ -67,38 +71,20 @@ class DetalleUsuarioView(UserPassesTestMixin, DetailView):
 def dashboard_admin(request):
     """
     Dashboard exclusivo para administradores, consolidando métricas clave.
+    Las métricas se leen de los contadores cacheados (ver gestion/contadores.py).
     """
-    # 1. Conteo de Usuarios Totales
-    total_usuarios = Usuario.objects.count()
-
-    # 2. Conteo de Usuarios por Rol
-    usuarios_por_rol = {
-        'admins': Usuario.objects.filter(rol=Usuario.ADMIN).count(),
-        'instructores': Usuario.objects.filter(rol=Usuario.INSTRUCTOR).count(),
-        'empresas': Usuario.objects.filter(rol=Usuario.EMPRESA).count(),
-        'aprendices': Usuario.objects.filter(rol=Usuario.APRENDIZ).count(),
-    }
-    
-    # 3. Usuarios Recientes (últimos 5)
-    usuarios_recientes = Usuario.objects.order_by('-date_joined')[:5]
-
-    # 4. Proyectos Pendientes (Asume que existe un modelo 'Proyecto' con estado 'PENDIENTE')
-    # Si el modelo Proyecto no existe, mantendremos un valor constante por ahora
-    try:
-        # Intenta obtener el modelo Proyecto si está importado o definido.
-        # Por ahora, usamos un valor hardcodeado como simulación.
-        proyectos_pendientes_count = 8 
-        # Si tuvieras el modelo: proyectos_pendientes_count = Proyecto.objects.filter(estado='PENDIENTE').count()
-    except Exception:
-        proyectos_pendientes_count = 0 
+    metricas = obtener_metricas()
 
+    # Usuarios Recientes (últimos 5)
+    usuarios_recientes = Usuario.objects.order_by('-date_joined')[:5]
 
     context = {
         'user': request.user,
-        'total_usuarios': total_usuarios,
-        'usuarios_por_rol': usuarios_por_rol,
+        'metricas': metricas,
+        'total_usuarios': metricas.total_usuarios,
+        'usuarios_por_rol': metricas.usuarios_por_rol,
         'usuarios_recientes': usuarios_recientes,
-        'proyectos_pendientes_count': proyectos_pendientes_count,
+        'proyectos_pendientes_count': metricas.proyectos_pendientes,
     }
     return render(request, 'dashboard_admin.html', context)
 
@@ -111,18 +97,19 @@ def listar_usuarios(request):
     buscar = request.GET.get('buscar', '')
     rol = request.GET.get('rol', '')
 
-    usuarios = Usuario.objects.all()
-
     if buscar:
-        usuarios = usuarios.filter(username__icontains=buscar)
-
-    if rol:
-        usuarios = usuarios.filter(rol=rol)
-
-    usuarios = usuarios.order_by('-date_joined')
-    paginator = Paginator(usuarios, 10)
-    page_number = request.GET.get('page')
-    usuarios_paginados = paginator.get_page(page_number)
+        # Todos los ids del índice de texto completo (ya filtrados por rol), en
+        # orden de relevancia; se pagina por (posición, id) y solo se cargan los
+        # usuarios de la página.
+        ids = busqueda.buscar(buscar, rol=rol)
+        usuarios_paginados = paginar_claves(request, list(enumerate(ids)), 10)
+        por_id = Usuario.objects.in_bulk([pk for _, pk in usuarios_paginados])
+        usuarios_paginados.object_list = [por_id[pk] for _, pk in usuarios_paginados if pk in por_id]
+    else:
+        usuarios = Usuario.objects.all()
+        if rol:
+            usuarios = usuarios.filter(rol=rol)
+        usuarios_paginados = paginar(request, usuarios, 10, orden=('-date_joined', '-id'), contar=True)
 
     context = {
         'usuarios': usuarios_paginados,
@@ -147,6 +134,27 @@ def crear_usuario(request):
         form = UsuarioForm()
     return render(request, 'crear_usuario.html', {'form': form})
 
+@role_required("ADMIN")
+def importar_aprendices(request):
+    """Sube un CSV con una ficha de aprendices; el worker `procesar_importaciones` la importa."""
+    if request.method == 'POST':
+        form = ImportacionAprendicesForm(request.POST, request.FILES)
+        if form.is_valid():
+            importacion = form.save(commit=False)
+            importacion.solicitado_por = request.user
+            importacion.save()
+            messages.success(request, f"✅ Importación #{importacion.pk} en cola. El resultado aparecerá en esta página.")
+            return redirect('gestion:importar_aprendices')
+    else:
+        form = ImportacionAprendicesForm()
+
+    context = {
+        'form': form,
+        'importaciones': ImportacionAprendices.objects.all()[:5],
+        'columnas': COLUMNAS_IMPORTACION,
+    }
+    return render(request, 'importar_aprendices.html', context)
+
 @role_required("ADMIN")
 def editar_usuario(request, pk):
     """Maneja la edición de un usuario existente."""
@@ -303,20 +311,15 @@ def proyectos_pendientes(request):
 @role_required("ADMIN")
 def reportes(request):
     """Generación y visualización de reportes administrativos."""
-    total_usuarios = Usuario.objects.count()
-
-    usuarios_por_rol = {
-        'admins': Usuario.objects.filter(rol=Usuario.ADMIN).count(),
-        'instructores': Usuario.objects.filter(rol=Usuario.INSTRUCTOR).count(),
-        'empresas': Usuario.objects.filter(rol=Usuario.EMPRESA).count(),
-        'aprendices': Usuario.objects.filter(rol=Usuario.APRENDIZ).count(),
-    }
+    metricas = obtener_metricas()
 
     context = {
-        'total_usuarios': total_usuarios,
-        'usuarios_por_rol': usuarios_por_rol,
-        # Aquí podrías añadir más datos para gráficos:
-        # 'proyectos_por_sector': SectorProductivo.objects.annotate(count=Count('proyecto')).order_by('-count')
+        'metricas': metricas,
+        'total_usuarios': metricas.total_usuarios,
+        'usuarios_por_rol': metricas.usuarios_por_rol,
+        'secciones_reporte': [(clave, titulo) for clave, (titulo, _) in SECCIONES.items()],
+        'trabajos_recientes': ReporteJob.objects.filter(solicitado_por=request.user)[:5],
+        'entidades_exportables': [(clave, clave.replace('_', ' ')) for clave in exportacion.ENTIDADES],
     }
 
     return render(request, 'reportes.html', context)
@@ -324,7 +327,9 @@ def reportes(request):
 @role_required("ADMIN")
 def revisar_solicitudes(request):
     """Muestra todos los proyectos en estado Pendiente con mejor diseño."""
-    pendientes = SolicitudProyecto.objects.filter(estado="PENDIENTE").order_by('-creado_en')
+    pendientes = paginar(
+        request, SolicitudProyecto.objects.filter(estado="PENDIENTE").para_revision(), 20, orden=('-creado_en', '-id')
+    )
     
     context = {
         'pendientes': pendientes,
@@ -336,7 +341,7 @@ def revisar_solicitudes(request):
 @role_required("ADMIN")
 @require_http_methods(["POST"])
 def aprobar_proyecto(request, pk):
-    proyecto = get_object_or_404(SolicitudProyecto, pk=pk)
+    proyecto = get_object_or_404(SolicitudProyecto.objects.only('pk', 'nombre'), pk=pk)
     
     motivo_aprobacion = request.POST.get('motivo_aprobacion', '').strip()
     
@@ -344,12 +349,11 @@ def aprobar_proyecto(request, pk):
         messages.error(request, "⚠️ Debes proporcionar un motivo para la aprobación.")
         return redirect('gestion:revisar_solicitudes')
     
-    proyecto.estado = "APROBADO"
-    proyecto.motivo_aprobacion = motivo_aprobacion
-    proyecto.fecha_decision = datetime.now()
-    proyecto.save()
-    
-    messages.success(request, f"✅ Proyecto '{proyecto.nombre}' aprobado.")
+    resultado = decisiones.decidir({decisiones.APROBADO: {proyecto.pk: motivo_aprobacion}})
+    if resultado.conflictos:
+        messages.warning(request, f"⚠️ El proyecto '{proyecto.nombre}' ya había sido revisado.")
+    else:
+        messages.success(request, f"✅ Proyecto '{proyecto.nombre}' aprobado.")
     return redirect('gestion:revisar_solicitudes')
 
 
@@ -361,7 +365,7 @@ def rechazar_proyecto(request, pk):
     Rechaza un proyecto y lo marca como rechazado.
     Ahora guarda el motivo de rechazo en la BD.
     """
-    proyecto = get_object_or_404(SolicitudProyecto, pk=pk)
+    proyecto = get_object_or_404(SolicitudProyecto.objects.only('pk', 'nombre'), pk=pk)
     
     # Obtener el motivo de rechazo del formulario
     motivo_rechazo = request.POST.get('motivo_rechazo', '').strip()
@@ -371,11 +375,11 @@ def rechazar_proyecto(request, pk):
         messages.error(request, "⚠️ Debes proporcionar un motivo para el rechazo.")
         return redirect('gestion:revisar_solicitudes')
     
-    # Actualizar el proyecto
-    proyecto.estado = "RECHAZADO"
-    proyecto.motivo_rechazo = motivo_rechazo
-    proyecto.save()
-    
+    resultado = decisiones.decidir({decisiones.RECHAZADO: {proyecto.pk: motivo_rechazo}})
+    if resultado.conflictos:
+        messages.warning(request, f"⚠️ El proyecto '{proyecto.nombre}' ya había sido revisado.")
+        return redirect('gestion:revisar_solicitudes')
+
     # Mensaje de advertencia
     messages.warning(
         request, 
@@ -385,115 +389,101 @@ def rechazar_proyecto(request, pk):
     
     return redirect('gestion:revisar_solicitudes')
 
+
+@role_required("ADMIN")
+@require_POST
+def decidir_proyectos(request):
+    """
+    Aprueba o rechaza en bloque las solicitudes marcadas en la revisión. El motivo
+    común se usa para las que no traen uno propio (`motivo_<id>`).
+    """
+    decision = request.POST.get('decision')
+    if decision not in decisiones.CAMPO_MOTIVO:
+        messages.error(request, "⚠️ Elige si apruebas o rechazas las solicitudes marcadas.")
+        return redirect('gestion:revisar_solicitudes')
+
+    ids = {int(pk) for pk in request.POST.getlist('proyectos') if pk.isdigit()}
+    comun = request.POST.get('motivo', '').strip()
+    motivos = {pk: request.POST.get(f'motivo_{pk}', '').strip() or comun for pk in ids}
+    sin_motivo = [pk for pk, motivo in motivos.items() if not motivo]
+    if not ids or sin_motivo:
+        messages.error(request, "⚠️ Marca al menos una solicitud y da un motivo (común o por proyecto) para cada una.")
+        return redirect('gestion:revisar_solicitudes')
+
+    resultado = decisiones.decidir({decision: motivos})
+    verbo = "aprobadas" if decision == decisiones.APROBADO else "rechazadas"
+    messages.success(request, f"✅ {resultado.total} solicitud(es) {verbo}. Las empresas serán notificadas.")
+    if resultado.conflictos:
+        messages.warning(request, f"⚠️ {len(resultado.conflictos)} solicitud(es) ya habían sido revisadas y no se modificaron.")
+    return redirect('gestion:revisar_solicitudes')
+
 # --- Reportes y Analíticas ---
 @role_required("ADMIN")
 def generar_reporte_completo(request):
-    # Crear la respuesta HTTP con tipo PDF
-    response = HttpResponse(content_type='application/pdf')
+    """
+    Descarga el reporte general del sistema en PDF. El documento se genera y se
+    envía página a página (ver gestion/reportes_pdf.py), sin cargar todas las
+    filas ni el PDF completo en memoria.
+    """
+    response = StreamingHttpResponse(generar_reporte_pdf(), content_type='application/pdf')
     response['Content-Disposition'] = f'attachment; filename="reporte_completo_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf"'
+    return response
+
 
-    # Crear el lienzo del PDF
-    pdf = canvas.Canvas(response, pagesize=letter)
-    width, height = letter
-    y = height - inch
-
-    # Encabezado
-    pdf.setFont("Helvetica-Bold", 16)
-    pdf.drawString(inch, y, "Reporte General del Sistema OASIS")
-    pdf.setFont("Helvetica", 10)
-    pdf.drawString(inch, y - 15, f"Generado el {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-    y -= 40
-
-    # Sección 1: Usuarios
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(inch, y, "Usuarios del Sistema")
-    y -= 20
-    pdf.setFont("Helvetica", 10)
-
-    for u in Usuario.objects.all():
-        line = f"{u.username} | Rol: {u.rol} | Email: {u.email or 'N/A'} | Activo: {'Sí' if u.esta_activo else 'No'}"
-        pdf.drawString(inch, y, line)
-        y -= 15
-        if y < inch:
-            pdf.showPage()
-            y = height - inch
-
-    # Sección 2: Perfiles de Empresa
-    y -= 20
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(inch, y, "Perfiles de Empresa")
-    y -= 20
-    pdf.setFont("Helvetica", 10)
-
-    for e in PerfilEmpresa.objects.select_related('usuario', 'sector').all():
-        line = f"{e.razon_social} | NIT: {e.nit} | Sector: {e.sector or 'N/A'} | Usuario: {e.usuario.username}"
-        pdf.drawString(inch, y, line)
-        y -= 15
-        if y < inch:
-            pdf.showPage()
-            y = height - inch
-
-    # Sección 3: Perfiles de Aprendices
-    y -= 20
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(inch, y, "Perfiles de Aprendices")
-    y -= 20
-    pdf.setFont("Helvetica", 10)
-
-    for a in PerfilAprendiz.objects.select_related('usuario', 'programa').all():
-        line = f"{a.usuario.username} | Doc: {a.documento} | Programa: {a.programa or 'N/A'} | Ficha: {a.ficha}"
-        pdf.drawString(inch, y, line)
-        y -= 15
-        if y < inch:
-            pdf.showPage()
-            y = height - inch
-
-    # Sección 4: Perfiles de Instructores
-    y -= 20
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(inch, y, "Perfiles de Instructores")
-    y -= 20
-    pdf.setFont("Helvetica", 10)
-
-    for i in PerfilInstructor.objects.select_related('usuario').all():
-        line = f"{i.usuario.username} | Doc: {i.documento} | Área: {i.area_conocimiento}"
-        pdf.drawString(inch, y, line)
-        y -= 15
-        if y < inch:
-            pdf.showPage()
-            y = height - inch
-
-    # Sección 5: Programas Formativos
-    y -= 20
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(inch, y, "Programas Formativos")
-    y -= 20
-    pdf.setFont("Helvetica", 10)
-
-    for p in ProgramaFormativo.objects.all():
-        line = f"{p.nombre} | Tipo: {p.tipo} | Código: {p.codigo}"
-        pdf.drawString(inch, y, line)
-        y -= 15
-        if y < inch:
-            pdf.showPage()
-            y = height - inch
-
-    # Sección 6: Sectores Productivos
-    y -= 20
-    pdf.setFont("Helvetica-Bold", 14)
-    pdf.drawString(inch, y, "Sectores Productivos")
-    y -= 20
-    pdf.setFont("Helvetica", 10)
-
-    for s in SectorProductivo.objects.all():
-        line = f"{s.nombre} | {s.descripcion or 'Sin descripción'}"
-        pdf.drawString(inch, y, line)
-        y -= 15
-        if y < inch:
-            pdf.showPage()
-            y = height - inch
-
-    # Finalizar PDF
-    pdf.showPage()
-    pdf.save()
-    return response
\ No newline at end of file
+@role_required("ADMIN")
+@require_POST
+def solicitar_reporte(request):
+    """Encola la generación del reporte general (o reutiliza uno reciente con los mismos parámetros)."""
+    parametros = trabajos.normalizar_parametros(request.POST.getlist('secciones'))
+    job = trabajos.solicitar_reporte(parametros, request.user)
+
+    if job.estado == ReporteJob.COMPLETADO:
+        messages.info(request, f"ℹ️ Ya existe un reporte reciente con estos parámetros (#{job.pk}), listo para descargar.")
+    else:
+        messages.success(request, f"✅ Reporte #{job.pk} en cola. Podrás descargarlo cuando termine de generarse.")
+    return redirect(reverse('gestion:reportes') + f'?job={job.pk}')
+
+
+@role_required("ADMIN")
+def estado_reporte(request, pk):
+    """Estado de un trabajo de reporte en JSON, consultado periódicamente desde la página de reportes."""
+    job = get_object_or_404(ReporteJob, pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'estado': job.estado,
+        'estado_display': job.get_estado_display(), #type: ignore
+        'error': job.error,
+        'url_descarga': reverse('gestion:descargar_reporte', args=[job.pk]) if job.estado == ReporteJob.COMPLETADO else None,
+    })
+
+
+@role_required("ADMIN")
+def descargar_reporte(request, pk):
+    """Sirve el PDF generado por el worker de reportes."""
+    job = get_object_or_404(ReporteJob, pk=pk, estado=ReporteJob.COMPLETADO)
+    if not job.archivo or not job.archivo.storage.exists(job.archivo.name):
+        raise Http404("El archivo del reporte ya no está disponible")
+
+    return FileResponse(
+        job.archivo.open('rb'),
+        as_attachment=True,
+        filename=f"reporte_completo_{job.creado_en.strftime('%Y%m%d_%H%M%S')}.pdf",
+        content_type='application/pdf',
+    )
+
+
+@role_required("ADMIN")
+def exportar_entidad(request, entidad):
+    """Exportación masiva de una entidad en CSV, CSV comprimido (gzip) o XLSX, generada en flujo."""
+    if entidad not in exportacion.ENTIDADES:
+        raise Http404("Entidad no exportable")
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportacion.FORMATOS:
+        formato = 'csv'
+
+    tipo_contenido, extension = exportacion.FORMATOS[formato]
+    response = StreamingHttpResponse(exportacion.exportar(entidad, formato), content_type=tipo_contenido)
+    response['Content-Disposition'] = (
+        f'attachment; filename="{entidad}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}"'
+    )
+    return response
@@ -6,6 +6,13 @@ from django.utils.translation import gettext_lazy as _
 import os
 
 
+class AsignacionInstructorQuerySet(models.QuerySet):
+
+    def para_dashboard(self):
+        """Asignaciones del instructor con su proyecto en la misma consulta."""
+        return self.select_related('proyecto')
+
+
 class AsignacionInstructor(models.Model):
     instructor = models.ForeignKey(
         Usuario,
@@ -20,6 +27,8 @@ class AsignacionInstructor(models.Model):
     )
     fecha_asignacion = models.DateField(auto_now_add=True)
 
+    objects = AsignacionInstructorQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Asignación de Instructor"
         verbose_name_plural = "Asignaciones de Instructores"
@@ -1,4 +1,8 @@
+import uuid
+
 # Django imports
+from django.db.models import Exists
+from django.views.decorators.http import require_POST
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.contrib import messages
@@ -8,12 +12,14 @@ from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
 
 # Utils
-from usuario.utils import role_required
+from usuario.utils import role_required, idempotente
+from usuario.paginacion import paginar
 
 # Models
 from usuario.models import PerfilInstructor
 from .models import AsignacionInstructor, InstructorProfile  # Evitar duplicado si ya lo importaste de usuario.models
 from empresas.models import SolicitudProyecto, PostulacionInstructor
+from empresas import recomendacion, postulaciones
 
 # Forms
 from .forms import SeguimientoForm, InstructorProfileForm
@@ -23,13 +29,13 @@ from .forms import SeguimientoForm, InstructorProfileForm
 @role_required("INSTRUCTOR")
 def dashboard_instructor(request):
     """Panel principal del instructor."""
-    proyectos = AsignacionInstructor.objects.filter(instructor=request.user)
+    proyectos = AsignacionInstructor.objects.filter(instructor=request.user).para_dashboard()
     return render(request, 'dashboard_instructor.html', {'proyectos': proyectos})
 
 @role_required("INSTRUCTOR")
 def proyectos_asignados(request):
     """Lista de proyectos asignados."""
-    proyectos = AsignacionInstructor.objects.filter(instructor=request.user)
+    proyectos = AsignacionInstructor.objects.filter(instructor=request.user).para_dashboard()
     return render(request, 'proyectos_asignados.html', {'proyectos': proyectos})
 
 @role_required("INSTRUCTOR")
@@ -42,6 +48,7 @@ def detalle_proyecto_instructor(request, pk):
     return render(request, "detalle_proyecto_instructor.html", {
         "proyecto": proyecto,
         "ya_postulado": ya_postulado,
+        "clave_idempotencia": uuid.uuid4().hex,
     })
 
 
@@ -53,8 +60,13 @@ def lista_proyectos(request):
 @role_required("INSTRUCTOR")
 def listar_proyectos(request):
     """Muestra todos los proyectos disponibles para que el instructor se postule."""
-    proyectos = SolicitudProyecto.objects.filter(estado="APROBADO")
-    return render(request, "listar_proyectos_instructor.html", {"proyectos": proyectos})
+    proyectos = paginar(
+        request, SolicitudProyecto.objects.filter(estado="APROBADO").para_listado(), 20, orden=('-creado_en', '-id')
+    )
+    # Las recomendaciones según su área de conocimiento solo van en la primera página.
+    instructor = PerfilInstructor.objects.filter(usuario=request.user).first()
+    recomendados = recomendacion.para_instructor(instructor) if instructor and 'cursor' not in request.GET else []
+    return render(request, "listar_proyectos_instructor.html", {"proyectos": proyectos, "recomendados": recomendados})
 
 
 @role_required("INSTRUCTOR")
@@ -145,16 +157,24 @@ def perfil_instructor(request, perfil_id=None):
     return render(request, 'perfil_instructor.html', context)
 
 @role_required("INSTRUCTOR")
+@require_POST
+@idempotente
 def postular_proyecto_instructor(request, pk):
     """Permite al instructor postularse como guía de un proyecto."""
-    proyecto = get_object_or_404(SolicitudProyecto, pk=pk)
-    instructor = request.user.perfil_instructor
-
-    postulacion_existente = PostulacionInstructor.objects.filter(instructor=instructor, proyecto=proyecto).exists()
-    if postulacion_existente:
-        messages.warning(request, "⚠️ Ya te postulaste a este proyecto.")
+    # El perfil del instructor comparte pk con su usuario; se comprueba que exista en la misma consulta.
+    proyecto = get_object_or_404(
+        SolicitudProyecto.objects.only('nombre').annotate(
+            es_instructor=Exists(PerfilInstructor.objects.filter(pk=request.user.pk))
+        ),
+        pk=pk,
+    )
+    if not proyecto.es_instructor:
+        messages.error(request, "⚠️ Completa tu perfil de instructor antes de postularte.")
         return redirect('instructores:detalle_proyecto_instructor', pk=proyecto.id)
 
-    PostulacionInstructor.objects.create(instructor=instructor, proyecto=proyecto)
-    messages.success(request, f"✅ Te has postulado como instructor guía para '{proyecto.nombre}'.")
+    # Un solo INSERT: la restricción única resuelve el doble clic y las peticiones simultáneas.
+    if postulaciones.postular(PostulacionInstructor, instructor_id=request.user.pk, proyecto=proyecto):
+        messages.success(request, f"✅ Te has postulado como instructor guía para '{proyecto.nombre}'.")
+    else:
+        messages.warning(request, "⚠️ Ya te postulaste a este proyecto.")
     return redirect('instructores:detalle_proyecto_instructor', pk=proyecto.id)
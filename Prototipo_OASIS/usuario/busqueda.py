@@ -0,0 +1,239 @@
+# usuario/busqueda.py
+"""
+Búsqueda de texto completo sobre los usuarios y sus perfiles.
+
+Se indexan username, email, nombres y apellidos, los documentos de aprendiz e
+instructor, y el NIT y la razón social de la empresa, en una tabla aparte
+(`usuario_busqueda`) que se mantiene al día con señales (ver usuario/signals.py).
+
+Backends, todos con la misma interfaz (`indexar`, `reconstruir`, `buscar`):
+  - SQLite: tabla virtual FTS5 (rowid = id del usuario), ordenada por bm25.
+  - PostgreSQL: tabla con una columna tsvector e índice GIN, ordenada por ts_rank_cd.
+  - Cualquier otro motor: filtros icontains sobre los mismos campos (sin índice).
+
+Las búsquedas son por prefijo y todas las palabras deben aparecer: "ana 1020"
+encuentra a "Ana María" con documento 1020304050. El filtro por rol se aplica en
+la misma consulta y se devuelven todos los ids, del más al menos relevante, para
+que el listado los pagine por clave (ver `paginar_claves`) sin perder resultados.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+TABLA = "usuario_busqueda"
+
+# Columnas del documento indexado, en el orden en que se guardan.
+COLUMNAS = ("username", "email", "nombre", "documentos", "razon_social")
+PESOS = (10.0, 6.0, 4.0, 8.0, 4.0)
+
+# Una fila por usuario con el texto de cada columna; sirve para los tres motores.
+_SELECT_DOCUMENTOS = """
+    SELECT u.id,
+           u.username,
+           u.email,
+           u.first_name || ' ' || u.last_name,
+           COALESCE(pa.documento, '') || ' ' || COALESCE(pi.documento, '') || ' ' || COALESCE(pe.nit, ''),
+           COALESCE(pe.razon_social, '')
+    FROM usuario_usuario u
+    LEFT JOIN usuario_perfilaprendiz pa ON pa.usuario_id = u.id
+    LEFT JOIN usuario_perfilinstructor pi ON pi.usuario_id = u.id
+    LEFT JOIN usuario_perfilempresa pe ON pe.usuario_id = u.id
+"""
+
+
+def terminos(texto) -> list:
+    """Palabras de la consulta en minúsculas (letras y dígitos; el resto separa)."""
+    return [t.lower() for t in re.findall(r"[^\W_]+", texto or "")][:8]
+
+
+def _marcadores(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+def _filtro_rol(rol, columna_id):
+    """JOIN con usuario_usuario para filtrar por rol (vacío si no hay rol) y sus parámetros."""
+    if not rol:
+        return "", []
+    return f"JOIN usuario_usuario u ON u.id = {columna_id} AND u.rol = %s", [rol]
+
+
+def _limite(limite):
+    return ("LIMIT %s", [limite]) if limite is not None else ("", [])
+
+
+class BackendFTS5:
+    nombre = "fts5"
+
+    def instalar(self, cursor):
+        columnas = ", ".join(COLUMNAS)
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA} USING fts5("
+            f"{columnas}, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+        )
+        # bm25 con pesos por columna como orden por defecto de la columna `rank`.
+        pesos = ", ".join(str(p) for p in PESOS)
+        cursor.execute(f"INSERT INTO {TABLA}({TABLA}, rank) VALUES ('rank', 'bm25({pesos})')")
+
+    def desinstalar(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+
+    def indexar(self, ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA} WHERE rowid IN ({_marcadores(ids)})", ids)
+            cursor.execute(
+                f"INSERT INTO {TABLA}(rowid, {', '.join(COLUMNAS)}) {_SELECT_DOCUMENTOS} WHERE u.id IN ({_marcadores(ids)})",
+                ids,
+            )
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA}")
+            cursor.execute(f"INSERT INTO {TABLA}(rowid, {', '.join(COLUMNAS)}) {_SELECT_DOCUMENTOS}")
+            cursor.execute(f"INSERT INTO {TABLA}({TABLA}) VALUES ('optimize')")
+
+    def buscar(self, palabras, rol=None, limite=None):
+        # Primero las palabras completas y después los prefijos, cada pasada
+        # ordenada por bm25 sobre todas sus coincidencias.
+        union, parametros_rol = _filtro_rol(rol, f"{TABLA}.rowid")
+        tope, parametros_tope = _limite(limite)
+        ids = []
+        with connection.cursor() as cursor:
+            for sufijo in ("", "*"):
+                cursor.execute(
+                    f"SELECT {TABLA}.rowid FROM {TABLA} {union} WHERE {TABLA} MATCH %s ORDER BY {TABLA}.rank {tope}",
+                    parametros_rol + [" ".join(f'"{p}"{sufijo}' for p in palabras)] + parametros_tope,
+                )
+                ids.extend(fila[0] for fila in cursor.fetchall())
+        ids = list(dict.fromkeys(ids))
+        return ids if limite is None else ids[:limite]
+
+
+class BackendPostgres:
+    nombre = "tsvector"
+
+    _VECTOR = (
+        "setweight(to_tsvector('simple', d.username), 'A') || "
+        "setweight(to_tsvector('simple', d.documentos), 'A') || "
+        "setweight(to_tsvector('simple', d.email), 'B') || "
+        "setweight(to_tsvector('simple', d.nombre), 'C') || "
+        "setweight(to_tsvector('simple', d.razon_social), 'C')"
+    )
+
+    def instalar(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {TABLA} ("
+            "usuario_id bigint PRIMARY KEY REFERENCES usuario_usuario(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "vector tsvector NOT NULL)"
+        )
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {TABLA}_vector_gin ON {TABLA} USING gin (vector)")
+
+    def desinstalar(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLA}")
+
+    def _insertar(self, cursor, filtro="", parametros=()):
+        cursor.execute(
+            f"INSERT INTO {TABLA} (usuario_id, vector) "
+            f"SELECT d.id, {self._VECTOR} FROM ({_SELECT_DOCUMENTOS} {filtro}) "
+            f"AS d (id, {', '.join(COLUMNAS)}) "
+            "ON CONFLICT (usuario_id) DO UPDATE SET vector = EXCLUDED.vector",
+            parametros,
+        )
+
+    def indexar(self, ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABLA} WHERE usuario_id IN ({_marcadores(ids)})", ids)
+            self._insertar(cursor, f"WHERE u.id IN ({_marcadores(ids)})", ids)
+
+    def reconstruir(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {TABLA}")
+            self._insertar(cursor)
+
+    def buscar(self, palabras, rol=None, limite=None):
+        consulta = " & ".join(f"{p}:*" for p in palabras)
+        union, parametros_rol = _filtro_rol(rol, f"{TABLA}.usuario_id")
+        tope, parametros_tope = _limite(limite)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {TABLA}.usuario_id FROM {TABLA} {union} CROSS JOIN to_tsquery('simple', %s) AS q "
+                f"WHERE vector @@ q ORDER BY ts_rank_cd(vector, q) DESC, {TABLA}.usuario_id DESC {tope}",
+                parametros_rol + [consulta] + parametros_tope,
+            )
+            return [fila[0] for fila in cursor.fetchall()]
+
+
+class BackendBasico:
+    """Sin índice: para motores sin FTS soportado. Mismo resultado, sin ranking."""
+    nombre = "basico"
+
+    def instalar(self, cursor):
+        pass
+
+    def desinstalar(self, cursor):
+        pass
+
+    def indexar(self, ids):
+        pass
+
+    def reconstruir(self):
+        pass
+
+    def buscar(self, palabras, rol=None, limite=None):
+        from .models import Usuario
+
+        filtro = Q()
+        for palabra in palabras:
+            filtro &= (
+                Q(username__icontains=palabra) | Q(email__icontains=palabra)
+                | Q(first_name__icontains=palabra) | Q(last_name__icontains=palabra)
+                | Q(perfil_aprendiz__documento__startswith=palabra)
+                | Q(perfil_instructor__documento__startswith=palabra)
+                | Q(perfil_empresa__nit__startswith=palabra)
+                | Q(perfil_empresa__razon_social__icontains=palabra)
+            )
+        if rol:
+            filtro &= Q(rol=rol)
+        return list(Usuario.objects.filter(filtro).order_by('-id').values_list('pk', flat=True)[:limite])
+
+
+def backend_para(conexion):
+    if conexion.vendor == 'postgresql':
+        return BackendPostgres()
+    if conexion.vendor == 'sqlite':
+        with conexion.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if cursor.fetchone()[0]:
+                return BackendFTS5()
+    return BackendBasico()
+
+
+_backends = {}
+
+
+def backend():
+    """Backend de la conexión por defecto (se resuelve una vez por motor)."""
+    if connection.vendor not in _backends:
+        _backends[connection.vendor] = backend_para(connection)
+    return _backends[connection.vendor]
+
+
+def indexar(ids):
+    """Vuelve a indexar los usuarios dados; los que ya no existen salen del índice."""
+    ids = sorted(set(ids))
+    if ids:
+        backend().indexar(ids)
+
+
+def reconstruir():
+    """Reindexa todos los usuarios (tras cargas masivas con bulk_create o update())."""
+    backend().reconstruir()
+
+
+def buscar(texto, rol=None, limite=None) -> list:
+    """Ids de usuarios (del rol dado, si lo hay) que coinciden con `texto`, del más al menos relevante."""
+    palabras = terminos(texto)
+    if not palabras:
+        return []
+    return backend().buscar(palabras, rol, limite)
+
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from usuario import busqueda
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye el índice de búsqueda de usuarios. Necesario tras cargas masivas "
+        "(bulk_create, update(), restauraciones) que no disparan las señales."
+    )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        busqueda.reconstruir()
+        self.stdout.write(self.style.SUCCESS(
+            f"Índice de búsqueda ({busqueda.backend().nombre}) reconstruido en {time.perf_counter() - inicio:.2f}s."
+        ))
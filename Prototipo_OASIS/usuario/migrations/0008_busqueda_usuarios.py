@@ -0,0 +1,32 @@
+# Índice de búsqueda de texto completo de usuarios (ver usuario/busqueda.py).
+# La tabla depende del motor (FTS5 en SQLite, tsvector + GIN en PostgreSQL),
+# por eso se crea con RunPython en lugar de un modelo.
+
+from django.db import migrations
+
+
+def crear_indice(apps, schema_editor):
+    from usuario import busqueda
+
+    backend = busqueda.backend_para(schema_editor.connection)
+    with schema_editor.connection.cursor() as cursor:
+        backend.instalar(cursor)
+    backend.reconstruir()
+
+
+def eliminar_indice(apps, schema_editor):
+    from usuario import busqueda
+
+    with schema_editor.connection.cursor() as cursor:
+        busqueda.backend_para(schema_editor.connection).desinstalar(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuario', '0007_alter_perfilaprendiz_tipo_documento_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, eliminar_indice),
+    ]
@@ -93,6 +93,11 @@ class Usuario(AbstractUser):
     class Meta:
         verbose_name = "Usuario del Sistema"
         verbose_name_plural = "Usuarios del Sistema"
+        indexes = [
+            # Listado de usuarios: orden por fecha de registro, con o sin filtro por rol.
+            models.Index(fields=['date_joined'], name='usuario_fecha_registro_idx'),
+            models.Index(fields=['rol', 'date_joined'], name='usuario_rol_fecha_idx'),
+        ]
 
 
 # --- MODELOS DE PERFILES (Datos Únicos) ---
@@ -0,0 +1,225 @@
+# usuario/paginacion.py
+"""
+Paginación por clave (keyset / seek) para los listados del sistema.
+
+En lugar de `OFFSET` + `COUNT(*)` (lo que hace `Paginator`), cada página se pide
+con un filtro sobre la última fila vista, por ejemplo
+`(date_joined, id) < (:fecha, :id)`, de modo que ir a la página 500 cuesta lo
+mismo que ir a la 1 si existe un índice sobre las columnas de orden.
+
+La posición viaja en el querystring como un cursor opaco y firmado
+(`?cursor=...`). El total es opcional y aproximado: se cuenta hasta un tope.
+Las columnas de orden no deben admitir NULL y la última debe ser única (la pk).
+
+`paginar_claves` hace lo mismo sobre una lista ya ordenada en memoria (p. ej. una
+lista cacheada de proyectos), buscando la posición del cursor con bisección.
+"""
+from bisect import bisect_left, bisect_right
+
+from django.core import signing
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+SAL_CURSOR = "usuario.paginacion.cursor"
+TOPE_CONTEO = 1000
+
+
+class PaginaKeyset:
+    """Una página de resultados; se usa en las plantillas como una lista."""
+
+    def __init__(self, objetos, cursor_siguiente=None, cursor_anterior=None, total=None, total_exacto=True):
+        self.object_list = objetos
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.total = total
+        self.total_exacto = total_exacto
+        self.url_siguiente = None
+        self.url_anterior = None
+
+    @property
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    @property
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+
+class PaginadorKeyset:
+    """
+    Pagina `queryset` según `orden` (lista de campos, con '-' para descendente),
+    p. ej. `PaginadorKeyset(Usuario.objects.all(), 10, orden=('-date_joined', '-id'))`.
+    """
+
+    def __init__(self, queryset, por_pagina, orden=('-id',), contar=False):
+        self.queryset = queryset
+        self.por_pagina = por_pagina
+        self.orden = list(orden)
+        self.contar = contar
+        self._campos = [(campo.lstrip('-'), campo.startswith('-')) for campo in self.orden]
+
+    # --- Cursores ---
+
+    def _valores(self, objeto):
+        return [getattr(objeto, nombre) for nombre, _ in self._campos]
+
+    def _codificar(self, objeto, direccion):
+        valores = [valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in self._valores(objeto)]
+        return signing.dumps({'v': valores, 'd': direccion}, salt=SAL_CURSOR, compress=True)
+
+    def _decodificar(self, cursor):
+        """Devuelve (valores, dirección) o None si el cursor no es válido."""
+        try:
+            datos = signing.loads(cursor, salt=SAL_CURSOR)
+            valores, direccion = datos['v'], datos['d']
+            if len(valores) != len(self._campos) or direccion not in ('sig', 'ant'):
+                return None
+            valores = [self._a_python(nombre, valor) for (nombre, _), valor in zip(self._campos, valores)]
+        except (signing.BadSignature, ValidationError, KeyError, TypeError, ValueError):
+            return None
+        return valores, direccion
+
+    def _a_python(self, nombre, valor):
+        # Las anotaciones (p. ej. la relevancia de una búsqueda) no son campos del modelo.
+        try:
+            campo = self.queryset.model._meta.get_field(nombre)
+        except FieldDoesNotExist:
+            return valor
+        return campo.to_python(valor)
+
+    # --- Consulta ---
+
+    def _filtro_posterior(self, valores, hacia_atras):
+        """
+        Q equivalente a "(c1, c2, ...) va después de (v1, v2, ...)" en el orden
+        pedido (o antes, si `hacia_atras`), expandido para cualquier dirección por columna.
+        """
+        condicion = Q()
+        iguales = Q()
+        for (nombre, descendente), valor in zip(self._campos, valores):
+            operador = 'lt' if descendente != hacia_atras else 'gt'
+            condicion |= iguales & Q(**{f"{nombre}__{operador}": valor})
+            iguales &= Q(**{nombre: valor})
+        return condicion
+
+    def _orden_inverso(self):
+        return [campo[1:] if campo.startswith('-') else f"-{campo}" for campo in self.orden]
+
+    def pagina(self, cursor=None) -> PaginaKeyset:
+        decodificado = self._decodificar(cursor) if cursor else None
+        consulta = self.queryset
+
+        if decodificado is None:
+            hacia_atras = False
+            consulta = consulta.order_by(*self.orden)
+        else:
+            valores, direccion = decodificado
+            hacia_atras = direccion == 'ant'
+            consulta = consulta.filter(self._filtro_posterior(valores, hacia_atras))
+            consulta = consulta.order_by(*(self._orden_inverso() if hacia_atras else self.orden))
+
+        # Se pide una fila de más para saber si hay otra página en esa dirección.
+        objetos = list(consulta[:self.por_pagina + 1])
+        hay_mas = len(objetos) > self.por_pagina
+        objetos = objetos[:self.por_pagina]
+        if hacia_atras:
+            objetos.reverse()
+
+        cursor_siguiente = cursor_anterior = None
+        if objetos:
+            if hay_mas or hacia_atras:
+                cursor_siguiente = self._codificar(objetos[-1], 'sig')
+            if decodificado is not None and (hay_mas or not hacia_atras):
+                cursor_anterior = self._codificar(objetos[0], 'ant')
+
+        total, exacto = contar_aproximado(self.queryset) if self.contar else (None, True)
+        return PaginaKeyset(objetos, cursor_siguiente, cursor_anterior, total, exacto)
+
+
+def contar_aproximado(queryset, tope=TOPE_CONTEO):
+    """
+    Cuenta como máximo `tope` filas (`SELECT COUNT(*) FROM (... LIMIT tope)`).
+    Devuelve (total, exacto); si se alcanza el tope, el total es "más de tope".
+    """
+    total = queryset.order_by()[:tope + 1].count()
+    return min(total, tope), total <= tope
+
+
+class PaginadorClaves:
+    """
+    Pagina una lista de claves únicas y comparables (tuplas de enteros) en orden
+    ascendente. Cada página es un trozo de la lista; el cursor guarda la clave del
+    borde, así que la página no se desplaza si se añaden o quitan elementos antes.
+    """
+
+    def __init__(self, claves, por_pagina):
+        self.claves = claves
+        self.por_pagina = por_pagina
+
+    def _codificar(self, clave, direccion):
+        return signing.dumps({'v': list(clave), 'd': direccion}, salt=SAL_CURSOR, compress=True)
+
+    def _decodificar(self, cursor):
+        try:
+            datos = signing.loads(cursor, salt=SAL_CURSOR)
+            clave, direccion = tuple(int(valor) for valor in datos['v']), datos['d']
+        except (signing.BadSignature, KeyError, TypeError, ValueError):
+            return None
+        return (clave, direccion) if direccion in ('sig', 'ant') else None
+
+    def pagina(self, cursor=None) -> PaginaKeyset:
+        decodificado = self._decodificar(cursor) if cursor else None
+        if decodificado is None:
+            inicio = 0
+        elif decodificado[1] == 'sig':
+            inicio = bisect_right(self.claves, decodificado[0])
+        else:
+            inicio = max(0, bisect_left(self.claves, decodificado[0]) - self.por_pagina)
+
+        claves = self.claves[inicio:inicio + self.por_pagina]
+        cursor_siguiente = cursor_anterior = None
+        if claves:
+            if inicio + self.por_pagina < len(self.claves):
+                cursor_siguiente = self._codificar(claves[-1], 'sig')
+            if inicio > 0:
+                cursor_anterior = self._codificar(claves[0], 'ant')
+        return PaginaKeyset(claves, cursor_siguiente, cursor_anterior, len(self.claves), True)
+
+
+def _enlazar(request, pagina, parametro):
+    """Deja en la página las URLs (solo querystring) de la anterior y la siguiente."""
+
+    def _url(cursor):
+        if cursor is None:
+            return None
+        parametros = request.GET.copy()
+        parametros.pop('page', None)
+        parametros[parametro] = cursor
+        return "?" + parametros.urlencode()
+
+    pagina.url_siguiente = _url(pagina.cursor_siguiente)
+    pagina.url_anterior = _url(pagina.cursor_anterior)
+    return pagina
+
+
+def paginar(request, queryset, por_pagina, orden=('-id',), contar=False, parametro='cursor') -> PaginaKeyset:
+    """
+    Atajo para vistas: lee el cursor de `request.GET` y deja en la página las URLs
+    (solo querystring) de la anterior y la siguiente, conservando los demás filtros.
+    """
+    pagina = PaginadorKeyset(queryset, por_pagina, orden=orden, contar=contar).pagina(request.GET.get(parametro))
+    return _enlazar(request, pagina, parametro)
+
+
+def paginar_claves(request, claves, por_pagina, parametro='cursor') -> PaginaKeyset:
+    """Como `paginar`, pero sobre una lista ordenada de claves; la página contiene claves."""
+    return _enlazar(request, PaginadorClaves(claves, por_pagina).pagina(request.GET.get(parametro)), parametro)
@@ -1,4 +1,4 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 @receiver(post_save, sender='usuario.Usuario')
@@ -18,3 +18,34 @@ def crear_perfil_empresa(sender, instance, created, **kwargs):
                 telefono="0000000000",
                 sector=None
             )
+
+
+# --- Índice de búsqueda (usuario/busqueda.py) ---
+
+CAMPOS_INDEXADOS_USUARIO = {'username', 'email', 'first_name', 'last_name'}
+
+
+def _reindexar_despues_del_commit(usuario_id):
+    from django.db import transaction
+    from usuario import busqueda
+
+    transaction.on_commit(lambda: busqueda.indexar([usuario_id]))
+
+
+@receiver(post_save, sender='usuario.Usuario')
+@receiver(post_delete, sender='usuario.Usuario')
+def actualizar_busqueda_usuario(sender, instance, update_fields=None, **kwargs):
+    # Los guardados parciales que no tocan campos indexados (p. ej. last_login) no reindexan.
+    if update_fields and not CAMPOS_INDEXADOS_USUARIO.intersection(update_fields):
+        return
+    _reindexar_despues_del_commit(instance.pk)
+
+
+@receiver(post_save, sender='usuario.PerfilAprendiz')
+@receiver(post_save, sender='usuario.PerfilInstructor')
+@receiver(post_save, sender='usuario.PerfilEmpresa')
+@receiver(post_delete, sender='usuario.PerfilAprendiz')
+@receiver(post_delete, sender='usuario.PerfilInstructor')
+@receiver(post_delete, sender='usuario.PerfilEmpresa')
+def actualizar_busqueda_perfil(sender, instance, **kwargs):
+    _reindexar_despues_del_commit(instance.usuario_id)
@@ -1,8 +1,13 @@
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.conf import settings
+from django.utils import timezone
 import os
 
+from . import busqueda
+from .models import Usuario, PerfilAprendiz
+from .paginacion import PaginadorKeyset
+
 class ManualUsuarioTests(TestCase):
     
     def setUp(self):
@@ -24,4 +29,81 @@ class ManualUsuarioTests(TestCase):
         response = self.client.get(reverse('auth:descargar_manual_pdf'))
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response['Content-Type'], 'application/pdf')
-        self.assertIn('attachment', response['Content-Disposition'])
\ No newline at end of file
+        self.assertIn('attachment', response['Content-Disposition'])
+
+
+class PaginacionKeysetTests(TestCase):
+
+    def test_recorrido_hacia_adelante_y_atras(self):
+        '''Prueba que las páginas por cursor cubren todas las filas, incluso con fechas repetidas'''
+        fecha = timezone.now()
+        Usuario.objects.bulk_create([
+            Usuario(username=f"u{i:02d}", email=f"u{i:02d}@oasis.test", date_joined=fecha if i % 3 else timezone.now())
+            for i in range(25)
+        ])
+        paginador = PaginadorKeyset(Usuario.objects.all(), 10, orden=('-date_joined', '-id'))
+        esperados = list(Usuario.objects.order_by('-date_joined', '-id').values_list('pk', flat=True))
+
+        paginas, pagina = [], paginador.pagina()
+        while True:
+            paginas.append([u.pk for u in pagina])
+            if not pagina.has_next:
+                break
+            pagina = paginador.pagina(pagina.cursor_siguiente)
+
+        self.assertEqual([len(p) for p in paginas], [10, 10, 5])
+        self.assertEqual(sum(paginas, []), esperados)
+
+        anterior = paginador.pagina(pagina.cursor_anterior)
+        self.assertEqual([u.pk for u in anterior], paginas[1])
+        self.assertEqual([u.pk for u in paginador.pagina(anterior.cursor_anterior)], paginas[0])
+        self.assertEqual([u.pk for u in paginador.pagina("cursor-alterado")], paginas[0])
+
+
+
+class BusquedaUsuariosTests(TestCase):
+
+    def test_indice_sigue_los_cambios(self):
+        '''Prueba que el índice de búsqueda refleja altas, cambios de perfil y bajas'''
+        with self.captureOnCommitCallbacks(execute=True):
+            ana = Usuario.objects.create_user(username="ana_m", email="ana.martinez@correo.co", password="x",
+                                              first_name="Ana María", last_name="Martínez")
+            Usuario.objects.create_user(username="anacleto", email="otro@correo.co", password="x")
+            PerfilAprendiz.objects.create(usuario=ana, documento="1020304050", ficha="1")
+
+        self.assertEqual(busqueda.buscar("ana")[0], ana.pk)
+        self.assertEqual(busqueda.buscar("maria martinez"), [ana.pk])
+        self.assertEqual(busqueda.buscar("ana 10203"), [ana.pk])
+        self.assertEqual(busqueda.buscar("martinez@correo"), [ana.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ana.perfil_aprendiz.documento = "9988776655"
+            ana.perfil_aprendiz.save()
+        self.assertEqual(busqueda.buscar("10203"), [])
+        self.assertEqual(busqueda.buscar("99887"), [ana.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ana.delete()
+        self.assertEqual(busqueda.buscar("martinez"), [])
+
+    def test_filtro_por_rol_sin_truncar(self):
+        '''Prueba que el rol se filtra dentro de la búsqueda y que el listado pagina todas las coincidencias'''
+        Usuario.objects.bulk_create([Usuario(username=f"ana{i:03d}", rol=Usuario.APRENDIZ) for i in range(230)])
+        instructora = Usuario.objects.create_user("ana_instructora", "ana@sena.edu.co", "x", rol=Usuario.INSTRUCTOR)
+        busqueda.reconstruir()
+
+        self.assertEqual(len(busqueda.buscar("ana")), 231)
+        self.assertEqual(busqueda.buscar("ana", rol=Usuario.INSTRUCTOR), [instructora.pk])
+        self.assertEqual(len(busqueda.buscar("ana", limite=5)), 5)
+
+        self.client.force_login(Usuario.objects.create_superuser("admin", "admin@oasis.co", "x"))
+        url = reverse('gestion:listar_usuarios')
+        respuesta = self.client.get(url, {'buscar': "ana", 'rol': Usuario.INSTRUCTOR})
+        self.assertEqual([u.pk for u in respuesta.context['usuarios']], [instructora.pk])
+
+        vistos, siguiente = [], "?buscar=ana"
+        while siguiente:
+            pagina = self.client.get(url + siguiente).context['usuarios']
+            vistos += [u.pk for u in pagina]
+            siguiente = pagina.url_siguiente
+        self.assertEqual(len(set(vistos)), 231)
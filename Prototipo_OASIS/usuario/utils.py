@@ -1,7 +1,14 @@
+import uuid
+from functools import wraps
+
+from django.conf import settings
 from django.contrib.auth.decorators import user_passes_test
+from django.core.cache import cache
+from django.http import HttpResponseRedirect
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
 
 def role_required(*allowed_roles):
     def decorator(view_func):
@@ -27,3 +34,78 @@ def role_required(*allowed_roles):
 
         return _wrapped_view
     return decorator
+
+
+def marca_generacion(clave) -> str:
+    """
+    Marca de generación guardada en `clave` (la crea si no existe). Las cachés que
+    la incluyen en sus claves se descartan de golpe con `renovar_generacion`. Es un
+    valor aleatorio: si la caché expulsa la marca, no se reusan datos de una
+    generación anterior.
+    """
+    valor = cache.get(clave)
+    if valor is None:
+        cache.add(clave, uuid.uuid4().hex[:12], timeout=None)
+        valor = cache.get(clave)
+    return valor
+
+
+def renovar_generacion(clave) -> None:
+    """Cambia la marca de `clave`: las entradas de la generación anterior dejan de leerse."""
+    cache.set(clave, uuid.uuid4().hex[:12], timeout=None)
+
+
+CAMPO_IDEMPOTENCIA = 'clave_idempotencia'
+PREFIJO_IDEMPOTENCIA = "oasis:idempotencia:"
+EN_CURSO = "en_curso"
+
+
+def _pagina_segura(request):
+    """La página desde la que se envió el formulario, si es de este sitio; si no, el inicio."""
+    origen = request.META.get('HTTP_REFERER')
+    if origen and url_has_allowed_host_and_scheme(origen, {request.get_host()}, request.is_secure()):
+        return origen
+    return reverse('home:inicio')
+
+
+def idempotente(view_func):
+    """
+    Repite la respuesta de un POST ya atendido con la misma clave de idempotencia
+    (campo `clave_idempotencia` del formulario o cabecera Idempotency-Key).
+
+    La primera petición reserva la clave en la caché con `add`; si era una
+    redirección, las repeticiones redirigen al mismo destino sin volver a ejecutar
+    la vista. Si la primera sigue en curso, el duplicado no la espera: vuelve a la
+    página de origen con un aviso. Sin clave, la vista se ejecuta siempre.
+
+    La clave vive en la caché por defecto, que debe compartirse entre procesos
+    (OASIS_CACHE=archivo o db): con la caché en memoria cada worker ve solo sus
+    propias claves (`check --deploy` lo advierte, ver gestion/checks.py).
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        clave = request.POST.get(CAMPO_IDEMPOTENCIA) or request.META.get('HTTP_IDEMPOTENCY_KEY')
+        if not clave:
+            return view_func(request, *args, **kwargs)
+
+        clave = f"{PREFIJO_IDEMPOTENCIA}{request.user.pk}:{request.path}:{clave[:64]}"
+        ttl = getattr(settings, 'IDEMPOTENCIA_TTL_SEGUNDOS', 3600)
+        if not cache.add(clave, EN_CURSO, timeout=ttl):
+            destino = cache.get(clave)
+            if destino and destino != EN_CURSO:
+                return HttpResponseRedirect(destino)
+            messages.info(request, "Tu solicitud ya se está procesando; revisa el resultado en unos segundos.")
+            return HttpResponseRedirect(_pagina_segura(request))
+
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            cache.delete(clave)
+            raise
+        if isinstance(response, HttpResponseRedirect):
+            cache.set(clave, response['Location'], timeout=ttl)
+        else:
+            cache.delete(clave)
+        return response
+
+    return _wrapped_view